@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from rest_framework_simplejwt.tokens import RefreshToken
 from users.models import CustomUser
-from documents.models import AuthorityIssuedDocument, UserUploadedDocument
+from documents.models import AuthorityIssuedDocument, UserUploadedDocument, IssuanceDailyRollup, VerificationDailyRollup
 from blockchain.models import VerificationHistory, FlagHistory
 from core.models import SystemLog
 
@@ -36,46 +38,67 @@ class StaffLoginSerializer(serializers.Serializer):
         }
 
 
+def count_subquery(queryset, field, aggregate=None):
+    """
+    Correlated COUNT (or `aggregate`) of `queryset` rows whose `field` is the
+    outer user, for use in annotate().
+    """
+    counts = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=aggregate or Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
 # ----------------------
 # User Summary Serializer
 # ----------------------
 class UserSummarySerializer(serializers.ModelSerializer):
-    uploaded_docs_count = serializers.SerializerMethodField()
-    issued_docs_count = serializers.SerializerMethodField()
+    uploaded_docs_count = serializers.IntegerField(read_only=True)
+    issued_docs_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = CustomUser
         fields = ['username', 'public_id', 'uploaded_docs_count', 'issued_docs_count']
 
-    def get_uploaded_docs_count(self, obj):
-        # Count from UserUploadedDocument model
-        return UserUploadedDocument.objects.filter(owner=obj).count()
-
-    def get_issued_docs_count(self, obj):
-        # Count from AuthorityIssuedDocument model
-        return AuthorityIssuedDocument.objects.filter(receiver=obj).count()
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        # Both counts in the same SELECT instead of two queries per user
+        return queryset.only('username', 'public_id').annotate(
+            # Count from UserUploadedDocument model
+            uploaded_docs_count=count_subquery(UserUploadedDocument.objects, 'owner'),
+            # Count from AuthorityIssuedDocument model
+            issued_docs_count=count_subquery(AuthorityIssuedDocument.objects, 'receiver'),
+        )
 
 
 # ----------------------
 # Authority Summary Serializer
 # ----------------------
 class AuthoritySummarySerializer(serializers.ModelSerializer):
-    docs_issued = serializers.SerializerMethodField()
-    docs_verified = serializers.SerializerMethodField()
+    docs_issued = serializers.IntegerField(read_only=True)
+    docs_verified = serializers.IntegerField(read_only=True)
     proof_document = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
         fields = ['id', 'public_id', 'name', 'is_verified_authority', 'proof_document', 'sector', 'docs_issued', 'docs_verified']
 
-    def get_docs_issued(self, obj):
-        # Count documents issued by this authority
-        return AuthorityIssuedDocument.objects.filter(issuer=obj).count()
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        # Both counts in the same SELECT instead of two queries per authority
+        return queryset.only('public_id', 'name', 'is_verified_authority', 'proof_document', 'sector').annotate(
+            # Documents issued by this authority, summed over its daily rollups
+            docs_issued=count_subquery(IssuanceDailyRollup.objects, 'issuer', Sum('count')),
+            # Successful verifications done by this authority, likewise
+            docs_verified=count_subquery(
+                VerificationDailyRollup.objects.filter(success=True), 'verifier', Sum('count')
+            ),
+        )
 
-    def get_docs_verified(self, obj):
-        # Count verifications done by this authority
-        return VerificationHistory.objects.filter(verifier=obj, success=True).count()
-    
     def get_proof_document(self, obj):
         request = self.context.get("request")
         if obj.proof_document and request:
@@ -1,3 +1,170 @@
+import csv
+import io
+import json
+from datetime import timedelta
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from documents.models import (
+    AuthorityIssuedDocument, IssuanceDailyRollup, UserUploadedDocument, VerificationDailyRollup,
+)
+from blockchain.models import VerificationHistory
+from core.models import SystemLog
+from users.models import CustomUser
 
-# Create your tests here.
+
+class StaffListQueryCountTests(TestCase):
+    """Staff listings cost a page count and one SELECT, however many rows and documents there are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create(username='staff', role='user', is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        self.added = 0
+
+    def add_users(self, count):
+        for _ in range(count):
+            self.added += 1
+            user = CustomUser.objects.create(username=f"holder{self.added}")
+            authority = CustomUser.objects.create(
+                username=f"authority{self.added}", name=f"Registry {self.added}", role='authority',
+                sector='Education' if self.added % 2 else 'Health', is_verified_authority=self.added % 3 != 2,
+            )
+            UserUploadedDocument.objects.create(owner=user, title="Upload", ipfs_hash=f"QmUpload{self.added}", tx_hash='0x')
+            AuthorityIssuedDocument.objects.create(
+                issuer=authority, receiver=user, title="Issued", ipfs_hash=f"QmIssued{self.added}", tx_hash='0x'
+            )
+            IssuanceDailyRollup.objects.create(issuer=authority, day='2026-01-01', count=2)
+            VerificationDailyRollup.objects.create(verifier=authority, day='2026-01-01', success=True, count=3)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assert_fixed_queries(self, url):
+        for count in (1, 10):
+            self.add_users(count)
+            with self.assertNumQueries(2):
+                body = self.get(url)
+        return body
+
+    def test_user_list(self):
+        # ?search= leaves out the staff member, whose role is also 'user'
+        body = self.assert_fixed_queries('/api/staff/users/?search=holder')
+        self.assertEqual(body['count'], 11)
+        self.assertEqual(
+            {(row['uploaded_docs_count'], row['issued_docs_count']) for row in body['results']}, {(1, 1)}
+        )
+
+    def test_user_list_role_filter(self):
+        body = self.assert_fixed_queries('/api/staff/users/?role=authority')
+        self.assertEqual(body['count'], 11)
+        self.assertEqual({row['issued_docs_count'] for row in body['results']}, {0})
+
+    def test_authority_list(self):
+        body = self.assert_fixed_queries('/api/staff/authorities/?page_size=5')
+        self.assertEqual((body['count'], len(body['results'])), (11, 5))
+        self.assertEqual({(row['docs_issued'], row['docs_verified']) for row in body['results']}, {(2, 3)})
+
+    def test_authority_list_sector_filter(self):
+        body = self.assert_fixed_queries('/api/staff/authorities/?sector=education')
+        self.assertEqual(body['count'], 6)
+        self.assertEqual({row['sector'] for row in body['results']}, {'Education'})
+
+    def test_authority_list_verified_filter(self):
+        verified = self.assert_fixed_queries('/api/staff/authorities/?verified=true')
+        self.assertEqual(verified['count'], 7)
+        self.assertTrue(all(row['is_verified_authority'] for row in verified['results']))
+        self.assertEqual(self.get('/api/staff/authorities/?verified=false')['count'], 4)
+
+
+class LogEndpointTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create(username='staff', is_staff=True)
+        cls.holder = CustomUser.objects.create(username='holder')
+        cls.start = timezone.now() - timedelta(days=1)
+        cls.logs = [
+            SystemLog.objects.create(
+                user=cls.holder if i % 2 else None, event_type='LOGIN' if i < 3 else 'OTHER',
+                level='ERROR' if i == 4 else 'INFO', status_code=200, path='/api/', method='GET',
+                message=f"Entry {i}", created_at=cls.start + timedelta(hours=i),
+            )
+            for i in range(5)
+        ]
+        for success in (True, False, True):
+            VerificationHistory.objects.create(verifier=cls.staff, success=success, document_index=1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def messages(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row['message'] for row in response.json()['results']]
+
+    def test_cursor_pages_are_newest_first_without_repeats(self):
+        messages = []
+        url = '/api/staff/logs/system/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            messages += [row['message'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(messages, [f"Entry {i}" for i in reversed(range(5))])
+
+    def test_filters(self):
+        since = (self.start + timedelta(hours=1)).isoformat()
+        until = (self.start + timedelta(hours=4)).isoformat()
+        for query, expected in (
+            ('event_type=LOGIN', [2, 1, 0]),
+            ('level=ERROR', [4]),
+            (f'user={self.holder.id}', [3, 1]),
+            ('status_code=200&event_type=OTHER', [4, 3]),
+            (f'since={since}&until={until}'.replace('+', '%2B'), [3, 2, 1]),
+        ):
+            self.assertEqual(
+                self.messages(f'/api/staff/logs/system/?{query}'), [f"Entry {i}" for i in expected], query
+            )
+
+        response = self.client.get('/api/staff/logs/verifications/?success=false')
+        self.assertEqual([row['success'] for row in response.json()['results']], [False])
+
+    def test_invalid_filters_are_rejected(self):
+        for url in (
+            '/api/staff/logs/system/?since=2026-13-01T00:00:00',
+            '/api/staff/logs/system/?until=yesterday',
+            '/api/staff/logs/system/?status_code=abc',
+            '/api/staff/logs/system/?user=me',
+            '/api/staff/logs/verifications/?success=maybe',
+            '/api/staff/logs/flags/?flag_status=maybe',
+            '/api/staff/logs/system/export.csv?since=2026-02-30T00:00:00',
+            '/api/staff/authorities/?verified=maybe',
+        ):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+    def test_csv_export(self):
+        response = self.client.get('/api/staff/logs/system/export.csv?event_type=LOGIN')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:4], ['id', 'created_at', 'user_id', 'user__username'])
+        # Every matching row, oldest id first
+        self.assertEqual([row[-1] for row in rows[1:]], ["Entry 0", "Entry 1", "Entry 2"])
+        self.assertEqual(rows[2][3], 'holder')
+
+    def test_ndjson_export(self):
+        response = self.client.get('/api/staff/logs/verifications/export.ndjson?success=true')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(row['verifier__username'], row['success']) for row in rows], [('staff', True)] * 2)
+
+    def test_unknown_export(self):
+        self.assertEqual(self.client.get('/api/staff/logs/audit/export.csv').status_code, 404)
+        self.assertEqual(self.client.get('/api/staff/logs/system/export.xml').status_code, 404)
@@ -1,10 +1,20 @@
 from django.urls import path
-from .views import StaffLoginView, AllUsersAuthoritiesView, AuthorityVerifyView, CreateUserAPI, SystemLogsView
+from .views import (
+    StaffLoginView, AllUsersAuthoritiesView, UserListView, AuthorityListView, AuthorityVerifyView, CreateUserAPI, SystemLogsView, SystemLogDailyView,
+    SystemLogListView, VerificationLogListView, FlagLogListView, LogExportView,
+)
 
 urlpatterns = [
     path('login/', StaffLoginView.as_view(), name='staff-login'),
     path('all-users/', AllUsersAuthoritiesView.as_view(), name='all-users-authorities'),
+    path('users/', UserListView.as_view(), name='staff-users-list'),
+    path('authorities/', AuthorityListView.as_view(), name='staff-authorities-list'),
     path('verify-authority/', AuthorityVerifyView.as_view(), name='verify-authority'),
     path('create-user/', CreateUserAPI.as_view(), name='create_user_api'),
     path('system-logs/', SystemLogsView.as_view(), name='system-logs'),
+    path('system-logs/daily/', SystemLogDailyView.as_view(), name='system-logs-daily'),
+    path('logs/system/', SystemLogListView.as_view(), name='system-log-list'),
+    path('logs/verifications/', VerificationLogListView.as_view(), name='verification-log-list'),
+    path('logs/flags/', FlagLogListView.as_view(), name='flag-log-list'),
+    path('logs/<str:kind>/export.<str:fmt>', LogExportView.as_view(), name='log-export'),
 ]
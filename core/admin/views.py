@@ -1,6 +1,16 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
+from rest_framework import status, permissions, generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+import csv
+import json
+from datetime import date, timedelta
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import BooleanField
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
 from .serializers import (
     StaffLoginSerializer,
     UserSummarySerializer,
@@ -13,7 +23,7 @@ from .serializers import (
 )
 from users.models import CustomUser
 from core.utils import log_event
-from core.models import SystemLog
+from core.models import SystemLog, SystemLogDailyRollup
 from blockchain.models import VerificationHistory, FlagHistory
 
 # ----------------------
@@ -35,8 +45,8 @@ class AllUsersAuthoritiesView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        users_qs = CustomUser.objects.filter(role='user')
-        authorities_qs = CustomUser.objects.filter(role='authority')
+        users_qs = UserSummarySerializer.setup_eager_loading(CustomUser.objects.filter(role='user'))
+        authorities_qs = AuthoritySummarySerializer.setup_eager_loading(CustomUser.objects.filter(role='authority'))
 
         users_data = UserSummarySerializer(users_qs, many=True, context={"request": request}).data
         authorities_data = AuthoritySummarySerializer(authorities_qs, many=True, context={"request": request}).data
@@ -47,6 +57,63 @@ class AllUsersAuthoritiesView(APIView):
         })
 
 
+# ----------------------
+# Paginated Users / Authorities Views
+# ----------------------
+class StaffListPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def parse_bool(value):
+    """None when absent; raises ValueError for anything but true/false, 1/0 or yes/no."""
+    if value is None:
+        return None
+    value = str(value).lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    raise ValueError(value)
+
+
+class UserListView(generics.ListAPIView):
+    """Users, one page at a time. Filters: ?role= (default 'user'), ?search= (username prefix)."""
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = UserSummarySerializer
+    pagination_class = StaffListPagination
+
+    def get_queryset(self):
+        queryset = CustomUser.objects.filter(role=self.request.query_params.get('role', 'user'))
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = queryset.filter(username__istartswith=search)
+        return UserSummarySerializer.setup_eager_loading(queryset).order_by('id')
+
+
+class AuthorityListView(generics.ListAPIView):
+    """Authorities, one page at a time. Filters: ?sector=, ?verified=true|false, ?search= (name prefix)."""
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = AuthoritySummarySerializer
+    pagination_class = StaffListPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = CustomUser.objects.filter(role='authority')
+        try:
+            verified = parse_bool(params.get('verified'))
+        except ValueError:
+            raise ValidationError({'verified': "Must be true or false."})
+        if verified is not None:
+            queryset = queryset.filter(is_verified_authority=verified)
+        if params.get('sector'):
+            queryset = queryset.filter(sector__iexact=params['sector'])
+        if params.get('search'):
+            queryset = queryset.filter(name__istartswith=params['search'])
+        return AuthoritySummarySerializer.setup_eager_loading(queryset).order_by('id')
+
+
 # ----------------------
 # Verify/Unverify Authority View
 # ----------------------
@@ -153,9 +220,9 @@ class SystemLogsView(APIView):
 
     def get(self, request):
         # Optional: limit number of logs to latest 100 for performance
-        system_logs = SystemLog.objects.order_by('-created_at')[:100]
-        verification_logs = VerificationHistory.objects.order_by('-verified_at')[:100]
-        flag_logs = FlagHistory.objects.order_by('-timestamp')[:100]
+        system_logs = SystemLog.objects.select_related('user').order_by('-created_at')[:100]
+        verification_logs = VerificationHistory.objects.select_related('verifier', 'verified_user').order_by('-verified_at')[:100]
+        flag_logs = FlagHistory.objects.select_related('actor').order_by('-timestamp')[:100]
 
         system_logs_serialized = SystemLogSerializer(system_logs, many=True).data
         verification_logs_serialized = VerificationHistorySerializer(verification_logs, many=True).data
@@ -165,4 +232,193 @@ class SystemLogsView(APIView):
             "system_logs": system_logs_serialized,
             "verification_history": verification_logs_serialized,
             "flag_history": flag_logs_serialized
-        })
\ No newline at end of file
+        })
+
+class SystemLogDailyView(APIView):
+    """Daily SystemLog counts from the rollup table; ?from= and ?to= (YYYY-MM-DD, inclusive)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    MAX_DAYS = 366
+
+    def get(self, request):
+        try:
+            end = date.fromisoformat(request.query_params['to']) if 'to' in request.query_params else timezone.now().date()
+            start = (
+                date.fromisoformat(request.query_params['from']) if 'from' in request.query_params
+                else end - timedelta(days=29)
+            )
+        except ValueError:
+            return Response({"error": "Dates must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end or (end - start).days >= self.MAX_DAYS:
+            return Response(
+                {"error": f"'from' must be before 'to', at most {self.MAX_DAYS} days apart"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows = (
+            SystemLogDailyRollup.objects.filter(day__range=(start, end))
+            .order_by('day', 'event_type', 'level', 'status_code')
+            .values('day', 'event_type', 'level', 'status_code', 'count')
+        )
+        return Response({"from": start, "to": end, "rollups": list(rows)})
+
+
+# ----------------------
+# Cursor-paginated Log Views and Export
+# ----------------------
+class LogCursorPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class LogFilterMixin:
+    """
+    Shared filters of the log endpoints: ?user= (user id), ?since= / ?until=
+    (ISO datetimes) and the exact-match fields in `filter_fields`.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = LogCursorPagination
+
+    model = None
+    timestamp_field = None
+    user_field = None
+    filter_fields = ()
+    related = ()
+    # Columns of the export, as passed to values()
+    export_fields = ()
+
+    @property
+    def paginator(self):
+        # Newest first on the model's own timestamp column
+        if not hasattr(self, '_paginator'):
+            self._paginator = self.pagination_class()
+            self._paginator.ordering = ('-' + self.timestamp_field, '-id')
+        return self._paginator
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = self.model.objects.all()
+
+        # ?user= filters on the model's own user column; the others share the field name
+        for field, param in ((self.user_field, 'user'),) + tuple((f, f) for f in self.filter_fields):
+            if params.get(param):
+                queryset = queryset.filter(**{field: self.parse_filter(field, params[param])})
+        for param, lookup in (('since', 'gte'), ('until', 'lt')):
+            if params.get(param):
+                try:
+                    # None when malformed, ValueError when well-formed but out of range
+                    moment = parse_datetime(params[param])
+                except ValueError:
+                    moment = None
+                if moment is None:
+                    raise ValidationError({param: "Must be an ISO 8601 datetime."})
+                queryset = queryset.filter(**{f'{self.timestamp_field}__{lookup}': moment})
+        return queryset.select_related(*self.related)
+
+    def parse_filter(self, name, value):
+        field = self.model._meta.get_field(name)
+        try:
+            if isinstance(field, BooleanField):
+                return parse_bool(value)
+            return field.target_field.to_python(value) if field.is_relation else field.to_python(value)
+        except (ValueError, DjangoValidationError):
+            raise ValidationError({name: f"Invalid value {value!r}."})
+
+
+class SystemLogListView(LogFilterMixin, generics.ListAPIView):
+    serializer_class = SystemLogSerializer
+    model = SystemLog
+    timestamp_field = 'created_at'
+    user_field = 'user'
+    filter_fields = ('event_type', 'level', 'status_code')
+    related = ('user',)
+    export_fields = (
+        'id', 'created_at', 'user_id', 'user__username', 'event_type', 'level', 'path', 'method', 'status_code', 'message'
+    )
+
+
+class VerificationLogListView(LogFilterMixin, generics.ListAPIView):
+    serializer_class = VerificationHistorySerializer
+    model = VerificationHistory
+    timestamp_field = 'verified_at'
+    user_field = 'verifier'
+    filter_fields = ('document_index', 'verified_user', 'success')
+    related = ('verifier', 'verified_user')
+    export_fields = (
+        'id', 'verified_at', 'verifier_id', 'verifier__username', 'verified_user_id', 'document_index',
+        'tx_hash', 'ipfs_hash', 'success', 'response_data'
+    )
+
+
+class FlagLogListView(LogFilterMixin, generics.ListAPIView):
+    serializer_class = FlagHistorySerializer
+    model = FlagHistory
+    timestamp_field = 'timestamp'
+    user_field = 'actor'
+    filter_fields = ('document_index', 'flag_status')
+    related = ('actor',)
+    export_fields = ('id', 'timestamp', 'actor_id', 'actor__username', 'document_index', 'flag_status')
+
+
+LOG_VIEWS = {
+    'system': SystemLogListView,
+    'verifications': VerificationLogListView,
+    'flags': FlagLogListView,
+}
+
+
+class EchoBuffer:
+    """File-like object whose write() returns the line, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+class LogExportView(APIView):
+    """
+    Every row of a log type that matches the list filters, streamed as NDJSON
+    or CSV in id order. Rows are read with iterator(), so memory stays flat
+    whatever the number of rows.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    CHUNK_SIZE = 2000
+
+    def get(self, request, kind, fmt):
+        if kind not in LOG_VIEWS or fmt not in ('ndjson', 'csv'):
+            return Response({"error": "Unknown log type or format"}, status=status.HTTP_404_NOT_FOUND)
+
+        list_view = LOG_VIEWS[kind](request=request, format_kwarg=None)
+        fields = list_view.export_fields
+        # The join for the username comes from values(); select_related is not needed
+        rows = (
+            list_view.get_queryset().select_related(None).order_by('id')
+            .values_list(*fields).iterator(chunk_size=self.CHUNK_SIZE)
+        )
+
+        rows = (tuple(map(_export_value, row)) for row in rows)
+        if fmt == 'csv':
+            writer = csv.writer(EchoBuffer())
+            lines = (
+                writer.writerow([json.dumps(value) if isinstance(value, (dict, list)) else value for value in row])
+                for row in _with_header(fields, rows)
+            )
+            content_type = 'text/csv'
+        else:
+            lines = (json.dumps(dict(zip(fields, row))) + '\n' for row in rows)
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{kind}-logs.{fmt}"'
+        return response
+
+
+def _export_value(value):
+    # Same timestamp format as the archived log segments
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _with_header(header, rows):
+    yield header
+    yield from rows
@@ -26,15 +26,22 @@ event_signature_hash = w3.keccak(
 
 event_signature_hash = "0x" + event_signature_hash
 
-# Get all DocumentStored events by filtering only on event signature
-logs = w3.eth.get_logs({
-    "fromBlock": 0,
-    "toBlock": "latest",
-    "address": contract_address,
-    "topics": [event_signature_hash]
-})
+# receiver is an indexed topic, so let the node filter instead of decoding every event
+receiver_topic = "0x" + "0" * 24 + user_address[2:]
 
-print(f"Found {len(logs)} DocumentStored events in total.\n")
+# Scan in fixed-size block ranges so long chains don't hit node response limits
+CHUNK_SIZE = 2000
+latest_block = w3.eth.block_number
+logs = []
+for from_block in range(0, latest_block + 1, CHUNK_SIZE):
+    logs += w3.eth.get_logs({
+        "fromBlock": from_block,
+        "toBlock": min(from_block + CHUNK_SIZE - 1, latest_block),
+        "address": contract_address,
+        "topics": [event_signature_hash, None, None, receiver_topic]
+    })
+
+print(f"Found {len(logs)} DocumentStored events for this receiver.\n")
 
 from datetime import datetime
 
@@ -42,7 +49,6 @@ for log in logs:
     # Decode event data using contract ABI
     event = contract.events.DocumentStored().process_log(log)
 
-    # Filter by receiver address manually
     if event.args.receiver.lower() == user_address:
         print(f"Document ID: {event.args.id}")
         print(f"IPFS Hash: {event.args.ipfsHash}")
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FlagHistory, VerificationHistory
+from .models import FlagHistory, VerificationHistory, NonceTracker, TransactionJob, ChainDocument, IndexerCheckpoint, ContentHash
 
 
 @admin.register(FlagHistory)
@@ -14,3 +14,34 @@ class VerificationHistoryAdmin(admin.ModelAdmin):
     list_display = ('verifier', 'verified_user', 'success', 'document_index', 'verified_at')
     list_filter = ('success', 'verified_at')
     search_fields = ('verifier__username', 'verified_user__username', 'document_index')
+
+
+@admin.register(NonceTracker)
+class NonceTrackerAdmin(admin.ModelAdmin):
+    list_display = ('address', 'next_nonce', 'updated_at')
+    search_fields = ('address',)
+
+
+@admin.register(TransactionJob)
+class TransactionJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'submitted_by', 'status', 'nonce', 'tx_hash', 'created_at', 'confirmed_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('tx_hash', 'submitted_by__username')
+
+
+@admin.register(ChainDocument)
+class ChainDocumentAdmin(admin.ModelAdmin):
+    list_display = ('index', 'title', 'issuer', 'receiver', 'flagged', 'block_number')
+    list_filter = ('flagged',)
+    search_fields = ('index', 'issuer', 'receiver', 'tx_hash', 'eth_tx_hash', 'ipfs_hash')
+
+
+@admin.register(IndexerCheckpoint)
+class IndexerCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('name', 'block_number', 'block_hash', 'updated_at')
+
+
+@admin.register(ContentHash)
+class ContentHashAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'cid', 'size', 'created_at')
+    search_fields = ('sha256', 'cid')
@@ -0,0 +1,85 @@
+import functools
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .services import (
+    GANACHE_URL,
+    load_contract_abi,
+    get_contract,
+    get_contract_address,
+    send_contract_transaction,
+    format_index_result,
+    format_tx_hash_result,
+    invalidate_flagged_documents,
+    verification_cache,
+    verification_cache_key,
+)
+
+
+# 🔹 AsyncWeb3 counterparts of services.get_web3/get_contract, built on first use
+@functools.cache
+def get_async_web3():
+    if settings.CHAIN_BACKEND == 'simulated':
+        from .simulated import get_simulated_chain
+        return get_simulated_chain().async_web3()
+
+    from aiohttp import ClientTimeout
+    from web3 import AsyncWeb3, AsyncHTTPProvider
+
+    timeout = ClientTimeout(sock_connect=settings.HTTP_CONNECT_TIMEOUT, sock_read=settings.CHAIN_READ_TIMEOUT)
+    return AsyncWeb3(AsyncHTTPProvider(GANACHE_URL, request_kwargs={'timeout': timeout}))
+
+
+@functools.cache
+def get_async_contract():
+    return get_async_web3().eth.contract(address=get_contract_address(), abi=load_contract_abi())
+
+
+async def _refresh_flag_invalidations():
+    # Throttled DocumentFlagged poll; runs on a worker thread to keep the loop free
+    await sync_to_async(invalidate_flagged_documents, thread_sensitive=False)()
+
+
+# 🔹 Same contract as services.cached_verify_by_*: returns (result, served_from_cache)
+async def async_cached_verify_by_index(index):
+    await _refresh_flag_invalidations()
+    key = verification_cache_key('index', index)
+    result = verification_cache.get(key)
+    if result is not None:
+        return result, True
+
+    result = format_index_result(await get_async_contract().functions.verifyByIndex(index).call())
+    if result[0]:
+        verification_cache.set(key, index, result)
+    return result, False
+
+
+async def async_cached_verify_by_tx_hash(tx_hash_hex):
+    await _refresh_flag_invalidations()
+    key = verification_cache_key('tx_hash', tx_hash_hex)
+    result = verification_cache.get(key)
+    if result is not None:
+        return result, True
+
+    tx_hash_bytes = get_async_web3().to_bytes(hexstr=tx_hash_hex)
+    result = format_tx_hash_result(await get_async_contract().functions.verifyByTxHash(tx_hash_bytes).call())
+    if result[0]:
+        verification_cache.set(key, result[1], result)
+    return result, False
+
+
+# 🔹 Set or unset a document flag without holding the event loop while it is mined
+async def async_set_document_flag(index, actor_address, actor_private_key, flag_status):
+    # Signing goes through the shared nonce allocator (DB row lock) and fee cache
+    tx_hash = await sync_to_async(send_contract_transaction)(
+        get_contract().functions.setFlag(index, actor_address, flag_status),
+        actor_address,
+        actor_private_key,
+        preflight=True,
+    )
+    receipt = await get_async_web3().eth.wait_for_transaction_receipt(tx_hash)
+
+    if receipt.status != 1:
+        raise Exception("Flag transaction failed")
+
+    verification_cache.invalidate_index(index)
+    return receipt
@@ -0,0 +1,155 @@
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from blockchain.async_services import (
+    async_set_document_flag,
+    async_cached_verify_by_index,
+    async_cached_verify_by_tx_hash,
+)
+from .indexer import mirror_verify_by_index, mirror_verify_by_tx_hash
+from .models import VerificationHistory, FlagHistory
+from .views import MAX_DOCUMENT_INDEX, index_response_data, parse_index, tx_hash_response_data
+from users.models import CustomUser
+from documents.counters import save_verifications, set_local_flag
+
+
+# ----------------------
+# Native async (ASGI) counterparts of FlagDocumentView / VerifyDocumentView.
+# DRF's APIView is synchronous, so these are plain Django views that do the
+# JWT check themselves and keep the event loop free while the node answers.
+# ----------------------
+async def authenticate(request):
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except (AuthenticationFailed, InvalidToken):
+        return None
+    return result[0] if result else None
+
+
+def parse_body(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncFlagDocumentView(View):
+
+    async def post(self, request):
+        user = await authenticate(request)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+
+        index = data.get("index")
+        flag = data.get("flag")
+
+        if index is None or flag is None:
+            return JsonResponse({'error': 'Missing fields'}, status=400)
+
+        try:
+            index = parse_index(index)
+            flag = str(flag).lower() == 'true'
+        except ValueError:
+            return JsonResponse({'error': 'Invalid index or flag value'}, status=400)
+
+        try:
+            # Update on-chain
+            await async_set_document_flag(index, user.blockchain_address, user.private_key, flag)
+
+            # Save history
+            await FlagHistory.objects.acreate(document_index=index, actor=user, flag_status=flag)
+
+            # Row lock and counter update run in one transaction, on a worker thread
+            if not await sync_to_async(set_local_flag)(index, flag):
+                return JsonResponse({"warning": "Flag set on-chain, but no matching local document found."}, status=202)
+
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+        return JsonResponse({"message": "Flag status updated."}, status=200)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncVerifyDocumentView(View):
+
+    async def post(self, request):
+        user = await authenticate(request)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+
+        index = str(data.get("index")).strip() if data.get("index") not in (None, "") else None
+        tx_hash = str(data.get("tx_hash")).strip() if data.get("tx_hash") else None
+
+        if user.role != 'authority' or not user.is_verified_authority:
+            return JsonResponse({"error": "Only authority users can verify documents."}, status=403)
+
+        if index is None and tx_hash is None:
+            return JsonResponse({"detail": "Either 'index' or 'tx_hash' must be provided."}, status=400)
+
+        if index is not None:
+            try:
+                index = parse_index(index)
+            except ValueError:
+                return JsonResponse({"index": [f"Must be an integer from 0 to {MAX_DOCUMENT_INDEX}."]}, status=400)
+
+        try:
+            if index is not None:
+                result, cached, source = await sync_to_async(mirror_verify_by_index)(index), False, "mirror"
+                if result is None:
+                    result, cached = await async_cached_verify_by_index(index)
+                    source = "cache" if cached else "chain"
+                response_data = index_response_data(result)
+                document_index = index
+
+            else:
+                tx_hash = "0x" + tx_hash
+                result, cached, source = await sync_to_async(mirror_verify_by_tx_hash)(tx_hash), False, "mirror"
+                if result is None:
+                    result, cached = await async_cached_verify_by_tx_hash(tx_hash)
+                    source = "cache" if cached else "chain"
+                response_data = tx_hash_response_data(tx_hash, result)
+                document_index = result[1]
+
+            exists = response_data["exists"]
+            verified_user = None
+            if exists:
+                verified_user = await CustomUser.objects.filter(blockchain_address=response_data["receiver"]).afirst()
+
+            await sync_to_async(save_verifications)(VerificationHistory(
+                verifier=user,
+                verified_user=verified_user,
+                document_index=document_index,
+                success=exists,
+                response_data=response_data if exists else {},
+            ))
+
+            if not exists:
+                return JsonResponse({"exists": False}, status=200)
+
+            return JsonResponse({**response_data, "cached": cached, "source": source}, status=200)
+
+        except Exception as e:
+            await sync_to_async(save_verifications)(VerificationHistory(
+                verifier=user,
+                document_index=index if isinstance(index, int) else None,
+                success=False,
+                response_data={"error": str(e)},
+            ))
+            return JsonResponse({"error": str(e)}, status=500)
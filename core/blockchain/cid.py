@@ -0,0 +1,99 @@
+import hashlib
+
+# Kubo's `ipfs add` defaults: fixed-size 256 KiB chunks, balanced DAG with at
+# most 174 links per node, dag-pb/UnixFS leaves (no raw leaves), CIDv0
+CHUNK_SIZE = 262144
+MAX_LINKS = 174
+
+_UNIXFS_FILE = 2
+_BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, payload):
+    """Length-delimited protobuf field."""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(number, value):
+    return _varint(number << 3) + _varint(value)
+
+
+def _unixfs_file(data, filesize, blocksizes=()):
+    out = _varint_field(1, _UNIXFS_FILE)
+    if data:
+        out += _field(2, data)
+    out += _varint_field(3, filesize)
+    for size in blocksizes:
+        out += _varint_field(4, size)
+    return out
+
+
+def _multihash(block):
+    return b'\x12\x20' + hashlib.sha256(block).digest()
+
+
+def base58btc(raw):
+    number = int.from_bytes(raw, 'big')
+    out = ''
+    while number:
+        number, remainder = divmod(number, 58)
+        out = _BASE58_ALPHABET[remainder] + out
+    leading_zeros = len(raw) - len(raw.lstrip(b'\0'))
+    return '1' * leading_zeros + out
+
+
+class CIDv0Builder:
+    """
+    Incremental CIDv0 of a file, identical to what Kubo's /api/v0/add returns
+    with default options. Only one chunk and one (multihash, sizes) entry per
+    chunk are held, so memory stays small whatever the file size.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.leaves = []  # (multihash, block + descendants size, file bytes)
+        self.size = 0
+
+    def update(self, data):
+        self.size += len(data)
+        self.buffer += data
+        while len(self.buffer) >= CHUNK_SIZE:
+            self._add_leaf(bytes(self.buffer[:CHUNK_SIZE]))
+            del self.buffer[:CHUNK_SIZE]
+
+    def _add_leaf(self, chunk):
+        # dag-pb node with only a Data field
+        block = _field(1, _unixfs_file(chunk, len(chunk)))
+        self.leaves.append((_multihash(block), len(block), len(chunk)))
+
+    def _parent(self, children):
+        links = b''.join(
+            _field(2, _field(1, multihash) + _field(2, b'') + _varint_field(3, tsize))
+            for multihash, tsize, _ in children
+        )
+        file_sizes = [filesize for _, _, filesize in children]
+        block = links + _field(1, _unixfs_file(b'', sum(file_sizes), file_sizes))
+        return _multihash(block), len(block) + sum(tsize for _, tsize, _ in children), sum(file_sizes)
+
+    def cid(self):
+        # A file shorter than a chunk (including an empty one) is a single leaf
+        if self.buffer or not self.leaves:
+            self._add_leaf(bytes(self.buffer))
+            self.buffer.clear()
+
+        level = self.leaves
+        while len(level) > 1:
+            level = [self._parent(level[i:i + MAX_LINKS]) for i in range(0, len(level), MAX_LINKS)]
+        return base58btc(level[0][0])
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.cache import cache
+
+FEES_CACHE_KEY = 'chain:fees'
+
+# Headroom on top of the node's estimate; cached estimates are reused for calls
+# of the same shape, whose cost can drift slightly with contract state
+GAS_ESTIMATE_MARGIN = 1.25
+
+# Bytes of string/bytes arguments that share one cached estimate
+SIZE_BUCKET = 64
+
+
+def _argument_shape(args):
+    """(number of array items, bytes of string/bytes payload) of a contract call's arguments."""
+    items, size = 0, 0
+    for arg in args:
+        if isinstance(arg, (list, tuple)):
+            sub_items, sub_size = _argument_shape(arg)
+            items += len(arg) + sub_items
+            size += sub_size
+        elif isinstance(arg, (str, bytes)):
+            size += len(arg)
+    return items, size
+
+
+def estimate_gas(contract_call, sender_address, preflight=False):
+    """
+    Gas limit for `contract_call`, estimated once per function and argument shape
+    and shared across workers through the Django cache. A fresh estimate runs the
+    call, so a reverting one raises here; a cached one does not, and `preflight`
+    runs an eth_call instead for functions whose success depends on contract state.
+    """
+    items, size = _argument_shape(contract_call.args)
+    key = f"chain:gas:{contract_call.fn_name}:{items}:{size // SIZE_BUCKET}"
+    gas = cache.get(key)
+    if gas is None:
+        gas = int(contract_call.estimate_gas({'from': sender_address}) * GAS_ESTIMATE_MARGIN)
+        cache.set(key, gas, settings.GAS_ESTIMATE_TTL)
+    elif preflight:
+        contract_call.call({'from': sender_address})
+    return gas
+
+
+def _suggest_fees(web3, block_number):
+    block = web3.eth.get_block(block_number)
+    base_fee = block.get('baseFeePerGas')
+    if base_fee is None:
+        # Pre-London chain: legacy pricing
+        return {'gasPrice': web3.eth.gas_price}
+
+    priority_fee = web3.eth.max_priority_fee
+    return {
+        'maxFeePerGas': 2 * base_fee + priority_fee,
+        'maxPriorityFeePerGas': priority_fee,
+    }
+
+
+def get_fee_params(web3):
+    """
+    EIP-1559 (or legacy gasPrice) fee fields for a new transaction, suggested
+    once per block: the cached suggestion is reused while the head is still the
+    block it was taken from. FEE_CACHE_TTL only bounds how long it is kept.
+    """
+    block_number = web3.eth.block_number
+    cached = cache.get(FEES_CACHE_KEY)
+    if cached is not None and cached['block'] == block_number:
+        return cached['fees']
+
+    fees = _suggest_fees(web3, block_number)
+    cache.set(FEES_CACHE_KEY, {'block': block_number, 'fees': fees}, settings.FEE_CACHE_TTL)
+    return fees
+
+
+def invalidate_fees():
+    cache.delete(FEES_CACHE_KEY)
+
+
+def is_fee_error(exc):
+    """True when the node rejected a transaction as underpriced."""
+    message = str(exc).lower()
+    return any(text in message for text in ('underpriced', 'fee too low', 'less than block base fee'))
@@ -0,0 +1,175 @@
+import time
+from django.conf import settings
+from django.db import transaction
+from .models import ChainDocument, IndexerCheckpoint
+from .services import get_web3, get_contract, verify_document_by_index
+
+CHECKPOINT_NAME = 'document_storage'
+
+# keccak256 of the event signatures
+DOCUMENT_STORED_TOPIC = "0x6b3d149cb24057bc7126fc0247d10c82400e5bbfcf7bd847f3dd40b5c513babe"  # DocumentStored(uint256,string,address,address,string,uint256,bytes32)
+DOCUMENT_FLAGGED_TOPIC = "0xcfb4946bbe3e901095f496dc2761724c85402869728c0e21e71d8b1165b3e3d2"  # DocumentFlagged(uint256,bool)
+
+
+def fetch_document_events(from_block, to_block, issuer=None, receiver=None):
+    """
+    Returns decoded DocumentStored/DocumentFlagged events in chain order.
+    `issuer`/`receiver` narrow DocumentStored logs through their indexed topics,
+    so the node does the filtering instead of Python.
+    """
+    web3 = get_web3()
+    if issuer or receiver:
+        topics = [
+            DOCUMENT_STORED_TOPIC,
+            None,
+            _address_topic(issuer) if issuer else None,
+            _address_topic(receiver) if receiver else None,
+        ]
+    else:
+        topics = [[DOCUMENT_STORED_TOPIC, DOCUMENT_FLAGGED_TOPIC]]
+
+    logs = web3.eth.get_logs({
+        'address': get_contract().address,
+        'fromBlock': from_block,
+        'toBlock': to_block,
+        'topics': topics,
+    })
+    logs = sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex']))
+
+    stored_event = get_contract().events.DocumentStored()
+    flagged_event = get_contract().events.DocumentFlagged()
+    return [
+        stored_event.process_log(log) if web3.to_hex(log['topics'][0]) == DOCUMENT_STORED_TOPIC
+        else flagged_event.process_log(log)
+        for log in logs
+    ]
+
+
+def _address_topic(address):
+    return '0x' + '0' * 24 + address.lower().removeprefix('0x')
+
+
+def index_range(from_block, to_block):
+    """Mirrors every document event in [from_block, to_block]. Safe to replay."""
+    web3 = get_web3()
+    events = fetch_document_events(from_block, to_block)
+
+    stored = []
+    flags = {}  # index -> (flagged, block_number), last event wins
+    for event in events:
+        args = event['args']
+        if event['event'] == 'DocumentStored':
+            stored.append(ChainDocument(
+                index=args['id'],
+                ipfs_hash=args['ipfsHash'],
+                issuer=args['issuer'],
+                receiver=args['receiver'],
+                title=args['title'],
+                timestamp=args['timestamp'],
+                tx_hash=web3.to_hex(args['txHash']),
+                eth_tx_hash=web3.to_hex(event['transactionHash']),
+                block_number=event['blockNumber'],
+            ))
+        else:
+            flags[args['id']] = (args['flagged'], event['blockNumber'])
+
+    with transaction.atomic():
+        ChainDocument.objects.bulk_create(stored, ignore_conflicts=True, batch_size=500)
+        if flags:
+            docs = list(ChainDocument.objects.filter(index__in=flags))
+            for doc in docs:
+                doc.flagged, doc.flag_block = flags[doc.index]
+            ChainDocument.objects.bulk_update(docs, ['flagged', 'flag_block'], batch_size=500)
+
+    return len(events)
+
+
+def rewind(block_number):
+    """Forgets everything mirrored after `block_number`, used when a reorg is detected."""
+    with transaction.atomic():
+        ChainDocument.objects.filter(block_number__gt=block_number).delete()
+        # Flag changes from orphaned blocks cannot be undone from logs, ask the contract
+        for doc in ChainDocument.objects.filter(flag_block__gt=block_number):
+            doc.flagged = verify_document_by_index(doc.index)[6]
+            doc.flag_block = block_number
+            doc.save(update_fields=['flagged', 'flag_block'])
+
+
+def sync_mirror(chunk_size=2000, confirmations=0, reorg_depth=12, start_block=0):
+    """
+    Advances the mirror from its checkpoint to the head (minus `confirmations`)
+    in fixed-size block ranges, rewinding `reorg_depth` blocks if the block at
+    the checkpoint was replaced. Returns the number of events processed.
+    """
+    web3 = get_web3()
+    checkpoint, _ = IndexerCheckpoint.objects.get_or_create(
+        name=CHECKPOINT_NAME,
+        defaults={'block_number': start_block - 1},
+    )
+
+    if checkpoint.block_hash and checkpoint.block_number >= 0:
+        block = web3.eth.get_block(checkpoint.block_number)
+        if web3.to_hex(block['hash']) != checkpoint.block_hash:
+            checkpoint.block_number = max(checkpoint.block_number - reorg_depth, start_block - 1)
+            checkpoint.block_hash = ''
+            rewind(checkpoint.block_number)
+
+    head = web3.eth.block_number - confirmations
+    processed = 0
+    from_block = checkpoint.block_number + 1
+    while from_block <= head:
+        to_block = min(from_block + chunk_size - 1, head)
+        processed += index_range(from_block, to_block)
+        checkpoint.block_number = to_block
+        checkpoint.block_hash = web3.to_hex(web3.eth.get_block(to_block)['hash'])
+        checkpoint.save()
+        from_block = to_block + 1
+
+    return processed
+
+
+# The head is read at most this often, so a burst of verifications costs one eth_blockNumber
+HEAD_POLL_SECONDS = 1.0
+_head = {'block': None, 'checked_at': 0.0}
+
+
+def chain_head():
+    now = time.monotonic()
+    if _head['block'] is None or now - _head['checked_at'] >= HEAD_POLL_SECONDS:
+        _head['block'] = get_web3().eth.block_number
+        _head['checked_at'] = now
+    return _head['block']
+
+
+def mirror_is_fresh():
+    """
+    True when VERIFY_FROM_MIRROR is on and the checkpoint is at most
+    MIRROR_MAX_LAG blocks behind the head. Block numbers, not the time of the
+    last save, so a stuck or lagging indexer is never taken for a fresh one.
+    """
+    if not settings.VERIFY_FROM_MIRROR:
+        return False
+    indexed = IndexerCheckpoint.objects.filter(name=CHECKPOINT_NAME).values_list('block_number', flat=True).first()
+    if indexed is None or indexed < 0:
+        return False
+    return chain_head() - indexed <= settings.MIRROR_MAX_LAG
+
+
+# 🔹 Same tuple shapes as services.verify_document_by_index / verify_document_by_tx_hash,
+# or None when the mirror is stale or does not know the document (caller asks the chain)
+def mirror_verify_by_index(index):
+    if not mirror_is_fresh():
+        return None
+    doc = ChainDocument.objects.filter(index=index).first()
+    if doc is None:
+        return None
+    return (True, doc.ipfs_hash, doc.issuer, doc.receiver, doc.title, doc.timestamp, doc.flagged, doc.tx_hash)
+
+
+def mirror_verify_by_tx_hash(tx_hash_hex):
+    if not mirror_is_fresh():
+        return None
+    doc = ChainDocument.objects.filter(tx_hash=tx_hash_hex.lower()).first()
+    if doc is None:
+        return None
+    return (True, doc.index, doc.ipfs_hash, doc.issuer, doc.receiver, doc.title, doc.timestamp, doc.flagged)
@@ -0,0 +1,138 @@
+import os
+import re
+import tempfile
+import threading
+import time
+from django.conf import settings
+from .cid import CIDv0Builder
+from .transport import ipfs_session
+
+# Base58/base32 CIDs only; anything else never reaches the filesystem
+CID_PATTERN = re.compile(r'^[A-Za-z0-9]{10,100}$')
+
+
+class ContentMismatch(Exception):
+    """Kubo returned bytes that do not hash to the requested CID."""
+
+
+class IPFSContentCache:
+    """
+    Content-addressed on-disk cache of IPFS files, bounded to `max_bytes` with
+    least-recently-used eviction (a hit refreshes the file's mtime). Entries are
+    written to a temp file and renamed into place, so readers never see a
+    partial file and several workers can share the directory.
+
+    The directory is only walked when the size this process tracks passes
+    max_bytes, or when the last walk is RESCAN_SECONDS old (other workers add
+    files it does not see).
+    """
+
+    RESCAN_SECONDS = 60
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        self._size = None
+        self._scanned_at = 0.0
+
+    def path_for(self, cid):
+        return os.path.join(self.directory, cid[-2:], cid)
+
+    def get(self, cid):
+        """Path of the cached file, or None on a miss."""
+        path = self.path_for(cid)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def stream(self, cid, chunk_size=64 * 1024):
+        """
+        Starts Kubo's /api/v0/cat for `cid` (raising on connection or HTTP errors)
+        and returns a generator of its chunks that also writes them to the cache.
+        The entry is only kept if the download completes and, for CIDv0, hashes
+        back to `cid`.
+        """
+        response = ipfs_session.post(
+            f"{settings.IPFS_API_URL}/api/v0/cat",
+            params={'arg': cid},
+            stream=True,
+            timeout=(settings.HTTP_CONNECT_TIMEOUT, settings.IPFS_READ_TIMEOUT),
+        )
+        response.raise_for_status()
+        return self._tee(cid, response, chunk_size)
+
+    def _tee(self, cid, response, chunk_size):
+        path = self.path_for(cid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        verifier = CIDv0Builder() if cid.startswith('Qm') else None
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.partial-')
+        try:
+            size = 0
+            with os.fdopen(fd, 'wb') as temp_file, response:
+                for chunk in response.iter_content(chunk_size):
+                    temp_file.write(chunk)
+                    size += len(chunk)
+                    if verifier:
+                        verifier.update(chunk)
+                    yield chunk
+            if verifier and verifier.cid() != cid:
+                raise ContentMismatch(f"Content from IPFS does not match {cid}")
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.added(size)
+
+    def fetch(self, cid):
+        """Path of the cached file, downloading it first on a miss."""
+        path = self.get(cid)
+        if path is None:
+            for _ in self.stream(cid):
+                pass
+            path = self.path_for(cid)
+        return path
+
+    def added(self, size):
+        """Counts a new entry of `size` bytes, evicting once the cache may be over max_bytes."""
+        with self._evict_lock:
+            if self._size is not None and time.monotonic() - self._scanned_at < self.RESCAN_SECONDS:
+                self._size += size
+                if self._size <= self.max_bytes:
+                    return
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        with self._evict_lock:
+            scanned_at = time.monotonic()
+            entries = []
+            total = 0
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.startswith('.partial-'):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+                    total += stat.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+            self._size = total
+            self._scanned_at = scanned_at
+
+
+ipfs_cache = IPFSContentCache(settings.IPFS_CACHE_DIR, settings.IPFS_CACHE_MAX_BYTES)
@@ -1,21 +1,255 @@
-import requests
+import hashlib
+import queue
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from .cid import CIDv0Builder
+from .models import ContentHash
+from .transport import ipfs_session, backoff_delay, is_retryable
+
+# Chunks buffered between the request parser and the Kubo upload; a slow IPFS
+# node blocks the parser instead of growing memory
+STREAM_QUEUE_DEPTH = 4
+
+# Clients that know the SHA-256 of the file up front can send it in this header;
+# content already on IPFS is then hashed locally and never re-sent to Kubo
+CONTENT_SHA256_HEADER = 'HTTP_X_CONTENT_SHA256'
+
+_END = object()
+_ABORT = object()
+
+
+class ContentDigestMismatch(ValueError):
+    """The uploaded bytes do not hash to the SHA-256 the client declared."""
+
+
+def file_digest(file):
+    """(sha256 hex digest, size in bytes) of a file-like object, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    for chunk in iter(lambda: file.read(settings.IPFS_STREAM_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def known_cid(sha256):
+    return ContentHash.objects.filter(sha256=sha256).values_list('cid', flat=True).first()
+
+
+def remember_cid(sha256, cid, size):
+    ContentHash.objects.get_or_create(sha256=sha256, defaults={'cid': cid, 'size': size})
+
 
 def upload_file_to_ipfs(file):
     """
     Uploads a file to IPFS via the local Kubo HTTP API.
 
+    Uses the pooled keep-alive session with connect/read timeouts. Adding the
+    same bytes always yields the same CID, so timeouts are retried with backoff.
+    Content seen before (by SHA-256) and files already streamed by
+    IPFSStreamingUploadHandler are not sent again.
+
     Args:
         file: Django UploadedFile or file-like object
 
     Returns:
         str: CID of the uploaded file
+
+    Raises:
+        ContentDigestMismatch: a streamed file does not match its X-Content-SHA256
+    """
+    if isinstance(file, IPFSUploadedFile):
+        if file.declared_sha256 and file.declared_sha256 != file.sha256:
+            raise ContentDigestMismatch(f"File content does not match X-Content-SHA256 {file.declared_sha256}")
+        return file.cid
+
+    sha256, size = file_digest(file)
+    cid = known_cid(sha256)
+    if cid:
+        return cid
+
+    attempt = 0
+    while True:
+        try:
+            file.seek(0)  # Ensure file pointer is at start
+            files = {'file': (file.name, file)}
+            response = ipfs_session.post(
+                f"{settings.IPFS_API_URL}/api/v0/add",
+                files=files,
+                timeout=(settings.HTTP_CONNECT_TIMEOUT, settings.IPFS_READ_TIMEOUT),
+            )
+            response.raise_for_status()
+            cid = response.json()['Hash']
+            remember_cid(sha256, cid, size)
+            return cid
+        except Exception as e:
+            if attempt < settings.HTTP_RETRIES and is_retryable(e):
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            print(f"IPFS upload error: {e}")
+            return None
+
+
+class HashedUploadedFile(UploadedFile):
+    """An upload that was only hashed while the request was parsed; there is no local copy to read."""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra, cid, sha256):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.cid = cid
+        self.sha256 = sha256
+
+
+class IPFSUploadedFile(HashedUploadedFile):
+    """An upload that went straight to IPFS while the request was parsed; `cid` is None if that failed."""
+
+    def __init__(self, *args, declared_sha256='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.declared_sha256 = declared_sha256
+
+
+class IPFSStreamingUploadHandler(FileUploadHandler):
+    """
+    Forwards each uploaded file chunk by chunk into a chunked multipart request
+    to Kubo's /api/v0/add, hashing it with SHA-256 on the way through. Memory per
+    upload is bounded by chunk_size * STREAM_QUEUE_DEPTH, whatever the file size.
+    If the request declares a digest whose CID is already known, the file is
+    only hashed to confirm it and Kubo is not called.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.IPFS_STREAM_CHUNK_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.chunks = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+        self.result = {}
+        self.claimed_sha256 = self.request.META.get(CONTENT_SHA256_HEADER, '').lower()
+        self.known_cid = known_cid(self.claimed_sha256) if self.claimed_sha256 else None
+        self.uploader = None
+        if not self.known_cid:
+            self.uploader = threading.Thread(target=self._upload, name="ipfs-stream-upload", daemon=True)
+            self.uploader.start()
+
+    def _multipart_body(self, boundary):
+        filename = self.file_name.replace('"', '')
+        yield (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode()
+        while True:
+            chunk = self.chunks.get()
+            if chunk is _END:
+                break
+            if chunk is _ABORT:
+                raise IOError("Upload interrupted by the client")
+            yield chunk
+        yield f'\r\n--{boundary}--\r\n'.encode()
+
+    def _upload(self):
+        boundary = uuid.uuid4().hex
+        try:
+            # A generator body is sent with Transfer-Encoding: chunked
+            response = ipfs_session.post(
+                f"{settings.IPFS_API_URL}/api/v0/add",
+                data=self._multipart_body(boundary),
+                headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+                timeout=(settings.HTTP_CONNECT_TIMEOUT, settings.IPFS_READ_TIMEOUT),
+            )
+            response.raise_for_status()
+            self.result['cid'] = response.json()['Hash']
+        except Exception as e:
+            # The bytes are gone once streamed, so unlike upload_file_to_ipfs there is no retry
+            print(f"IPFS upload error: {e}")
+
+    def _put(self, item):
+        while self.uploader is not None and self.uploader.is_alive():
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+        # Known content, or the upload already failed: keep hashing, drop the bytes
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        self._put(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        sha256 = self.digest.hexdigest()
+        if self.uploader is None:
+            # A mismatch is reported by upload_file_to_ipfs
+            cid = self.known_cid if sha256 == self.claimed_sha256 else None
+        else:
+            self._put(_END)
+            self.uploader.join()
+            cid = self.result.get('cid')
+            if cid:
+                remember_cid(sha256, cid, file_size)
+
+        return IPFSUploadedFile(
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+            cid=cid,
+            sha256=sha256,
+            declared_sha256=self.claimed_sha256,
+        )
+
+    def upload_interrupted(self):
+        if getattr(self, 'uploader', None) is not None:
+            self._put(_ABORT)
+            self.uploader.join()
+
+
+class ContentHashingUploadHandler(FileUploadHandler):
     """
-    try:
-        file.seek(0)  # Ensure file pointer is at start
-        files = {'file': (file.name, file)}
-        response = requests.post('http://127.0.0.1:5001/api/v0/add', files=files)
-        response.raise_for_status()
-        return response.json()['Hash']
-    except Exception as e:
-        print(f"IPFS upload error: {e}")
+    Computes the CID Kubo would assign to each uploaded file, and its SHA-256,
+    without uploading or keeping the bytes.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.IPFS_STREAM_CHUNK_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.cid_builder = CIDv0Builder()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        self.cid_builder.update(raw_data)
         return None
+
+    def file_complete(self, file_size):
+        return HashedUploadedFile(
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+            cid=self.cid_builder.cid(),
+            sha256=self.digest.hexdigest(),
+        )
+
+
+def hash_uploads_locally(request):
+    """Install ContentHashingUploadHandler on a request before its body is parsed."""
+    request.upload_handlers = [ContentHashingUploadHandler(request)]
+
+
+def stream_uploads_to_ipfs(request):
+    """Install IPFSStreamingUploadHandler on a request before its body is parsed."""
+    request.upload_handlers = [IPFSStreamingUploadHandler(request)]
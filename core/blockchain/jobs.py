@@ -0,0 +1,266 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import TransactionJob
+from .nonces import resync_nonce
+from .services import (
+    find_transaction,
+    get_receipt,
+    get_web3,
+    parse_document_batch_receipt,
+    submit_document_batch,
+    submit_document_to_chain,
+)
+
+
+def _fail(jobs, error):
+    for job in jobs:
+        job.status = 'failed'
+        job.error = error
+    TransactionJob.objects.bulk_update(jobs, ['status', 'error'])
+
+
+def _items(jobs):
+    """(ipfs_hash, receiver address, title) of each job's document; uploads are stored for their owner."""
+    items = []
+    for job in jobs:
+        doc = job.document
+        receiver = job.authority_document.receiver if job.authority_document else job.submitted_by
+        items.append((doc.ipfs_hash, receiver.blockchain_address, doc.title))
+    return items
+
+
+def _mark_submitting(jobs, nonce, tx_hash):
+    # Committed before the transaction leaves the process: call outside transaction.atomic()
+    now = timezone.now()
+    for position, job in enumerate(jobs):
+        job.status = 'submitting'
+        job.nonce = nonce
+        job.tx_hash = tx_hash
+        job.batch_position = position
+        job.submitted_at = now
+    TransactionJob.objects.bulk_update(jobs, ['status', 'nonce', 'tx_hash', 'batch_position', 'submitted_at'])
+
+
+def _mark_pending(jobs, tx_hash):
+    with transaction.atomic():
+        for job in jobs:
+            job.tx_hash = tx_hash
+            job.status = 'pending'
+            job.document.tx_hash = tx_hash
+            job.document.save(update_fields=['tx_hash'])
+        TransactionJob.objects.bulk_update(jobs, ['tx_hash', 'status'])
+
+
+def _discard_documents(jobs):
+    # Imported here: documents imports this module
+    from documents.counters import discard_documents
+
+    with transaction.atomic():
+        discard_documents([job.document for job in jobs if job.document is not None])
+
+
+def _broadcast(jobs, send):
+    """
+    Broadcasts queued jobs of a single sender with `send(before_send)`, which
+    returns the transaction hash, and marks them pending. When the send fails
+    the jobs are failed and their documents deleted and uncounted, so a retry
+    issues afresh instead of meeting an orphan in the duplicate check.
+
+    The jobs are first saved as 'submitting' with the signed transaction's nonce
+    and hash (and each job's position, to find its DocumentStored event later).
+    A crash or database error after the broadcast therefore leaves them for
+    reconcile_submitting_jobs rather than in the queue, where they would be
+    broadcast again.
+    """
+    try:
+        tx_hash = send(lambda nonce, tx_hash: _mark_submitting(jobs, nonce, tx_hash))
+    except Exception as e:
+        _fail(jobs, str(e))
+        _discard_documents(jobs)
+        return
+    _mark_pending(jobs, tx_hash)
+
+
+def submit_job(job):
+    """
+    Broadcasts one queued job as a storeDocument transaction, unless another
+    process has already claimed it.
+    """
+    claimed = TransactionJob.objects.filter(id=job.id, status='queued').update(
+        status='submitting', submitted_at=timezone.now()
+    )
+    if not claimed:
+        return
+    sender = job.submitted_by
+    [(ipfs_hash, receiver_address, title)] = _items([job])
+    _broadcast([job], lambda before_send: submit_document_to_chain(
+        ipfs_hash, sender.blockchain_address, receiver_address, title, sender.private_key, before_send
+    ))
+
+
+def submit_batch(jobs):
+    """Broadcasts queued jobs of a single sender as one storeDocuments transaction."""
+    sender = jobs[0].submitted_by
+    _broadcast(jobs, lambda before_send: submit_document_batch(
+        _items(jobs), sender.blockchain_address, sender.private_key, before_send
+    ))
+
+
+def flush_queued_jobs(window, max_size):
+    """
+    Groups queued jobs per sender and submits every group that is full or whose
+    oldest job has waited `window` seconds. Only one flusher should run at a time.
+    Returns the number of jobs submitted.
+    """
+    queued = (
+        TransactionJob.objects.filter(status='queued')
+        .select_related('submitted_by', 'authority_document__receiver', 'user_document')
+        .order_by('created_at')
+    )
+    by_sender = defaultdict(list)
+    for job in queued:
+        by_sender[job.submitted_by_id].append(job)
+
+    now = timezone.now()
+    submitted = 0
+    for jobs in by_sender.values():
+        for start in range(0, len(jobs), max_size):
+            batch = jobs[start:start + max_size]
+            if len(batch) < max_size and (now - batch[0].created_at).total_seconds() < window:
+                continue
+            submit_batch(batch)
+            submitted += len(batch)
+    return submitted
+
+
+def submit_stale_jobs(min_age):
+    """
+    Without batching the views broadcast their own jobs; this sends the ones
+    still queued after `min_age` seconds (the process died first, or
+    reconcile_submitting_jobs put them back). Returns the number submitted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=min_age)
+    stale = list(
+        TransactionJob.objects.filter(status='queued', created_at__lt=cutoff)
+        .select_related('submitted_by', 'authority_document__receiver', 'user_document')
+        .order_by('created_at')
+    )
+    for job in stale:
+        submit_job(job)
+    return len(stale)
+
+
+def _was_broadcast(job):
+    """
+    True if the job's transaction reached the node, False if it never will be
+    mined, None while that cannot be told. Nonce counts are read before the
+    transaction itself, so a transaction mined in between is not missed.
+    """
+    if not job.tx_hash:
+        # Claimed, but the process died before signing
+        return False
+
+    web3 = get_web3()
+    address = job.submitted_by.blockchain_address
+    if web3.eth.get_transaction_count(address, 'latest') > job.nonce:
+        # The nonce is used up: by this transaction only if it has a receipt
+        return get_receipt(job.tx_hash) is not None
+    if find_transaction(job.tx_hash) is not None:
+        return True
+    if web3.eth.get_transaction_count(address, 'pending') > job.nonce:
+        # Something the node does not show by hash is pending with this nonce
+        return None
+    return False
+
+
+def reconcile_submitting_jobs(min_age):
+    """
+    Resolves jobs left 'submitting' for more than `min_age` seconds by a crash
+    between recording and broadcasting a transaction, or between broadcasting it
+    and marking the jobs pending. Transactions that reached the node make their
+    jobs pending, for confirm_pending_jobs to settle. Jobs whose transaction never
+    got there are queued again and the sender's nonce counter is resynced.
+    Returns the number of jobs resolved.
+    """
+    cutoff = timezone.now() - timedelta(seconds=min_age)
+    jobs = (
+        TransactionJob.objects.filter(status='submitting', submitted_at__lt=cutoff)
+        .select_related('submitted_by', 'authority_document', 'user_document')
+    )
+    by_tx = defaultdict(list)
+    for job in jobs:
+        by_tx[(job.submitted_by_id, job.tx_hash)].append(job)
+
+    resolved = 0
+    for (_, tx_hash), tx_jobs in by_tx.items():
+        broadcast = _was_broadcast(tx_jobs[0])
+        if broadcast is None:
+            continue
+        if broadcast:
+            _mark_pending(tx_jobs, tx_hash)
+        else:
+            for job in tx_jobs:
+                job.status = 'queued'
+                job.tx_hash = ''
+                job.nonce = None
+                job.submitted_at = None
+            TransactionJob.objects.bulk_update(tx_jobs, ['status', 'tx_hash', 'nonce', 'submitted_at'])
+            resync_nonce(get_web3(), tx_jobs[0].submitted_by.blockchain_address)
+        resolved += len(tx_jobs)
+    return resolved
+
+
+def settle_jobs(jobs, receipt):
+    """Records the outcome of a mined transaction on every job that was part of it."""
+    try:
+        stored = parse_document_batch_receipt(receipt)
+    except Exception as e:
+        _fail(jobs, str(e))
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        for job in jobs:
+            if job.batch_position >= len(stored):
+                _fail([job], "DocumentStored event not found in transaction logs")
+                continue
+
+            doc = job.document
+            if doc is not None:
+                doc.document_index, doc.block_tx_hash = stored[job.batch_position]
+                doc.save(update_fields=['document_index', 'block_tx_hash'])
+
+            job.status = 'confirmed'
+            job.confirmed_at = now
+            job.save(update_fields=['status', 'confirmed_at'])
+
+
+def confirm_pending_jobs(limit=100, timeout=None):
+    """
+    Checks the oldest pending jobs against the node, one receipt lookup per
+    transaction. Returns how many jobs were settled.
+    """
+    jobs = (
+        TransactionJob.objects.filter(status='pending')
+        .select_related('authority_document', 'user_document')
+        .order_by('created_at')[:limit]
+    )
+    by_tx = defaultdict(list)
+    for job in jobs:
+        by_tx[job.tx_hash].append(job)
+
+    settled = 0
+    now = timezone.now()
+    for tx_hash, tx_jobs in by_tx.items():
+        receipt = get_receipt(tx_hash)
+        if receipt is None:
+            if timeout and (now - tx_jobs[0].created_at).total_seconds() > timeout:
+                _fail(tx_jobs, f"Transaction not mined after {timeout} seconds")
+                settled += len(tx_jobs)
+            continue
+
+        settle_jobs(tx_jobs, receipt)
+        settled += len(tx_jobs)
+    return settled
@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from hexbytes import HexBytes
+from blockchain.services import get_web3, store_document_on_chain, submit_document_batch, parse_document_batch_receipt
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares documents/second and gas/document of one-at-a-time storeDocument "
+        "against batched storeDocuments on the configured node. Writes to the chain only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('public_id', help="Funded account used as issuer and receiver")
+        parser.add_argument('--count', type=int, default=50, help="Documents stored per mode")
+        parser.add_argument('--batch-size', type=int, default=25)
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(public_id=options['public_id'])
+        except CustomUser.DoesNotExist:
+            raise CommandError("User not found")
+
+        web3 = get_web3()
+
+        count = options['count']
+        address = user.blockchain_address
+        items = [(f"bench-cid-{i}", address, f"Benchmark document {i}") for i in range(count)]
+
+        # One transaction and one receipt wait per document (current path)
+        start = time.perf_counter()
+        gas_used = 0
+        for ipfs_hash, receiver, title in items:
+            tx_hash, _, _ = store_document_on_chain(ipfs_hash, address, receiver, title, user.private_key)
+            gas_used += web3.eth.get_transaction_receipt(HexBytes(tx_hash)).gasUsed
+        self.report("single", count, time.perf_counter() - start, gas_used, count)
+
+        # All batches broadcast back to back, then wait for their receipts
+        start = time.perf_counter()
+        size = options['batch_size']
+        tx_hashes = [
+            submit_document_batch(items[i:i + size], address, user.private_key)
+            for i in range(0, count, size)
+        ]
+        gas_used = 0
+        for tx_hash in tx_hashes:
+            receipt = web3.eth.wait_for_transaction_receipt(HexBytes(tx_hash))
+            parse_document_batch_receipt(receipt)
+            gas_used += receipt.gasUsed
+        self.report(f"batch({size})", count, time.perf_counter() - start, gas_used, len(tx_hashes))
+
+    def report(self, mode, count, elapsed, gas_used, transactions):
+        self.stdout.write(
+            f"{mode:<12} docs={count} txs={transactions} time={elapsed:.2f}s "
+            f"docs/s={count / elapsed:.1f} gas/doc={gas_used // count}"
+        )
@@ -0,0 +1,82 @@
+import statistics
+import time
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+from blockchain.services import store_document_on_chain, warm_up
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests/second and latency percentiles of the issue, verify and flag endpoints, "
+        "driven in-process through the full Django stack. Meant for CHAIN_BACKEND=simulated; "
+        "creates benchmark users and documents in the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=50, help="Requests per endpoint")
+        parser.add_argument(
+            '--skip-issue', action='store_true',
+            help="Store the documents directly on-chain instead of through the issue endpoint (no IPFS node)",
+        )
+
+    def handle(self, *args, **options):
+        if settings.CHAIN_BACKEND != 'simulated':
+            self.stderr.write("CHAIN_BACKEND is not 'simulated': this writes to the configured node")
+        # Start (and, when simulated, deploy) the chain outside the timed requests
+        warm_up()
+
+        authority, _ = CustomUser.objects.get_or_create(
+            username='benchmark-authority', defaults={'role': 'authority', 'is_verified_authority': True}
+        )
+        receiver, _ = CustomUser.objects.get_or_create(username='benchmark-user', defaults={'role': 'user'})
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost').lstrip('.')
+        client = Client(HTTP_HOST=host, HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(authority)}")
+        count = options['count']
+
+        if options['skip_issue']:
+            indices = [
+                store_document_on_chain(
+                    f"bench-cid-{i}", authority.blockchain_address, receiver.blockchain_address,
+                    f"Benchmark document {i}", authority.private_key,
+                )[1]
+                for i in range(count)
+            ]
+        else:
+            responses = self.run("issue", count, lambda i: client.post('/api/documents/issue/', {
+                'receiver_id': receiver.public_id,
+                'title': f"Benchmark document {i}",
+                'file': SimpleUploadedFile(f"bench-{i}.txt", f"benchmark {time.time_ns()} {i}".encode()),
+                'async': 'false',
+            }))
+            indices = [response.json()['document']['document_index'] for response in responses]
+
+        self.run("verify", count, lambda i: client.post(
+            '/api/blockchain/verify/', {'index': str(indices[i % len(indices)])}, content_type='application/json'
+        ))
+        self.run("flag", count, lambda i: client.post(
+            '/api/blockchain/flag/', {'index': indices[i % len(indices)], 'flag': True}, content_type='application/json'
+        ))
+
+    def run(self, name, count, send):
+        responses, latencies = [], []
+        start = time.perf_counter()
+        for i in range(count):
+            sent = time.perf_counter()
+            response = send(i)
+            latencies.append(time.perf_counter() - sent)
+            if response.status_code >= 300:
+                raise CommandError(f"{name} returned {response.status_code}: {response.content[:200]!r}")
+            responses.append(response)
+        elapsed = time.perf_counter() - start
+
+        percentiles = statistics.quantiles(latencies, n=100) if count > 1 else latencies * 99
+        self.stdout.write(
+            f"{name:<8} n={count} req/s={count / elapsed:.1f} "
+            f"p50={percentiles[49] * 1000:.1f}ms p95={percentiles[94] * 1000:.1f}ms"
+        )
+        return responses
@@ -0,0 +1,53 @@
+from collections import Counter
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from blockchain.services import get_web3, store_document_on_chain
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Counts JSON-RPC calls per storeDocument issuance on the configured node, "
+        "with the shared gas/fee cache and with estimation on every request. "
+        "Clears the Django cache, so point it at a development node and cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('public_id', help="Funded account used as issuer and receiver")
+        parser.add_argument('--count', type=int, default=20, help="Issuances per mode")
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(public_id=options['public_id'])
+        except CustomUser.DoesNotExist:
+            raise CommandError("User not found")
+
+        web3 = get_web3()
+
+        calls = Counter()
+        make_request = web3.provider.make_request
+
+        def counting_make_request(method, params):
+            calls[method] += 1
+            return make_request(method, params)
+
+        web3.provider.make_request = counting_make_request
+        try:
+            for mode, use_cache in (("uncached", False), ("cached", True)):
+                calls.clear()
+                cache.clear()
+                for i in range(options['count']):
+                    if not use_cache:
+                        cache.clear()
+                    store_document_on_chain(
+                        f"bench-cid-{i}", user.blockchain_address, user.blockchain_address,
+                        f"RPC benchmark {i}", user.private_key,
+                    )
+                self.report(mode, calls, options['count'])
+        finally:
+            web3.provider.make_request = make_request
+
+    def report(self, mode, calls, count):
+        self.stdout.write(f"{mode}: {sum(calls.values()) / count:.2f} RPC calls per issuance")
+        for method, total in sorted(calls.items()):
+            self.stdout.write(f"  {method:<32} {total / count:.2f}")
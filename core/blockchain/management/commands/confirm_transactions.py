@@ -0,0 +1,46 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blockchain.jobs import confirm_pending_jobs, flush_queued_jobs, reconcile_submitting_jobs, submit_stale_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Submits queued documents in batches and watches receipts of asynchronously "
+        "issued documents to fill in their on-chain index. Run a single instance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls")
+        parser.add_argument('--batch-size', type=int, default=100, help="Pending jobs checked per poll")
+        parser.add_argument('--timeout', type=int, default=600, help="Fail jobs not mined after this many seconds")
+        parser.add_argument(
+            '--stale-after', type=int, default=120,
+            help="Seconds before an unfinished submission is checked against the node, and "
+                 "(without CHAIN_BATCHING) before a job left queued is sent",
+        )
+        parser.add_argument('--once', action='store_true', help="Run a single poll and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            # Jobs whose submitter died mid-broadcast: pending if the node has the
+            # transaction, queued again if it never got there
+            reconciled = reconcile_submitting_jobs(options['stale_after'])
+            if reconciled:
+                self.stdout.write(f"Reconciled {reconciled} interrupted submission(s)")
+
+            # Without batching the views broadcast their own jobs right after queueing them
+            if settings.CHAIN_BATCHING:
+                submitted = flush_queued_jobs(settings.CHAIN_BATCH_WINDOW, settings.CHAIN_BATCH_MAX_SIZE)
+            else:
+                submitted = submit_stale_jobs(options['stale_after'])
+            if submitted:
+                self.stdout.write(f"Submitted {submitted} queued document(s)")
+
+            settled = confirm_pending_jobs(limit=options['batch_size'], timeout=options['timeout'])
+            if settled:
+                self.stdout.write(f"Settled {settled} transaction job(s)")
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from blockchain.indexer import sync_mirror
+
+
+class Command(BaseCommand):
+    help = "Tails DocumentStored/DocumentFlagged logs into the local ChainDocument mirror."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Blocks per get_logs call")
+        parser.add_argument('--confirmations', type=int, default=0, help="Stay this many blocks behind the head")
+        parser.add_argument('--reorg-depth', type=int, default=12, help="Blocks to rewind when a reorg is detected")
+        parser.add_argument('--from-block', type=int, default=0, help="First block to index on an empty checkpoint")
+        parser.add_argument('--follow', action='store_true', help="Keep polling for new blocks")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls with --follow")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = sync_mirror(
+                chunk_size=options['chunk_size'],
+                confirmations=options['confirmations'],
+                reorg_depth=options['reorg_depth'],
+                start_block=options['from_block'],
+            )
+            if processed:
+                self.stdout.write(f"Indexed {processed} event(s)")
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0003_transactionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactionjob',
+            name='batch_position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='transactionjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('pending', 'Pending'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='transactionjob',
+            name='tx_hash',
+            field=models.CharField(blank=True, max_length=66),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0004_transactionjob_batching'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveBigIntegerField(unique=True)),
+                ('ipfs_hash', models.CharField(max_length=255)),
+                ('issuer', models.CharField(db_index=True, max_length=42)),
+                ('receiver', models.CharField(db_index=True, max_length=42)),
+                ('title', models.TextField()),
+                ('timestamp', models.PositiveBigIntegerField()),
+                ('flagged', models.BooleanField(default=False)),
+                ('tx_hash', models.CharField(max_length=66, unique=True)),
+                ('eth_tx_hash', models.CharField(max_length=66)),
+                ('block_number', models.PositiveBigIntegerField(db_index=True)),
+                ('flag_block', models.PositiveBigIntegerField(blank=True, db_index=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IndexerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('block_number', models.BigIntegerField(default=-1)),
+                ('block_hash', models.CharField(blank=True, max_length=66)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
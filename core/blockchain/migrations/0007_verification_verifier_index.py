@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0006_contenthash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='verificationhistory',
+            index=models.Index(fields=['verifier', 'verified_at'], name='blockchain__verifie_e28a24_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0007_verification_verifier_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactionjob',
+            name='nonce',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transactionjob',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transactionjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('submitting', 'Submitting'), ('pending', 'Pending'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=10),
+        ),
+    ]
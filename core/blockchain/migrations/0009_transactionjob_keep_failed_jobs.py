@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0008_transactionjob_submitting'),
+        ('documents', '0015_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transactionjob',
+            name='authority_document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transaction_jobs', to='documents.authorityissueddocument'),
+        ),
+        migrations.AlterField(
+            model_name='transactionjob',
+            name='user_document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transaction_jobs', to='documents.useruploadeddocument'),
+        ),
+    ]
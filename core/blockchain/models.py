@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.conf import settings
 
@@ -15,6 +16,12 @@ class VerificationHistory(models.Model):
     success = models.BooleanField()
     response_data = models.JSONField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Log listing filtered by verifier, newest first
+            models.Index(fields=['verifier', 'verified_at']),
+        ]
+
     def __str__(self):
         return f"Verification by {self.verifier} on {self.verified_user} at {self.verified_at} - Success: {self.success}"
 
@@ -32,3 +39,87 @@ class FlagHistory(models.Model):
 
     def __str__(self):
         return f"Document {self.document_index} flagged={self.flag_status} by {self.actor}"
+
+
+class NonceTracker(models.Model):
+    address = models.CharField(max_length=42, unique=True)
+    next_nonce = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.address} -> next nonce {self.next_nonce}"
+
+
+class TransactionJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        # Signed and recorded, being broadcast; see jobs.reconcile_submitting_jobs
+        ('submitting', 'Submitting'),
+        ('pending', 'Pending'),
+        ('confirmed', 'Confirmed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    submitted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transaction_jobs')
+    tx_hash = models.CharField(max_length=66, blank=True)
+    batch_position = models.PositiveIntegerField(default=0)
+    nonce = models.PositiveBigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    # A failed job outlives the document it discarded (see jobs._broadcast), so its error can still be polled
+    authority_document = models.ForeignKey(
+        'documents.AuthorityIssuedDocument', on_delete=models.SET_NULL, related_name='transaction_jobs', null=True, blank=True
+    )
+    user_document = models.ForeignKey(
+        'documents.UserUploadedDocument', on_delete=models.SET_NULL, related_name='transaction_jobs', null=True, blank=True
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    confirmed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def document(self):
+        return self.authority_document or self.user_document
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status}) tx={self.tx_hash}"
+
+
+class ChainDocument(models.Model):
+    """Local mirror of DocumentStorage.documents, filled by the index_chain_events command."""
+    index = models.PositiveBigIntegerField(unique=True)
+    ipfs_hash = models.CharField(max_length=255)
+    issuer = models.CharField(max_length=42, db_index=True)
+    receiver = models.CharField(max_length=42, db_index=True)
+    title = models.TextField()
+    timestamp = models.PositiveBigIntegerField()
+    flagged = models.BooleanField(default=False)
+    tx_hash = models.CharField(max_length=66, unique=True)  # contract-generated keccak txHash
+    eth_tx_hash = models.CharField(max_length=66)
+    block_number = models.PositiveBigIntegerField(db_index=True)
+    flag_block = models.PositiveBigIntegerField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"Chain document {self.index}: {self.title}"
+
+
+class IndexerCheckpoint(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    block_number = models.BigIntegerField(default=-1)
+    block_hash = models.CharField(max_length=66, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ block {self.block_number}"
+
+
+class ContentHash(models.Model):
+    """SHA-256 of uploaded bytes -> the CID Kubo returned for them."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    cid = models.CharField(max_length=255, db_index=True)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]}... -> {self.cid}"
@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models import F
+from .models import NonceTracker
+
+
+def _chain_nonce(web3, address):
+    return web3.eth.get_transaction_count(address, 'pending')
+
+
+def is_nonce_error(exc):
+    """
+    True when the node rejected a transaction because of its nonce
+    ("nonce too low", Ganache's "doesn't have the correct nonce", or another
+    pending transaction already using it).
+    """
+    message = str(exc).lower()
+    return 'nonce' in message or 'replacement transaction' in message
+
+
+def allocate_nonce(web3, address):
+    """
+    Hands out the next nonce for `address`, shared across worker processes.
+
+    The UPDATE takes the row lock (SQLite's write lock) before the value is read
+    back, so two workers can never receive the same nonce. The node is only
+    asked once, when the address is seen for the first time.
+    """
+    while True:
+        with transaction.atomic():
+            if NonceTracker.objects.filter(address=address).update(next_nonce=F('next_nonce') + 1):
+                return NonceTracker.objects.get(address=address).next_nonce - 1
+        NonceTracker.objects.get_or_create(
+            address=address,
+            defaults={'next_nonce': _chain_nonce(web3, address)},
+        )
+
+
+def resync_nonce(web3, address):
+    """
+    Realigns the local counter with the node's pending transaction count.
+    Called after a gap or a "nonce too low" rejection.
+    """
+    chain_nonce = _chain_nonce(web3, address)
+    NonceTracker.objects.update_or_create(address=address, defaults={'next_nonce': chain_nonce})
+    return chain_nonce
+
+
+def release_nonce(web3, address, nonce):
+    """
+    Gives back a nonce whose transaction never reached the node.
+    If later nonces were already handed out this leaves a gap, so resync instead.
+    """
+    if not NonceTracker.objects.filter(address=address, next_nonce=nonce + 1).update(next_nonce=nonce):
+        resync_nonce(web3, address)
@@ -0,0 +1,41 @@
+import time
+from web3 import HTTPProvider
+from web3._utils.http_session_manager import HTTPSessionManager
+from django.conf import settings
+from .transport import IDEMPOTENT_RPC_METHODS, backoff_delay, is_retryable
+
+
+class SharedSessionManager(HTTPSessionManager):
+    """
+    web3 caches one requests.Session per thread and hands the session passed to
+    the provider only to the thread that built it; every other thread would get a
+    plain Session without the pool and connect retries. This hands `session` to all.
+    """
+
+    def __init__(self, session):
+        super().__init__()
+        self.session = session
+
+    def cache_and_return_session(self, endpoint_uri, session=None, request_timeout=None):
+        return self.session
+
+
+class RetryingHTTPProvider(HTTPProvider):
+    """HTTPProvider that retries idempotent JSON-RPC calls with jittered backoff."""
+
+    def __init__(self, endpoint_uri, session, **kwargs):
+        super().__init__(endpoint_uri, **kwargs)
+        self._request_session_manager = SharedSessionManager(session)
+
+    def _make_request(self, method, request_data):
+        attempt = 0
+        while True:
+            try:
+                return self._request_session_manager.make_post_request(
+                    self.endpoint_uri, request_data, **self.get_request_kwargs()
+                )
+            except Exception as e:
+                if method not in IDEMPOTENT_RPC_METHODS or attempt >= settings.HTTP_RETRIES or not is_retryable(e):
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
@@ -1,106 +1,354 @@
+import functools
 import json
 import os
-from web3 import Web3
+import threading
+import time
+from hexbytes import HexBytes
 from django.conf import settings
+from .cache import VerificationCache
+from .fees import estimate_gas, get_fee_params, invalidate_fees, is_fee_error
+from .nonces import allocate_nonce, release_nonce, resync_nonce, is_nonce_error
 
-# Load contract ABI
+# Contract ABI
 CONTRACT_ABI_PATH = os.path.join(settings.BASE_DIR, "blockchain", "abi", "DocumentStorageABI.json")
-with open(CONTRACT_ABI_PATH) as abi_file:
-    CONTRACT_ABI = json.load(abi_file)
 
 # Blockchain connection
 
 CONTRACT_ADDRESS = "0xa6f1e0ca00873bd219487F20E3F0edA24E82590D"  # Replace with your actual contract address
-GANACHE_URL = "http://127.0.0.1:7545"  # Update if using other node
+GANACHE_URL = settings.CHAIN_RPC_URL  # Update CHAIN_RPC_URL if using other node
 
-web3 = Web3(Web3.HTTPProvider(GANACHE_URL))
-contract = web3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
 
-# 🔹 Store a document on-chain
-def store_document_on_chain(ipfs_hash, issuer_address, receiver_address, title, issuer_private_key):
-    nonce = web3.eth.get_transaction_count(issuer_address)
-
-    txn = contract.functions.storeDocument(
-        ipfs_hash,
-        receiver_address,
-        title
-    ).build_transaction({
-        'chainId': 1337,
-        'gas': 3000000,
-        'gasPrice': web3.to_wei('50', 'gwei'),
-        'nonce': nonce,
-        'from': issuer_address,
-    })
-    
-    signed_txn = web3.eth.account.sign_transaction(txn, private_key=issuer_private_key)
-    tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
-    
+# 🔹 The web3 client and contract are built on first use so that importing this
+# module (every manage.py command, test run and worker boot) does not pay for web3
+@functools.cache
+def get_web3():
+    if settings.CHAIN_BACKEND == 'simulated':
+        from .simulated import get_simulated_chain
+        return get_simulated_chain().web3
+
+    from web3 import Web3
+    from .provider import RetryingHTTPProvider
+    from .transport import chain_session
+
+    return Web3(RetryingHTTPProvider(
+        GANACHE_URL,
+        session=chain_session,
+        request_kwargs={'timeout': (settings.HTTP_CONNECT_TIMEOUT, settings.CHAIN_READ_TIMEOUT)},
+        exception_retry_configuration=None,
+    ))
+
+
+@functools.cache
+def load_contract_abi():
+    with open(CONTRACT_ABI_PATH) as abi_file:
+        return json.load(abi_file)
+
+
+def get_contract_address():
+    if settings.CHAIN_BACKEND == 'simulated':
+        from .simulated import get_simulated_chain
+        return get_simulated_chain().contract_address
+    return CONTRACT_ADDRESS
+
+
+@functools.cache
+def get_contract():
+    return get_web3().eth.contract(address=get_contract_address(), abi=load_contract_abi())
+
+
+@functools.cache
+def get_chain_id():
+    return get_web3().eth.chain_id
+
+
+# 🔹 Build the client ahead of the first request, e.g. from a worker start hook
+def warm_up():
+    get_contract()
+
+
+# Retries after resyncing the nonce or refreshing fees when the node rejects a transaction
+SEND_RETRIES = 1
+
+
+# 🔹 Build, sign and broadcast a contract call with a locally allocated nonce.
+# `before_send(nonce, tx_hash)` runs once the transaction is signed, before it is
+# sent, so callers can record what is about to reach the chain.
+def send_contract_transaction(contract_call, sender_address, private_key, before_send=None, preflight=False):
+    if settings.CHAIN_BACKEND == 'simulated':
+        from .simulated import get_simulated_chain
+        get_simulated_chain().ensure_funded(sender_address)
+
+    # A fresh estimate (or, with `preflight`, an eth_call on a cached one) makes a
+    # reverting call fail before it takes a nonce. Without either, a revert only
+    # shows in the receipt, whose status every caller checks.
+    gas = estimate_gas(contract_call, sender_address, preflight)
+    attempt = 0
+    while True:
+        fees = get_fee_params(get_web3())
+        nonce = allocate_nonce(get_web3(), sender_address)
+        try:
+            txn = contract_call.build_transaction({
+                'chainId': get_chain_id(),
+                'gas': gas,
+                'nonce': nonce,
+                'from': sender_address,
+                **fees,
+            })
+            signed_txn = get_web3().eth.account.sign_transaction(txn, private_key=private_key)
+            if before_send:
+                before_send(nonce, signed_txn.hash.hex())
+        except Exception:
+            release_nonce(get_web3(), sender_address, nonce)
+            raise
+
+        try:
+            return get_web3().eth.send_raw_transaction(signed_txn.raw_transaction)
+        except Exception as e:
+            if attempt < SEND_RETRIES and is_nonce_error(e):
+                resync_nonce(get_web3(), sender_address)
+            elif attempt < SEND_RETRIES and is_fee_error(e):
+                release_nonce(get_web3(), sender_address, nonce)
+                invalidate_fees()
+            else:
+                release_nonce(get_web3(), sender_address, nonce)
+                raise
+            attempt += 1
+
+
+# 🔹 Broadcast a storeDocument transaction without waiting for it to be mined
+def submit_document_to_chain(ipfs_hash, issuer_address, receiver_address, title, issuer_private_key, before_send=None):
+    tx_hash = send_contract_transaction(
+        get_contract().functions.storeDocument(ipfs_hash, receiver_address, title),
+        issuer_address,
+        issuer_private_key,
+        before_send,
+    )
+    return tx_hash.hex()
+
+
+# 🔹 Broadcast one storeDocuments transaction for several (ipfs_hash, receiver_address, title) items
+def submit_document_batch(items, issuer_address, issuer_private_key, before_send=None):
+    ipfs_hashes, receivers, titles = (list(column) for column in zip(*items))
+    tx_hash = send_contract_transaction(
+        get_contract().functions.storeDocuments(ipfs_hashes, receivers, titles),
+        issuer_address,
+        issuer_private_key,
+        before_send,
+    )
+    return tx_hash.hex()
+
+
+# 🔹 Extract [(doc_id, contract txHash), ...] from a mined receipt, in emission order
+def parse_document_batch_receipt(receipt):
     if receipt.status != 1:
         raise Exception("Transaction failed")
 
-    # Extract event from receipt using web3's event processor
-    events = contract.events.DocumentStored().process_receipt(receipt)
+    # Extract events from receipt using web3's event processor
+    events = get_contract().events.DocumentStored().process_receipt(receipt)
     if not events:
         raise Exception("DocumentStored event not found in transaction logs")
 
-    doc_id = events[0]['args']['id']
-    block_tx_hash = events[0]['args']['txHash']  # This is the custom keccak256 hash stored in the contract
+    # txHash is the custom keccak256 hash stored in the contract
+    return [(event['args']['id'], event['args']['txHash'].hex()) for event in events]
+
+
+# 🔹 Extract (doc_id, contract txHash) from a mined storeDocument receipt
+def parse_document_receipt(receipt):
+    return parse_document_batch_receipt(receipt)[0]
+
+
+# 🔹 Non-blocking receipt lookup, returns None while the transaction is pending
+def get_receipt(tx_hash):
+    from web3.exceptions import TransactionNotFound
+
+    try:
+        return get_web3().eth.get_transaction_receipt(HexBytes(tx_hash))
+    except TransactionNotFound:
+        return None
+
+
+# 🔹 The transaction if the node knows it (mined or pending), else None
+def find_transaction(tx_hash):
+    from web3.exceptions import TransactionNotFound
+
+    try:
+        return get_web3().eth.get_transaction(HexBytes(tx_hash))
+    except TransactionNotFound:
+        return None
+
+
+# 🔹 Store a document on-chain
+def store_document_on_chain(ipfs_hash, issuer_address, receiver_address, title, issuer_private_key):
+    tx_hash = submit_document_to_chain(ipfs_hash, issuer_address, receiver_address, title, issuer_private_key)
+    receipt = get_web3().eth.wait_for_transaction_receipt(HexBytes(tx_hash))
+    doc_id, block_tx_hash = parse_document_receipt(receipt)
 
     # Return tx_hash (Ethereum tx hash), doc_id, and the contract-generated txHash as hex string
-    return tx_hash.hex(), doc_id, block_tx_hash.hex()
+    return tx_hash, doc_id, block_tx_hash
 
 
 # 🔹 Set or unset a document flag (must be issuer or receiver)
 def set_document_flag(index, actor_address, actor_private_key, flag_status):
-    nonce = web3.eth.get_transaction_count(actor_address)
-
-    txn = contract.functions.setFlag(
-        index,
+    tx_hash = send_contract_transaction(
+        get_contract().functions.setFlag(index, actor_address, flag_status),
         actor_address,
-        flag_status
-    ).build_transaction({
-        'chainId': 1337,
-        'gas': 3000000,
-        'gasPrice': web3.to_wei('50', 'gwei'),
-        'nonce': nonce,
-        'from': actor_address,
-    })
-
-    signed_txn = web3.eth.account.sign_transaction(txn, private_key=actor_private_key)
-    tx_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+        actor_private_key,
+        # Reverts for anyone but the issuer or receiver, which a cached estimate would not catch
+        preflight=True,
+    )
+    receipt = get_web3().eth.wait_for_transaction_receipt(tx_hash)
 
     if receipt.status != 1:
         raise Exception("Flag transaction failed")
 
+    verification_cache.invalidate_index(index)
     return receipt
 
 
 def get_document(index):
-    return contract.functions.getDocument(index).call()
+    return get_contract().functions.getDocument(index).call()
 
 
 def get_document_count():
-    return contract.functions.getDocumentCount().call()
+    return get_contract().functions.getDocumentCount().call()
 
 
 # 🔹 Verify document by index
 def verify_document_by_index(index):
-    result = contract.functions.verifyByIndex(index).call()
+    return format_index_result(get_contract().functions.verifyByIndex(index).call())
+
+
+def format_index_result(result):
     # result tuple from contract:
     # (bool exists, string ipfsHash, address issuer, address receiver, string title, uint256 timestamp, bool flagged, bytes32 txHash)
     # Convert txHash bytes32 to hex string for convenience
     exists, ipfsHash, issuer, receiver, title, timestamp, flagged, txHash = result
-    txHashHex = web3.to_hex(txHash) if txHash else None
+    txHashHex = get_web3().to_hex(txHash) if txHash else None
     return (exists, ipfsHash, issuer, receiver, title, timestamp, flagged, txHashHex)
 
 
 # 🔹 Verify document by tx hash (tx_hash_hex is hex string)
 def verify_document_by_tx_hash(tx_hash_hex):
-    tx_hash_bytes = web3.to_bytes(hexstr=tx_hash_hex)
-    result = contract.functions.verifyByTxHash(tx_hash_bytes).call()
+    tx_hash_bytes = get_web3().to_bytes(hexstr=tx_hash_hex)
+    return format_tx_hash_result(get_contract().functions.verifyByTxHash(tx_hash_bytes).call())
+
+
+def format_tx_hash_result(result):
     # result tuple from contract:
     # (bool exists, uint256 index, string ipfsHash, address issuer, address receiver, string title, uint256 timestamp, bool flagged)
     exists, index, ipfsHash, issuer, receiver, title, timestamp, flagged = result
     return (exists, index, ipfsHash, issuer, receiver, title, timestamp, flagged)
+
+
+# 🔹 Verification cache, shared by the single and bulk verify paths
+verification_cache = VerificationCache(settings.VERIFY_CACHE_SIZE, settings.VERIFY_CACHE_TTL)
+_flag_watch = {'block': None, 'checked_at': 0.0}
+_flag_watch_lock = threading.Lock()
+
+
+def invalidate_flagged_documents():
+    """
+    Polls DocumentFlagged logs at most every VERIFY_CACHE_FLAG_POLL seconds and
+    drops cached results of every document flagged since the previous poll.
+    """
+    if time.monotonic() - _flag_watch['checked_at'] < settings.VERIFY_CACHE_FLAG_POLL:
+        return
+
+    with _flag_watch_lock:
+        now = time.monotonic()
+        if now - _flag_watch['checked_at'] < settings.VERIFY_CACHE_FLAG_POLL:
+            return
+
+        latest = get_web3().eth.block_number
+        last_seen = _flag_watch['block']
+        if last_seen is not None and latest > last_seen:
+            for event in get_contract().events.DocumentFlagged().get_logs(from_block=last_seen + 1, to_block=latest):
+                verification_cache.invalidate_index(event['args']['id'])
+        elif last_seen is not None and latest < last_seen:
+            # Chain was reset or reorganised below our watermark
+            verification_cache.clear()
+
+        _flag_watch['block'] = latest
+        _flag_watch['checked_at'] = now
+
+
+def verification_cache_key(kind, value):
+    return (kind, value.lower() if kind == 'tx_hash' else value)
+
+
+# 🔹 Cached variants return (result, served_from_cache)
+def cached_verify_by_index(index):
+    invalidate_flagged_documents()
+    key = verification_cache_key('index', index)
+    result = verification_cache.get(key)
+    if result is not None:
+        return result, True
+
+    result = verify_document_by_index(index)
+    # Unknown indices may still be issued later, so only cache hits on-chain
+    if result[0]:
+        verification_cache.set(key, index, result)
+    return result, False
+
+
+def cached_verify_by_tx_hash(tx_hash_hex):
+    invalidate_flagged_documents()
+    key = verification_cache_key('tx_hash', tx_hash_hex)
+    result = verification_cache.get(key)
+    if result is not None:
+        return result, True
+
+    result = verify_document_by_tx_hash(tx_hash_hex)
+    if result[0]:
+        verification_cache.set(key, result[1], result)
+    return result, False
+
+
+# Max eth_calls packed into one JSON-RPC batch request
+VERIFY_BATCH_SIZE = 100
+
+
+# 🔹 Verify many documents with JSON-RPC batch requests
+def verify_documents_bulk(indices, tx_hashes):
+    """
+    Returns ({index: verifyByIndex result}, {tx_hash_hex: verifyByTxHash result}, cached)
+    where `cached` holds the ('index', n) / ('tx_hash', h) keys answered from the cache.
+    Misses cost one HTTP round trip per VERIFY_BATCH_SIZE contract calls.
+    """
+    invalidate_flagged_documents()
+
+    by_index, by_tx_hash, cached = {}, {}, set()
+    calls = []
+    for index in indices:
+        result = verification_cache.get(verification_cache_key('index', index))
+        if result is not None:
+            by_index[index] = result
+            cached.add(('index', index))
+        else:
+            calls.append(('index', index, get_contract().functions.verifyByIndex(index)))
+    for tx_hash_hex in tx_hashes:
+        result = verification_cache.get(verification_cache_key('tx_hash', tx_hash_hex))
+        if result is not None:
+            by_tx_hash[tx_hash_hex] = result
+            cached.add(('tx_hash', tx_hash_hex))
+        else:
+            calls.append(('tx_hash', tx_hash_hex, get_contract().functions.verifyByTxHash(get_web3().to_bytes(hexstr=tx_hash_hex))))
+
+    for start in range(0, len(calls), VERIFY_BATCH_SIZE):
+        chunk = calls[start:start + VERIFY_BATCH_SIZE]
+        with get_web3().batch_requests() as batch:
+            for _, _, call in chunk:
+                batch.add(call)
+            results = batch.execute()
+
+        for (kind, key, _), result in zip(chunk, results):
+            if kind == 'index':
+                result = by_index[key] = format_index_result(result)
+                document_index = key
+            else:
+                result = by_tx_hash[key] = format_tx_hash_result(result)
+                document_index = result[1]
+            if result[0]:
+                verification_cache.set(verification_cache_key(kind, key), document_index, result)
+
+    return by_index, by_tx_hash, cached
@@ -0,0 +1,184 @@
+import functools
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+# In-process EVM (eth-tester on py-evm) used in place of Ganache when
+# CHAIN_BACKEND=simulated. Needs `pip install "eth-tester[py-evm]" py-solc-x`.
+
+CONTRACT_SOURCE_PATH = settings.BASE_DIR.parent / "Smart Contract" / "DocumentStorage.txt"
+CONTRACT_NAME = "DocumentStorage"
+
+# App accounts are created with an empty balance; top them up from a
+# pre-funded tester account the first time they send a transaction
+FUNDING_AMOUNT = 100 * 10 ** 18
+FUNDING_THRESHOLD = 10 ** 18
+
+
+def _import_eth_tester():
+    try:
+        from eth_tester import EthereumTester, PyEVMBackend
+    except ImportError as e:
+        raise ImproperlyConfigured(
+            'CHAIN_BACKEND=simulated requires eth-tester and py-evm: pip install "eth-tester[py-evm]"'
+        ) from e
+    return EthereumTester, PyEVMBackend
+
+
+# 🔹 Compile DocumentStorage.txt with solc (installed on first use by py-solc-x)
+@functools.cache
+def compile_contract():
+    try:
+        import solcx
+    except ImportError as e:
+        raise ImproperlyConfigured("CHAIN_BACKEND=simulated requires py-solc-x: pip install py-solc-x") from e
+
+    version = settings.SIM_SOLC_VERSION
+    if version not in [str(v) for v in solcx.get_installed_solc_versions()]:
+        solcx.install_solc(version)
+
+    compiled = solcx.compile_source(
+        CONTRACT_SOURCE_PATH.read_text(),
+        output_values=['abi', 'bin'],
+        solc_version=version,
+    )
+    for name, artifact in compiled.items():
+        if name.endswith(f":{CONTRACT_NAME}"):
+            return artifact['abi'], artifact['bin']
+    raise ImproperlyConfigured(f"{CONTRACT_NAME} not found in {CONTRACT_SOURCE_PATH}")
+
+
+def _locked_provider_classes():
+    from web3.providers import AsyncBaseProvider
+    from web3.providers.eth_tester import AsyncEthereumTesterProvider, EthereumTesterProvider
+    from web3.providers.eth_tester.defaults import API_ENDPOINTS
+
+    # eth-tester is not thread-safe: request threads, the async views and the
+    # interval miner all go through the chain's lock
+    class LockedEthereumTesterProvider(EthereumTesterProvider):
+        def __init__(self, chain):
+            super().__init__(chain.tester)
+            self.chain = chain
+
+        def make_request(self, method, params):
+            if method == 'eth_sendRawTransaction' and self.chain.mining == 'interval':
+                return {'jsonrpc': '2.0', 'id': 0, 'result': self.chain.queue_transaction(params[0])}
+            with self.chain.lock:
+                return super().make_request(method, params)
+
+    class LockedAsyncEthereumTesterProvider(AsyncEthereumTesterProvider):
+        def __init__(self, chain):
+            # Skip AsyncEthereumTesterProvider.__init__, which starts a fresh chain
+            AsyncBaseProvider.__init__(self)
+            self.ethereum_tester = chain.tester
+            self.api_endpoints = API_ENDPOINTS
+            self.chain = chain
+
+        async def make_request(self, method, params):
+            if method == 'eth_sendRawTransaction' and self.chain.mining == 'interval':
+                return {'jsonrpc': '2.0', 'id': 0, 'result': self.chain.queue_transaction(params[0])}
+            with self.chain.lock:
+                return await super().make_request(method, params)
+
+    return LockedEthereumTesterProvider, LockedAsyncEthereumTesterProvider
+
+
+class SimulatedChain:
+    """
+    A fresh chain with DocumentStorage deployed. `mining` is 'auto' (a block per
+    transaction, like Ganache's default) or 'interval' (signed transactions wait
+    in a queue and are mined together every `block_time` seconds).
+    """
+
+    def __init__(self, mining='auto', block_time=1.0):
+        from web3 import Web3
+
+        if mining not in ('auto', 'interval'):
+            raise ImproperlyConfigured("SIM_MINING must be 'auto' or 'interval'")
+
+        EthereumTester, PyEVMBackend = _import_eth_tester()
+        self.lock = threading.RLock()
+        self.mining = mining
+        self.block_time = block_time
+        self.tester = EthereumTester(PyEVMBackend())
+        self.provider_class, self.async_provider_class = _locked_provider_classes()
+        self.web3 = Web3(self.provider_class(self))
+        self.funder = self.tester.get_accounts()[0]
+        self._funded = set()
+        self._queue = []
+
+        self.abi, bytecode = compile_contract()
+        self.contract_address = self.deploy(bytecode)
+        self.reset_nonces(self.tester.get_accounts())
+
+        if mining == 'interval':
+            threading.Thread(target=self._mine_forever, name="simulated-chain-miner", daemon=True).start()
+
+    def async_web3(self):
+        from web3 import AsyncWeb3
+        return AsyncWeb3(self.async_provider_class(self))
+
+    def queue_transaction(self, raw_transaction):
+        # eth-tester's own pending pool cannot hold consecutive nonces from one
+        # sender, so interval mode keeps the signed transactions itself
+        from web3 import Web3
+
+        with self.lock:
+            self._queue.append(bytes.fromhex(raw_transaction.removeprefix('0x')))
+        return Web3.keccak(hexstr=raw_transaction).to_0x_hex()
+
+    def mine(self):
+        from eth_utils import ValidationError
+
+        with self.lock:
+            queued, self._queue = self._queue, []
+            for raw_transaction in queued:
+                try:
+                    self.tester.backend.send_raw_transaction(raw_transaction)
+                except ValidationError as e:
+                    # A node would have rejected it on submission; drop it
+                    logger.warning("Simulated chain dropped transaction: %s", e)
+            self.tester.mine_blocks()
+
+    def reset_nonces(self, addresses):
+        # Every account starts again at nonce 0 on this chain; counters kept from
+        # a previous chain (e.g. before a restart) would be ahead of it. Only the
+        # given addresses are reset, so other chains' rows are left alone.
+        from .models import NonceTracker
+        NonceTracker.objects.filter(address__in=addresses).delete()
+
+    def _mine_forever(self):
+        while True:
+            time.sleep(self.block_time)
+            self.mine()
+
+    def _send_now(self, transaction):
+        # Setup transactions from the unlocked tester account are mined immediately
+        tx_hash = self.web3.eth.send_transaction({'from': self.funder, **transaction})
+        return self.web3.eth.get_transaction_receipt(tx_hash)
+
+    def deploy(self, bytecode):
+        receipt = self._send_now({'data': bytecode})
+        return receipt.contractAddress
+
+    def ensure_funded(self, address):
+        # Held throughout so a concurrent first send cannot allocate a nonce
+        # between the reset and `_funded`
+        with self.lock:
+            if address in self._funded:
+                return
+            # First time this chain sees the account: its nonce counter is stale
+            self.reset_nonces([address])
+            if self.web3.eth.get_balance(address) < FUNDING_THRESHOLD:
+                self._send_now({'to': address, 'value': FUNDING_AMOUNT})
+            self._funded.add(address)
+
+
+# 🔹 One chain per process, started on first use (or by services.warm_up)
+@functools.cache
+def get_simulated_chain():
+    return SimulatedChain(mining=settings.SIM_MINING, block_time=settings.SIM_BLOCK_TIME)
@@ -1,3 +1,944 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from unittest import mock, skipUnless
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from eth_account import Account
+from web3 import Web3, EthereumTesterProvider
+from web3.exceptions import ContractLogicError
+from documents.models import AuthorityIssuedDocument
+from users.models import CustomUser
+from . import indexer
+from .cache import VerificationCache
+from .cid import CIDv0Builder, base58btc
+from .fees import estimate_gas, get_fee_params
+from .jobs import flush_queued_jobs, reconcile_submitting_jobs, submit_batch, submit_job
+from . import services, simulated
+from .ipfs_cache import IPFSContentCache
+from .ipfs_utils import IPFSStreamingUploadHandler
+from .provider import RetryingHTTPProvider
+from .models import ContentHash, FlagHistory, IndexerCheckpoint, NonceTracker, TransactionJob, VerificationHistory
+from .nonces import allocate_nonce, release_nonce
+from .services import (
+    send_contract_transaction, store_document_on_chain, submit_document_to_chain, verification_cache,
+    verify_document_by_index,
+)
 
-# Create your tests here.
+
+def tester_web3():
+    """A fresh eth-tester chain, which needs no contract (and so no solc)."""
+    return Web3(EthereumTesterProvider())
+
+
+def funded_account(web3, account=None):
+    account = account or Account.create()
+    web3.eth.send_transaction({'from': web3.eth.accounts[0], 'to': account.address, 'value': 10 ** 20})
+    return account
+
+
+class TransferCall:
+    """Stands in for a bound contract function: a plain value transfer to `to`."""
+    fn_name = 'transfer'
+    args = ()
+
+    def __init__(self, to):
+        self.to = to
+
+    def estimate_gas(self, transaction):
+        return 21000
+
+    def build_transaction(self, transaction):
+        return {**transaction, 'to': self.to, 'value': 1}
+
+
+class RevertingCall(TransferCall):
+    """A call whose estimate is already cached but which now reverts, like setFlag by a stranger."""
+
+    def call(self, transaction):
+        raise ContractLogicError("execution reverted: Not authorized")
+
+
+class ConcurrentNonceTests(TransactionTestCase):
+
+    def setUp(self):
+        # SQLite's shared-cache in-memory test database fails concurrent writers
+        # at once ("table is locked") instead of waiting on the lock
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("needs a test database the threads can wait on")
+
+    def test_threads_never_share_a_nonce(self):
+        web3 = tester_web3()
+        address = web3.eth.accounts[1]
+        web3.eth.send_transaction({'from': address, 'to': web3.eth.accounts[0], 'value': 1})
+        results, errors = [], []
+
+        def allocate():
+            try:
+                for _ in range(20):
+                    results.append(allocate_nonce(web3, address))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        # Starts from the node's count once, then hands out each nonce exactly once
+        self.assertEqual(sorted(results), list(range(1, 161)))
+        self.assertEqual(NonceTracker.objects.get(address=address).next_nonce, 161)
+
+
+class TesterChainMixin:
+    """Points blockchain.services (and the modules importing from it) at a fresh eth-tester chain."""
+
+    def setUp(self):
+        super().setUp()
+        self.web3 = tester_web3()
+        for target, value in (
+            ('blockchain.services.get_web3', lambda: self.web3),
+            ('blockchain.services.get_chain_id', lambda: self.web3.eth.chain_id),
+            ('blockchain.jobs.get_web3', lambda: self.web3),
+            ('blockchain.indexer.get_web3', lambda: self.web3),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class SendTransactionNonceTests(TesterChainMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.account = funded_account(self.web3)
+        self.call = TransferCall(self.web3.eth.accounts[0])
+
+    def send(self):
+        return send_contract_transaction(self.call, self.account.address, self.account.key)
+
+    def tracked_nonce(self):
+        return NonceTracker.objects.get(address=self.account.address).next_nonce
+
+    def chain_nonce(self):
+        return self.web3.eth.get_transaction_count(self.account.address, 'pending')
+
+    def test_resyncs_after_nonce_too_low(self):
+        self.send()
+        # Another wallet spends nonce 1 behind the tracker's back
+        self.web3.eth.send_raw_transaction(self.web3.eth.account.sign_transaction({
+            'to': self.call.to, 'value': 1, 'gas': 21000, 'nonce': 1, 'chainId': self.web3.eth.chain_id,
+            'maxFeePerGas': 10 ** 10, 'maxPriorityFeePerGas': 10 ** 9,
+        }, self.account.key).raw_transaction)
+        self.assertEqual(self.tracked_nonce(), 1)
+
+        receipt = self.web3.eth.wait_for_transaction_receipt(self.send())
+        self.assertEqual(self.web3.eth.get_transaction(receipt.transactionHash).nonce, 2)
+        self.assertEqual((self.tracked_nonce(), self.chain_nonce()), (3, 3))
+
+    def test_releases_the_nonce_when_the_send_fails(self):
+        self.send()
+        with mock.patch.object(self.web3.eth, 'send_raw_transaction', side_effect=ConnectionError("refused")):
+            with self.assertRaises(ConnectionError):
+                self.send()
+        self.assertEqual(self.tracked_nonce(), 1)
+        receipt = self.web3.eth.wait_for_transaction_receipt(self.send())
+        self.assertEqual(self.web3.eth.get_transaction(receipt.transactionHash).nonce, 1)
+
+    def test_release_behind_later_allocations_resyncs(self):
+        first = allocate_nonce(self.web3, self.account.address)
+        allocate_nonce(self.web3, self.account.address)
+        release_nonce(self.web3, self.account.address, first)
+        # Giving back `first` would leave the second nonce in use, so the node's count wins
+        self.assertEqual(self.tracked_nonce(), self.chain_nonce())
+
+
+class InterruptedSubmissionTests(TesterChainMixin, TestCase):
+    """
+    Jobs are recorded as 'submitting' before their transaction is broadcast, and
+    reconciled against the node after a crash. A value transfer stands in for
+    storeDocuments, whose contract needs solc.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.issuer = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        receiver = CustomUser.objects.create(username='holder')
+        funded_account(self.web3, Account.from_key(self.issuer.private_key))
+        self.jobs = [
+            TransactionJob.objects.create(
+                submitted_by=self.issuer,
+                status='queued',
+                authority_document=AuthorityIssuedDocument.objects.create(
+                    issuer=self.issuer, receiver=receiver, title=f"Doc {i}", ipfs_hash=f"QmDoc{i}"
+                ),
+            )
+            for i in range(2)
+        ]
+        patcher = mock.patch('blockchain.jobs.submit_document_batch', self.send_batch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send_batch(self, items, address, private_key, before_send):
+        call = TransferCall(self.web3.eth.accounts[0])
+        return send_contract_transaction(call, address, private_key, before_send).hex()
+
+    def statuses(self):
+        return list(TransactionJob.objects.order_by('created_at').values_list('status', flat=True))
+
+    def chain_nonce(self, block='pending'):
+        return self.web3.eth.get_transaction_count(self.issuer.blockchain_address, block)
+
+    def test_database_error_after_broadcast_is_not_broadcast_again(self):
+        with mock.patch('blockchain.jobs._mark_pending', side_effect=DatabaseError("disk I/O error")):
+            with self.assertRaises(DatabaseError):
+                submit_batch(self.jobs)
+
+        job = TransactionJob.objects.get(id=self.jobs[0].id)
+        self.assertEqual((job.status, job.nonce), ('submitting', 0))
+        self.assertEqual(flush_queued_jobs(window=0, max_size=10), 0)
+        self.assertEqual(self.chain_nonce(), 1)
+
+        # Too recent to tell from a submission still in flight
+        self.assertEqual(reconcile_submitting_jobs(min_age=60), 0)
+        self.assertEqual(reconcile_submitting_jobs(min_age=0), 2)
+        self.assertEqual(self.statuses(), ['pending', 'pending'])
+        self.assertEqual(TransactionJob.objects.get(id=job.id).authority_document.tx_hash, job.tx_hash)
+
+    def crash_before_broadcast(self):
+        with mock.patch.object(self.web3.eth, 'send_raw_transaction', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                submit_batch(self.jobs)
+        self.assertEqual(self.statuses(), ['submitting', 'submitting'])
+
+    def test_crash_before_broadcast_requeues(self):
+        self.crash_before_broadcast()
+        self.assertEqual(reconcile_submitting_jobs(min_age=0), 2)
+        self.assertEqual(self.statuses(), ['queued', 'queued'])
+        # The nonce the crashed process took is handed out again
+        self.assertEqual(NonceTracker.objects.get(address=self.issuer.blockchain_address).next_nonce, 0)
+
+        self.assertEqual(flush_queued_jobs(window=0, max_size=10), 2)
+        self.assertEqual(self.statuses(), ['pending', 'pending'])
+        self.assertEqual(self.chain_nonce(), 1)
+
+    def test_nonce_spent_elsewhere_requeues(self):
+        self.crash_before_broadcast()
+        # Another transaction from the same sender takes the recorded nonce
+        self.web3.eth.send_raw_transaction(self.web3.eth.account.sign_transaction({
+            'to': self.web3.eth.accounts[0], 'value': 1, 'gas': 21000, 'nonce': 0,
+            'chainId': self.web3.eth.chain_id, 'maxFeePerGas': 10 ** 10, 'maxPriorityFeePerGas': 10 ** 9,
+        }, self.issuer.private_key).raw_transaction)
+
+        self.assertEqual(reconcile_submitting_jobs(min_age=0), 2)
+        self.assertEqual(self.statuses(), ['queued', 'queued'])
+        self.assertEqual(NonceTracker.objects.get(address=self.issuer.blockchain_address).next_nonce, 1)
+
+    def test_claimed_job_is_not_submitted_twice(self):
+        job = self.jobs[0]
+        with mock.patch('blockchain.jobs.submit_document_to_chain', return_value='ab' * 32) as send:
+            submit_job(job)
+            submit_job(job)
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(TransactionJob.objects.get(id=job.id).status, 'pending')
+
+
+class BulkVerifyValidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+
+    def post(self, tx_hashes):
+        client = APIClient()
+        client.force_authenticate(self.authority)
+        return client.post('/api/blockchain/verify/bulk/', {'tx_hashes': tx_hashes}, format='json')
+
+    def test_malformed_tx_hash_is_rejected_before_any_lookup(self):
+        with mock.patch('blockchain.views.verify_documents_bulk') as verify:
+            for bad in ('0x1234', 'zz' * 32, '0x' + 'ab' * 33):
+                response = self.post(['ab' * 32, bad])
+                self.assertEqual(response.status_code, 400, bad)
+        verify.assert_not_called()
+        self.assertFalse(VerificationHistory.objects.exists())
+
+    def test_out_of_range_index_is_rejected_before_any_lookup(self):
+        with mock.patch('blockchain.views.verify_documents_bulk') as verify:
+            for bad in (-1, 2 ** 256, '1.5', 'one'):
+                response = self.post_indices([1, bad])
+                self.assertEqual(response.status_code, 400, bad)
+        verify.assert_not_called()
+        self.assertFalse(VerificationHistory.objects.exists())
+
+    def test_single_verification_rejects_an_out_of_range_index(self):
+        client = APIClient()
+        client.force_authenticate(self.authority)
+        with mock.patch('blockchain.views.cached_verify_by_index') as verify:
+            for bad in (-1, 2 ** 256, 'one'):
+                response = client.post('/api/blockchain/verify/', {'index': bad}, format='json')
+                self.assertEqual(response.status_code, 400, bad)
+        verify.assert_not_called()
+        self.assertFalse(VerificationHistory.objects.exists())
+
+    def post_indices(self, indices):
+        client = APIClient()
+        client.force_authenticate(self.authority)
+        return client.post('/api/blockchain/verify/bulk/', {'indices': indices}, format='json')
+
+    def test_hashes_with_and_without_prefix_are_accepted(self):
+        missing = (False, 0, '', '', '', '', 0, False)
+        with mock.patch('blockchain.views.verify_documents_bulk', return_value=({}, {
+            '0x' + 'ab' * 32: missing, '0x' + 'CD' * 32: missing,
+        }, set())) as verify:
+            response = self.post(['ab' * 32, '0x' + 'CD' * 32])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(verify.call_args.args[1], ['0x' + 'ab' * 32, '0x' + 'CD' * 32])
+        self.assertEqual(VerificationHistory.objects.filter(success=False).count(), 2)
+
+
+@override_settings(VERIFY_FROM_MIRROR=True, MIRROR_MAX_LAG=2)
+class MirrorFreshnessTests(TesterChainMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        indexer._head['block'] = None
+        self.addCleanup(indexer._head.update, block=None)
+
+    def index_to_head(self):
+        IndexerCheckpoint.objects.update_or_create(
+            name=indexer.CHECKPOINT_NAME, defaults={'block_number': self.web3.eth.block_number}
+        )
+
+    def mine(self, blocks):
+        self.web3.provider.ethereum_tester.mine_blocks(blocks)
+        indexer._head['block'] = None
+
+    def test_no_checkpoint_is_not_fresh(self):
+        self.assertFalse(indexer.mirror_is_fresh())
+
+    def test_fresh_within_the_allowed_lag(self):
+        self.index_to_head()
+        self.assertTrue(indexer.mirror_is_fresh())
+        self.mine(2)
+        self.assertTrue(indexer.mirror_is_fresh())
+
+    def test_recently_saved_checkpoint_behind_the_head_is_stale(self):
+        self.index_to_head()
+        self.mine(3)
+        # Saved just now, but three blocks behind
+        IndexerCheckpoint.objects.get(name=indexer.CHECKPOINT_NAME).save()
+        self.assertFalse(indexer.mirror_is_fresh())
+
+    @override_settings(VERIFY_FROM_MIRROR=False)
+    def test_disabled(self):
+        self.index_to_head()
+        self.assertFalse(indexer.mirror_is_fresh())
+
+
+class FeeAndGasCacheTests(TesterChainMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.account = funded_account(self.web3)
+
+    def test_fees_are_suggested_once_per_block(self):
+        with mock.patch.object(self.web3.eth, 'get_block', wraps=self.web3.eth.get_block) as get_block:
+            first = get_fee_params(self.web3)
+            self.assertEqual(get_fee_params(self.web3), first)
+            self.assertEqual(get_block.call_count, 1)
+            self.web3.provider.ethereum_tester.mine_blocks(1)
+            get_fee_params(self.web3)
+            self.assertEqual(get_block.call_count, 2)
+
+    def test_preflight_catches_a_revert_behind_a_cached_estimate(self):
+        call = RevertingCall(self.web3.eth.accounts[0])
+        estimate_gas(call, self.account.address)
+
+        with self.assertRaises(ContractLogicError):
+            send_contract_transaction(call, self.account.address, self.account.key, preflight=True)
+        self.assertFalse(NonceTracker.objects.filter(address=self.account.address).exists())
+
+        # Without the preflight the cached estimate lets it through to the node
+        send_contract_transaction(call, self.account.address, self.account.key)
+        self.assertEqual(NonceTracker.objects.get(address=self.account.address).next_nonce, 1)
+
+
+class RecordingSession:
+    """Answers every JSON-RPC request with block 1 and records the calling thread."""
+
+    def __init__(self):
+        self.threads = set()
+
+    def post(self, url, data, **kwargs):
+        self.threads.add(threading.get_ident())
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({'jsonrpc': '2.0', 'id': json.loads(data)['id'], 'result': '0x1'}).encode()
+        return response
+
+
+class SharedSessionTests(TestCase):
+
+    def test_every_thread_uses_the_configured_session(self):
+        session = RecordingSession()
+        web3 = Web3(RetryingHTTPProvider('http://node.invalid', session=session))
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(web3.eth.block_number)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [1, 1])
+        self.assertEqual(session.threads, {thread.ident for thread in threads})
+
+
+def solc_installed():
+    try:
+        import solcx
+    except ImportError:
+        return False
+    return settings.SIM_SOLC_VERSION in [str(v) for v in solcx.get_installed_solc_versions()]
+
+
+# Deploys a contract without code, for chain tests that do not need DocumentStorage
+EMPTY_CONTRACT = ([], '0x00')
+
+
+class SimulatedChainTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('blockchain.simulated.compile_contract', return_value=EMPTY_CONTRACT)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def signed_transfer(self, chain, account, nonce):
+        return chain.web3.eth.account.sign_transaction({
+            'to': chain.funder, 'value': 1, 'gas': 21000, 'nonce': nonce, 'chainId': chain.web3.eth.chain_id,
+            'maxFeePerGas': 10 ** 10, 'maxPriorityFeePerGas': 10 ** 9,
+        }, account.key).raw_transaction
+
+    def test_only_the_simulated_accounts_nonces_are_reset(self):
+        app_account, other = Account.create().address, Account.create().address
+        NonceTracker.objects.create(address=app_account, next_nonce=42)
+        NonceTracker.objects.create(address=other, next_nonce=7)
+        chain = simulated.SimulatedChain()
+        NonceTracker.objects.create(address=chain.funder, next_nonce=3)
+        self.assertEqual(NonceTracker.objects.count(), 3)
+
+        # The tester accounts start again when a chain is created
+        simulated.SimulatedChain()
+        self.assertFalse(NonceTracker.objects.filter(address=chain.funder).exists())
+
+        # An app account starts again the first time the chain funds it, and only then
+        chain.ensure_funded(app_account)
+        self.assertFalse(NonceTracker.objects.filter(address=app_account).exists())
+        NonceTracker.objects.create(address=app_account, next_nonce=1)
+        chain.ensure_funded(app_account)
+        self.assertEqual(NonceTracker.objects.get(address=app_account).next_nonce, 1)
+
+        self.assertEqual(NonceTracker.objects.get(address=other).next_nonce, 7)
+
+    def test_interval_mining_logs_what_it_drops(self):
+        chain = simulated.SimulatedChain(mining='interval', block_time=3600)
+        account = Account.create()
+        chain.ensure_funded(account.address)
+        chain.web3.eth.send_raw_transaction(self.signed_transfer(chain, account, 0))
+        chain.web3.eth.send_raw_transaction(self.signed_transfer(chain, account, 5))
+        self.assertEqual(chain.web3.eth.get_transaction_count(account.address), 0)
+
+        with self.assertLogs('blockchain.simulated', 'WARNING') as logs:
+            chain.mine()
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(chain.web3.eth.get_transaction_count(account.address), 1)
+
+
+@skipUnless(solc_installed(), "solc is not installed")
+class SimulatedDocumentStorageTests(TestCase):
+    """Issues and verifies documents against DocumentStorage on the in-process chain."""
+
+    def setUp(self):
+        self.issuer = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        self.receiver = CustomUser.objects.create(username='holder')
+
+    def use_chain(self, mining):
+        cached = (simulated.get_simulated_chain, services.get_web3, services.get_contract, services.get_chain_id)
+        for function in cached:
+            function.cache_clear()
+            self.addCleanup(function.cache_clear)
+        overrides = override_settings(CHAIN_BACKEND='simulated', SIM_MINING=mining, SIM_BLOCK_TIME=3600)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        return simulated.get_simulated_chain()
+
+    def store(self, title, send=store_document_on_chain):
+        return send('QmDoc', self.issuer.blockchain_address, self.receiver.blockchain_address, title, self.issuer.private_key)
+
+    def test_stored_document_verifies(self):
+        self.use_chain('auto')
+        tx_hash, doc_id, block_tx_hash = self.store("Degree")
+        self.assertTrue(verify_document_by_index(doc_id)[0])
+
+    def test_interval_mining_puts_queued_transactions_in_one_block(self):
+        chain = self.use_chain('interval')
+        tx_hashes = [self.store(f"Doc {i}", send=submit_document_to_chain) for i in range(2)]
+        chain.mine()
+        receipts = [chain.web3.eth.get_transaction_receipt('0x' + tx_hash) for tx_hash in tx_hashes]
+        self.assertEqual([receipt.status for receipt in receipts], [1, 1])
+        self.assertEqual(receipts[0].blockNumber, receipts[1].blockNumber)
+
+
+class FakeCatResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def iter_content(self, chunk_size):
+        yield self.content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class IPFSContentCacheTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = IPFSContentCache(directory.name, max_bytes=25)
+
+    def add(self, cid, size):
+        # Non-Qm CIDs are not hash-checked, so any bytes will do
+        for _ in self.cache._tee(cid, FakeCatResponse(b'x' * size), 64):
+            pass
+
+    def test_directory_is_only_walked_when_the_limit_may_be_passed(self):
+        with mock.patch('blockchain.ipfs_cache.os.walk', wraps=os.walk) as walk:
+            self.add('bafyfirst01', 10)
+            self.assertEqual(walk.call_count, 1)
+            self.add('bafysecond1', 10)
+            self.assertEqual(walk.call_count, 1)
+            os.utime(self.cache.path_for('bafyfirst01'), (0, 0))
+            self.add('bafythird01', 10)
+            self.assertEqual(walk.call_count, 2)
+
+        # The least recently used entry made room
+        self.assertIsNone(self.cache.get('bafyfirst01'))
+        self.assertIsNotNone(self.cache.get('bafythird01'))
+
+    def test_directory_is_walked_again_after_the_rescan_interval(self):
+        self.add('bafyfirst01', 10)
+        self.cache._scanned_at -= IPFSContentCache.RESCAN_SECONDS
+        with mock.patch.object(self.cache, 'evict', wraps=self.cache.evict) as evict:
+            self.add('bafysecond1', 1)
+        evict.assert_called_once()
+
+
+def cid_of(*parts):
+    builder = CIDv0Builder()
+    for part in parts:
+        builder.update(part)
+    return builder.cid()
+
+
+def cidv0(block):
+    return base58btc(b'\x12\x20' + hashlib.sha256(block).digest())
+
+
+class CIDv0BuilderTests(TestCase):
+    """The blocks below are spelled out byte by byte, as Kubo's `ipfs add` writes them."""
+
+    CHUNK = b'\x07' * 262144
+    # UnixFS file leaf of a whole chunk: Type=File, Data, filesize=262144
+    CHUNK_LEAF = b'\x0a\x8a\x80\x10' + b'\x08\x02\x12\x80\x80\x10' + CHUNK + b'\x18\x80\x80\x10'
+
+    def test_kubo_vectors(self):
+        self.assertEqual(cid_of(), 'QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH')
+        self.assertEqual(cid_of(b'hello world\n'), 'QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o')
+        self.assertEqual(cid_of(b'hello', b' ', b'world\n'), 'QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o')
+
+    def test_exactly_one_chunk_is_a_single_leaf(self):
+        self.assertEqual(cid_of(self.CHUNK), cidv0(self.CHUNK_LEAF))
+        self.assertEqual(cid_of(self.CHUNK[:1000], self.CHUNK[1000:]), cidv0(self.CHUNK_LEAF))
+
+    def test_two_chunks_are_linked_by_a_parent(self):
+        tail_leaf = b'\x0a\x07' + b'\x08\x02\x12\x01x\x18\x01'
+        links = (
+            # PBLink: Hash, Name='', Tsize (block sizes of the whole subtree)
+            b'\x12\x2a\x0a\x22\x12\x20' + hashlib.sha256(self.CHUNK_LEAF).digest() + b'\x12\x00\x18\x8e\x80\x10'
+            + b'\x12\x28\x0a\x22\x12\x20' + hashlib.sha256(tail_leaf).digest() + b'\x12\x00\x18\x09'
+        )
+        # Type=File, filesize=262145, blocksizes=[262144, 1]
+        data = b'\x0a\x0c' + b'\x08\x02\x18\x81\x80\x10\x20\x80\x80\x10\x20\x01'
+        self.assertEqual(cid_of(self.CHUNK, b'x'), cidv0(links + data))
+
+    def test_more_leaves_than_links_per_node_add_a_level(self):
+        built = []
+        parent = CIDv0Builder._parent
+
+        def record_parent(builder, children):
+            built.append(len(children))
+            return parent(builder, children)
+
+        with mock.patch('blockchain.cid.CHUNK_SIZE', 4), \
+                mock.patch.object(CIDv0Builder, '_parent', record_parent):
+            cid_of(b'x' * 4 * 174)
+            self.assertEqual(built, [174])
+            built.clear()
+            cid_of(b'x' * 4 * 175)
+            self.assertEqual(built, [174, 1, 2])
+
+
+class VerifyFileTests(TestCase):
+    CONTENT = b'hello world\n'
+    CID = 'QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        cls.holder = CustomUser.objects.create(username='holder', blockchain_address='0x' + '22' * 20)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.authority)
+
+    def issue(self, index, ipfs_hash=CID):
+        AuthorityIssuedDocument.objects.create(
+            issuer=self.authority, receiver=self.holder, title="Degree", ipfs_hash=ipfs_hash, document_index=index
+        )
+
+    def record(self, ipfs_hash):
+        return (True, ipfs_hash, '0x' + '11' * 20, self.holder.blockchain_address, "Degree", 1700000000, False, '0x')
+
+    def post(self, content=CONTENT):
+        return self.client.post('/api/blockchain/verify/file/', {'file': SimpleUploadedFile('degree.pdf', content)})
+
+    def test_unknown_content_is_not_looked_up(self):
+        with mock.patch('blockchain.views.verify_documents_bulk') as verify:
+            response = self.post()
+        verify.assert_not_called()
+        self.assertEqual(response.json(), {
+            'exists': False, 'cid': self.CID, 'sha256': hashlib.sha256(self.CONTENT).hexdigest(), 'matches': [],
+        })
+        self.assertFalse(VerificationHistory.objects.get().success)
+
+    def test_only_indices_holding_the_content_on_chain_match(self):
+        self.issue(1)
+        self.issue(2)
+        # Index 2 was re-pointed on chain to other content
+        with mock.patch('blockchain.views.verify_documents_bulk', return_value=(
+            {1: self.record(self.CID), 2: self.record('QmOther')}, {}, {('index', 1)},
+        )):
+            body = self.post().json()
+        self.assertTrue(body['exists'])
+        self.assertEqual([(match['index'], match['cached']) for match in body['matches']], [(1, True)])
+        history = VerificationHistory.objects.get()
+        self.assertEqual((history.document_index, history.verified_user, history.success), (1, self.holder, True))
+
+    def test_no_on_chain_match_is_a_failed_verification(self):
+        self.issue(2)
+        with mock.patch('blockchain.views.verify_documents_bulk', return_value=({2: self.record('QmOther')}, {}, set())):
+            body = self.post().json()
+        self.assertEqual((body['exists'], body['matches']), (False, []))
+        self.assertFalse(VerificationHistory.objects.get().success)
+
+    def test_lookups_are_capped(self):
+        for index in range(5):
+            self.issue(index)
+        with mock.patch('blockchain.views.VerifyFileView.MAX_MATCHES', 3), \
+                mock.patch('blockchain.views.verify_documents_bulk', return_value=(
+                    {index: self.record(self.CID) for index in range(3)}, {}, set(),
+                )) as verify:
+            body = self.post().json()
+        self.assertEqual(verify.call_args.args[0], [0, 1, 2])
+        self.assertEqual([match['index'] for match in body['matches']], [0, 1, 2])
+
+
+class StreamingKubo:
+    """Stands in for ipfs_session, reading the chunked body the way requests would."""
+
+    def __init__(self, fail_after_chunks=None):
+        self.fail_after_chunks = fail_after_chunks
+        self.received = b''
+
+    def post(self, url, data, headers, timeout):
+        for sent, chunk in enumerate(data):
+            if sent == self.fail_after_chunks:
+                raise requests.ConnectionError("Kubo went away")
+            self.received += chunk
+        return mock.Mock(**{'json.return_value': {'Hash': 'QmStreamed'}})
+
+
+@override_settings(IPFS_STREAM_CHUNK_SIZE=4)
+class IPFSStreamingUploadTests(TestCase):
+    CONTENT = b'0123456789' * 4
+
+    def start(self, kubo):
+        patcher = mock.patch('blockchain.ipfs_utils.ipfs_session', kubo)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        handler = IPFSStreamingUploadHandler(mock.Mock(META={}))
+        handler.new_file('file', 'degree.pdf', 'application/pdf', len(self.CONTENT))
+        return handler
+
+    def send(self, handler, content=CONTENT):
+        for start in range(0, len(content), handler.chunk_size):
+            handler.receive_data_chunk(content[start:start + handler.chunk_size], start)
+
+    def test_file_is_streamed_to_kubo(self):
+        kubo = StreamingKubo()
+        handler = self.start(kubo)
+        self.send(handler)
+        file = handler.file_complete(len(self.CONTENT))
+
+        self.assertEqual((file.cid, file.sha256, file.size), ('QmStreamed', hashlib.sha256(self.CONTENT).hexdigest(), 40))
+        self.assertIn(b'filename="degree.pdf"', kubo.received)
+        self.assertIn(self.CONTENT, kubo.received)
+        self.assertTrue(kubo.received.endswith(b'--\r\n'))
+        self.assertEqual(ContentHash.objects.get().cid, 'QmStreamed')
+        self.assertFalse(handler.uploader.is_alive())
+
+    def test_kubo_failing_mid_stream_fails_only_the_upload(self):
+        # More chunks follow than the queue holds, so a dead uploader must not block the parser
+        handler = self.start(StreamingKubo(fail_after_chunks=2))
+        self.send(handler)
+        file = handler.file_complete(len(self.CONTENT))
+
+        self.assertIsNone(file.cid)
+        self.assertEqual(file.sha256, hashlib.sha256(self.CONTENT).hexdigest())
+        self.assertFalse(handler.uploader.is_alive())
+        self.assertFalse(ContentHash.objects.exists())
+
+    def test_client_abort_ends_the_upload(self):
+        kubo = StreamingKubo()
+        handler = self.start(kubo)
+        self.send(handler, self.CONTENT[:8])
+        handler.upload_interrupted()
+
+        self.assertFalse(handler.uploader.is_alive())
+        self.assertFalse(kubo.received.endswith(b'--\r\n'))
+        self.assertFalse(ContentHash.objects.exists())
+
+    def test_failed_stream_is_a_clean_error_response(self):
+        user = CustomUser.objects.create(username='holder')
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch('blockchain.ipfs_utils.ipfs_session', StreamingKubo(fail_after_chunks=2)):
+            response = client.post('/api/documents/upload/', {
+                'title': 'Passport', 'file': SimpleUploadedFile('passport.pdf', self.CONTENT),
+            })
+        self.assertEqual((response.status_code, response.json()), (500, {'error': 'IPFS upload failed'}))
+        self.assertFalse(user.user_documents.exists())
+
+    def test_declared_digest_that_does_not_match_is_rejected(self):
+        ContentHash.objects.create(sha256='ab' * 32, cid='QmKnown', size=40)
+        authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        holder = CustomUser.objects.create(username='holder')
+        client = APIClient()
+        client.force_authenticate(authority)
+        kubo = StreamingKubo()
+        with mock.patch('blockchain.ipfs_utils.ipfs_session', kubo):
+            # Known content is only hashed; the bytes sent are something else
+            response = client.post('/api/documents/issue/', {
+                'receiver_id': holder.public_id, 'title': 'Degree',
+                'file': SimpleUploadedFile('degree.pdf', self.CONTENT),
+            }, HTTP_X_CONTENT_SHA256='ab' * 32)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('X-Content-SHA256', response.json()['error'])
+            self.assertEqual(kubo.received, b'')
+
+            # Unknown content is streamed, but still checked against the header
+            client.force_authenticate(holder)
+            response = client.post('/api/documents/upload/', {
+                'title': 'Passport', 'file': SimpleUploadedFile('passport.pdf', self.CONTENT),
+            }, HTTP_X_CONTENT_SHA256='cd' * 32)
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(AuthorityIssuedDocument.objects.exists())
+        self.assertFalse(holder.user_documents.exists())
+
+
+class AsyncViewTests(TestCase):
+    """The ASGI verify/flag views, against a mocked AsyncWeb3 contract."""
+
+    RECORD = (True, 'QmDegree', '0x' + '11' * 20, '0x' + '22' * 20, "Degree", 1700000000, False, b'\xab' * 32)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        cls.holder = CustomUser.objects.create(
+            username='holder', blockchain_address='0x' + '22' * 20, private_key='0x' + '33' * 32
+        )
+
+    def setUp(self):
+        verification_cache.clear()
+        self.contract = mock.Mock()
+        self.contract.functions.verifyByIndex.return_value.call = mock.AsyncMock(return_value=self.RECORD)
+        self.web3 = mock.Mock()
+        self.web3.eth.wait_for_transaction_receipt = mock.AsyncMock(return_value=mock.Mock(status=1))
+        for target, value in (
+            ('blockchain.async_services.get_async_contract', lambda: self.contract),
+            ('blockchain.async_services.get_async_web3', lambda: self.web3),
+            ('blockchain.async_services.get_contract', mock.Mock()),
+            ('blockchain.async_services.send_contract_transaction', mock.Mock(return_value='0x' + 'cd' * 32)),
+            ('blockchain.async_services.invalidate_flagged_documents', mock.Mock()),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def post(self, url, data, user=None, token=None):
+        if user is not None:
+            token = str(RefreshToken.for_user(user).access_token)
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return await AsyncClient().post(url, data, content_type='application/json', headers=headers)
+
+    async def test_missing_or_invalid_token_is_401(self):
+        for url in ('/api/blockchain/verify/async/', '/api/blockchain/flag/async/'):
+            for token in (None, 'not-a-jwt'):
+                response = await self.post(url, {'index': 1, 'flag': True}, token=token)
+                self.assertEqual(response.status_code, 401, url)
+        self.contract.functions.verifyByIndex.assert_not_called()
+
+    async def test_verification_is_for_authorities_only(self):
+        response = await self.post('/api/blockchain/verify/async/', {'index': 1}, self.holder)
+        self.assertEqual(response.status_code, 403)
+        self.contract.functions.verifyByIndex.assert_not_called()
+
+    async def test_verification_matches_the_sync_view(self):
+        response = await self.post('/api/blockchain/verify/async/', {'index': 1}, self.authority)
+        self.assertEqual(response.status_code, 200)
+        self.contract.functions.verifyByIndex.assert_called_once_with(1)
+
+        verification_cache.clear()
+        with mock.patch('blockchain.views.cached_verify_by_index', return_value=(services.format_index_result(self.RECORD), False)):
+            client = APIClient()
+            await sync_to_async(client.force_authenticate)(self.authority)
+            expected = await sync_to_async(client.post)('/api/blockchain/verify/', {'index': 1}, format='json')
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response.json()['source'], 'chain')
+
+        history = await VerificationHistory.objects.select_related('verified_user').afirst()
+        self.assertEqual((history.success, history.verified_user, history.document_index), (True, self.holder, 1))
+
+    async def test_blank_fields_are_missing_fields(self):
+        response = await self.post('/api/blockchain/verify/async/', {'index': '', 'tx_hash': ''}, self.authority)
+        self.assertEqual(
+            (response.status_code, response.json()), (400, {"detail": "Either 'index' or 'tx_hash' must be provided."})
+        )
+
+    async def test_chain_error_is_a_failed_verification(self):
+        self.contract.functions.verifyByIndex.return_value.call.side_effect = Exception("node unreachable")
+        response = await self.post('/api/blockchain/verify/async/', {'index': 1}, self.authority)
+        self.assertEqual((response.status_code, response.json()), (500, {'error': "node unreachable"}))
+        history = await VerificationHistory.objects.aget()
+        self.assertEqual((history.success, history.response_data), (False, {'error': "node unreachable"}))
+
+    async def test_flag_is_set_on_chain_and_locally(self):
+        await AuthorityIssuedDocument.objects.acreate(
+            issuer=self.authority, receiver=self.holder, title="Degree", ipfs_hash='QmDegree', document_index=1
+        )
+        response = await self.post('/api/blockchain/flag/async/', {'index': 1, 'flag': True}, self.authority)
+        self.assertEqual((response.status_code, response.json()), (200, {"message": "Flag status updated."}))
+        self.web3.eth.wait_for_transaction_receipt.assert_awaited_once_with('0x' + 'cd' * 32)
+        self.assertTrue((await AuthorityIssuedDocument.objects.aget()).flagged)
+        self.assertTrue(await FlagHistory.objects.filter(document_index=1, flag_status=True).aexists())
+
+    async def test_failed_flag_transaction_is_a_500(self):
+        self.web3.eth.wait_for_transaction_receipt.return_value = mock.Mock(status=0)
+        response = await self.post('/api/blockchain/flag/async/', {'index': 1, 'flag': True}, self.authority)
+        self.assertEqual((response.status_code, response.json()), (500, {'error': "Flag transaction failed"}))
+        self.assertFalse(await FlagHistory.objects.aexists())
+
+
+class VerificationCacheTests(TestCase):
+    TX_KEY = ('tx_hash', '0x' + 'ab' * 32)
+
+    def setUp(self):
+        self.cache = VerificationCache(max_size=2, ttl=60)
+        self.now = 1000.0
+        patcher = mock.patch('blockchain.cache.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entries_expire_after_the_ttl(self):
+        self.cache.set(('index', 1), 1, 'record')
+        self.now += 59
+        self.assertEqual(self.cache.get(('index', 1)), 'record')
+        self.now += 2
+        self.assertIsNone(self.cache.get(('index', 1)))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_least_recently_used_entry_is_evicted_at_capacity(self):
+        self.cache.set(('index', 1), 1, 'first')
+        self.cache.set(('index', 2), 2, 'second')
+        self.cache.get(('index', 1))
+        self.cache.set(('index', 3), 3, 'third')
+
+        self.assertIsNone(self.cache.get(('index', 2)))
+        self.assertEqual((self.cache.get(('index', 1)), self.cache.get(('index', 3))), ('first', 'third'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_invalidating_an_index_drops_its_tx_hash_entry(self):
+        self.cache.set(('index', 1), 1, 'by index')
+        self.cache.set(self.TX_KEY, 1, 'by tx hash')
+        self.cache.invalidate_index(1)
+
+        self.assertIsNone(self.cache.get(('index', 1)))
+        self.assertIsNone(self.cache.get(self.TX_KEY))
+        self.assertEqual(self.cache.stats()['invalidations'], 2)
+
+    @override_settings(VERIFY_CACHE_FLAG_POLL=0)
+    def test_flag_events_invalidate_both_keys(self):
+        web3, contract = mock.Mock(), mock.Mock()
+        contract.events.DocumentFlagged.return_value.get_logs.return_value = [{'args': {'id': 1}}]
+        self.cache.set(('index', 1), 1, 'by index')
+        self.cache.set(self.TX_KEY, 1, 'by tx hash')
+
+        with mock.patch.object(services, 'verification_cache', self.cache), \
+                mock.patch.dict(services._flag_watch, {'block': None, 'checked_at': 0.0}), \
+                mock.patch.object(services, 'get_web3', return_value=web3), \
+                mock.patch.object(services, 'get_contract', return_value=contract):
+            web3.eth.block_number = 10
+            services.invalidate_flagged_documents()
+            self.assertEqual(self.cache.get(self.TX_KEY), 'by tx hash')  # first poll only sets the watermark
+
+            web3.eth.block_number = 12
+            self.now += 1
+            services.invalidate_flagged_documents()
+        contract.events.DocumentFlagged.return_value.get_logs.assert_called_once_with(from_block=11, to_block=12)
+        self.assertIsNone(self.cache.get(('index', 1)))
+        self.assertIsNone(self.cache.get(self.TX_KEY))
+
+    def test_stats_endpoint_reports_hits_and_misses(self):
+        self.cache.set(('index', 1), 1, 'record')
+        self.cache.get(('index', 1))
+        self.cache.get(('index', 1))
+        self.cache.get(('index', 2))
+
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create(username='staff', is_staff=True))
+        with mock.patch('blockchain.views.verification_cache', self.cache):
+            stats = client.get('/api/blockchain/verify/cache-stats/').json()
+        self.assertEqual(
+            {key: stats[key] for key in ('size', 'max_size', 'hits', 'misses', 'hit_rate')},
+            {'size': 1, 'max_size': 2, 'hits': 2, 'misses': 1, 'hit_rate': 0.6667},
+        )
+        client.force_authenticate(CustomUser.objects.create(username='holder'))
+        self.assertEqual(client.get('/api/blockchain/verify/cache-stats/').status_code, 403)
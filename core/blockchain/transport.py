@@ -0,0 +1,87 @@
+import random
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.retry import Retry
+
+# JSON-RPC methods that can be repeated without side effects
+IDEMPOTENT_RPC_METHODS = frozenset({
+    'eth_blockNumber',
+    'eth_call',
+    'eth_chainId',
+    'eth_estimateGas',
+    'eth_feeHistory',
+    'eth_gasPrice',
+    'eth_getBlockByHash',
+    'eth_getBlockByNumber',
+    'eth_getLogs',
+    'eth_getTransactionByHash',
+    'eth_getTransactionCount',
+    'eth_getTransactionReceipt',
+    'eth_maxPriorityFeePerGas',
+    'net_version',
+    'web3_clientVersion',
+})
+
+
+
+def is_retryable(exc):
+    """
+    Read timeouts and dropped connections. Failed connects are excluded because
+    the session adapter has already retried those.
+    """
+    if not isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return False
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return not isinstance(reason, ConnectTimeoutError)
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter, so retrying workers don't stampede together."""
+    return random.uniform(0, settings.HTTP_BACKOFF * (2 ** attempt))
+
+
+def build_session():
+    """
+    Keep-alive session with a bounded connection pool. Failed connects are retried
+    for every method since nothing was sent yet; read failures are left to callers,
+    which know whether the request is idempotent.
+    """
+    retry = Retry(
+        total=settings.HTTP_RETRIES,
+        connect=settings.HTTP_RETRIES,
+        read=0,
+        status=0,
+        other=0,
+        redirect=0,
+        backoff_factor=settings.HTTP_BACKOFF,
+        backoff_jitter=settings.HTTP_BACKOFF,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def connection_stats(session):
+    """Requests sent vs. TCP connections opened by a session's live pools."""
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    sent = opened = 0
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            sent += pool.num_requests
+            opened += pool.num_connections
+    return {
+        "requests": sent,
+        "connections_opened": opened,
+        "connections_reused": max(sent - opened, 0),
+        "reuse_ratio": round(1 - opened / sent, 4) if sent else None,
+    }
+
+
+chain_session = build_session()
+ipfs_session = build_session()
@@ -1,7 +1,15 @@
 from django.urls import path
-from .views import FlagDocumentView, VerifyDocumentView
+from .async_views import AsyncFlagDocumentView, AsyncVerifyDocumentView
+from .views import FlagDocumentView, VerifyDocumentView, BulkVerifyDocumentView, VerifyFileView, TransactionJobStatusView, VerificationCacheStatsView, TransportStatsView
 
 urlpatterns = [
     path('flag/', FlagDocumentView.as_view(), name='flag-document'),
     path('verify/', VerifyDocumentView.as_view(), name='verify-document'),
+    path('flag/async/', AsyncFlagDocumentView.as_view(), name='flag-document-async'),
+    path('verify/async/', AsyncVerifyDocumentView.as_view(), name='verify-document-async'),
+    path('verify/bulk/', BulkVerifyDocumentView.as_view(), name='verify-document-bulk'),
+    path('verify/file/', VerifyFileView.as_view(), name='verify-document-file'),
+    path('verify/cache-stats/', VerificationCacheStatsView.as_view(), name='verification-cache-stats'),
+    path('transport-stats/', TransportStatsView.as_view(), name='transport-stats'),
+    path('jobs/<uuid:job_id>/', TransactionJobStatusView.as_view(), name='transaction-job-status'),
 ]
\ No newline at end of file
@@ -1,12 +1,69 @@
+import re
 from rest_framework import permissions
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.response import Response
-from blockchain.services import set_document_flag, verify_document_by_tx_hash, verify_document_by_index
-from .models import VerificationHistory, FlagHistory
+from django.shortcuts import get_object_or_404
+from blockchain.services import (
+    set_document_flag,
+    cached_verify_by_tx_hash,
+    cached_verify_by_index,
+    verify_documents_bulk,
+    verification_cache,
+)
+from .ipfs_utils import hash_uploads_locally
+from .transport import chain_session, ipfs_session, connection_stats
+from .indexer import mirror_verify_by_index, mirror_verify_by_tx_hash
+from .models import VerificationHistory, FlagHistory, TransactionJob
 from users.models import CustomUser
 from rest_framework.exceptions import ValidationError
 from documents.models import AuthorityIssuedDocument, UserUploadedDocument
+from documents.counters import save_verifications, set_local_flag
+
+
+TX_HASH_PATTERN = re.compile(r'0x[0-9a-fA-F]{64}')
+
+# verifyByIndex takes a uint256; web3 refuses to encode anything outside it
+MAX_DOCUMENT_INDEX = 2 ** 256 - 1
+
+
+def parse_index(value):
+    """The document index in `value`; raises ValueError unless it is an integer that fits a uint256."""
+    index = int(str(value).strip())
+    if not 0 <= index <= MAX_DOCUMENT_INDEX:
+        raise ValueError(f"index {index} is out of range")
+    return index
+
+
+def index_response_data(result):
+    # result of verify_document_by_index
+    return {
+        "exists": result[0],
+        "ipfsHash": result[1],
+        "issuer": result[2],
+        "receiver": result[3],
+        "title": result[4],
+        "timestamp": result[5],
+        "flagged": result[6],
+        "block_hash": result[7],
+    }
+
+
+def tx_hash_response_data(tx_hash, result):
+    # result of verify_document_by_tx_hash
+    return {
+        "exists": result[0],
+        "index": result[1],
+        "ipfsHash": result[2],
+        "issuer": result[3],
+        "receiver": result[4],
+        "title": result[5],
+        "timestamp": result[6],
+        "flagged": result[7],
+        # No txHash here, tx_hash is input
+        "block_hash": tx_hash,
+    }
+
 
 class FlagDocumentView(APIView):
     authentication_classes = [JWTAuthentication]
@@ -20,7 +77,7 @@ class FlagDocumentView(APIView):
             return Response({'error': 'Missing fields'}, status=400)
 
         try:
-            index = int(index)
+            index = parse_index(index)
             flag = str(flag).lower() == 'true'
         except ValueError:
             return Response({'error': 'Invalid index or flag value'}, status=400)
@@ -38,22 +95,8 @@ class FlagDocumentView(APIView):
                 flag_status=flag
             )
 
-            # Try updating AuthorityIssuedDocument
-            updated = False
-
-            doc = AuthorityIssuedDocument.objects.filter(document_index=index).first()
-            if doc:
-                doc.flagged = flag
-                doc.save()
-                updated = True
-            else:
-                doc = UserUploadedDocument.objects.filter(document_index=index).first()
-                if doc:
-                    doc.flagged = flag
-                    doc.save()
-                    updated = True
-
-            if not updated:
+            # Update the local AuthorityIssuedDocument or UserUploadedDocument, and its holder's counters
+            if not set_local_flag(index, flag):
                 return Response({"warning": "Flag set on-chain, but no matching local document found."}, status=202)
 
         except Exception as e:
@@ -68,7 +111,7 @@ class VerifyDocumentView(APIView):
 
     def post(self, request):
         user = request.user
-        index = request.data.get("index").strip() if request.data.get("index") else None
+        index = str(request.data.get("index")).strip() if request.data.get("index") not in (None, "") else None
         tx_hash = request.data.get("tx_hash").strip() if request.data.get("tx_hash") else None
         
         if user.role != 'authority' or not user.is_verified_authority:
@@ -76,44 +119,35 @@ class VerifyDocumentView(APIView):
         
         if index is None and tx_hash is None:
             raise ValidationError({"detail": "Either 'index' or 'tx_hash' must be provided."})
+
+        if index is not None:
+            try:
+                index = parse_index(index)
+            except ValueError:
+                raise ValidationError({"index": [f"Must be an integer from 0 to {MAX_DOCUMENT_INDEX}."]})
         
         try:
             if index is not None:
-                index = int(index)
-                # Call verifyByIndex contract wrapper
-                result = verify_document_by_index(index)
+                # Answer from the local mirror when fresh, else call verifyByIndex (cached)
+                result, cached, source = mirror_verify_by_index(index), False, "mirror"
+                if result is None:
+                    result, cached = cached_verify_by_index(index)
+                    source = "cache" if cached else "chain"
                 exists = result[0]
                 
-                response_data = {
-                    "exists": exists,
-                    "ipfsHash": result[1],
-                    "issuer": result[2],
-                    "receiver": result[3],
-                    "title": result[4],
-                    "timestamp": result[5],
-                    "flagged": result[6],
-                    "block_hash": result[7],
-                }
+                response_data = index_response_data(result)
                 document_index = index
 
             else:
-                # Call verifyByTxHash contract wrapper
+                # Answer from the local mirror when fresh, else call verifyByTxHash (cached)
                 tx_hash = "0x" + tx_hash
-                result = verify_document_by_tx_hash(tx_hash)
+                result, cached, source = mirror_verify_by_tx_hash(tx_hash), False, "mirror"
+                if result is None:
+                    result, cached = cached_verify_by_tx_hash(tx_hash)
+                    source = "cache" if cached else "chain"
                 exists = result[0]
 
-                response_data = {
-                    "exists": exists,
-                    "index": result[1],
-                    "ipfsHash": result[2],
-                    "issuer": result[3],
-                    "receiver": result[4],
-                    "title": result[5],
-                    "timestamp": result[6],
-                    "flagged": result[7],
-                    # No txHash here, tx_hash is input
-                    "block_hash": tx_hash,
-                }
+                response_data = tx_hash_response_data(tx_hash, result)
                 document_index = result[1]
 
             verified_user = None
@@ -123,24 +157,224 @@ class VerifyDocumentView(APIView):
                 except CustomUser.DoesNotExist:
                     pass
 
-            VerificationHistory.objects.create(
+            save_verifications(VerificationHistory(
                 verifier=user,
                 verified_user=verified_user,
                 document_index=document_index,
                 success=exists,
                 response_data=response_data if exists else {},
-            )
+            ))
 
             if not exists:
                 return Response({"exists": False}, status=200)
 
-            return Response(response_data, status=200)
+            return Response({**response_data, "cached": cached, "source": source}, status=200)
 
         except Exception as e:
-            VerificationHistory.objects.create(
+            save_verifications(VerificationHistory(
                 verifier=user,
                 document_index=index if index is not None else None,
                 success=False,
                 response_data={"error": str(e)},
+            ))
+            return Response({"error": str(e)}, status=500)
+
+
+
+
+class BulkVerifyDocumentView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    MAX_ITEMS = 500
+
+    def post(self, request):
+        user = request.user
+        raw_indices = request.data.get("indices") or []
+        raw_tx_hashes = request.data.get("tx_hashes") or []
+
+        if user.role != 'authority' or not user.is_verified_authority:
+            return Response({"error": "Only authority users can verify documents."}, status=403)
+
+        if not isinstance(raw_indices, list) or not isinstance(raw_tx_hashes, list):
+            raise ValidationError({"detail": "'indices' and 'tx_hashes' must be lists."})
+
+        if not raw_indices and not raw_tx_hashes:
+            raise ValidationError({"detail": "Provide at least one entry in 'indices' or 'tx_hashes'."})
+
+        if len(raw_indices) + len(raw_tx_hashes) > self.MAX_ITEMS:
+            raise ValidationError({"detail": f"At most {self.MAX_ITEMS} documents can be verified per request."})
+
+        try:
+            indices = list(dict.fromkeys(parse_index(index) for index in raw_indices))
+        except ValueError:
+            raise ValidationError({"detail": f"Every index must be an integer from 0 to {MAX_DOCUMENT_INDEX}."})
+
+        # Same input format as the single endpoint, but tolerate an explicit 0x prefix
+        tx_hashes = list(dict.fromkeys(
+            "0x" + str(tx_hash).strip().removeprefix("0x") for tx_hash in raw_tx_hashes
+        ))
+        # One malformed hash would fail the whole JSON-RPC batch
+        if not all(TX_HASH_PATTERN.fullmatch(tx_hash) for tx_hash in tx_hashes):
+            raise ValidationError({"detail": "Every tx_hash must be 64 hexadecimal characters."})
+
+        try:
+            by_index, by_tx_hash, cached = verify_documents_bulk(indices, tx_hashes)
+        except Exception as e:
+            save_verifications(*[
+                VerificationHistory(verifier=user, document_index=index, success=False, response_data={"error": str(e)})
+                for index in indices
+            ], *[
+                VerificationHistory(verifier=user, tx_hash=tx_hash, success=False, response_data={"error": str(e)})
+                for tx_hash in tx_hashes
+            ])
+            return Response({"error": str(e)}, status=500)
+
+        checked = []  # (query, document_index, response_data, served_from_cache)
+        for index in indices:
+            checked.append(({"index": index}, index, index_response_data(by_index[index]), ("index", index) in cached))
+        for tx_hash in tx_hashes:
+            data = tx_hash_response_data(tx_hash, by_tx_hash[tx_hash])
+            document_index = data["index"] if data["exists"] else None
+            checked.append(({"tx_hash": tx_hash}, document_index, data, ("tx_hash", tx_hash) in cached))
+
+        # Resolve every receiver with a single IN query
+        receivers = {data["receiver"] for _, _, data, _ in checked if data["exists"]}
+        users_by_address = {
+            u.blockchain_address: u
+            for u in CustomUser.objects.filter(blockchain_address__in=receivers)
+        }
+
+        save_verifications(*[
+            VerificationHistory(
+                verifier=user,
+                verified_user=users_by_address.get(data["receiver"]) if data["exists"] else None,
+                document_index=document_index,
+                tx_hash=query.get("tx_hash"),
+                success=data["exists"],
+                response_data=data if data["exists"] else {},
             )
+            for query, document_index, data, _ in checked
+        ])
+
+        results = [
+            {**query, **(data if data["exists"] else {"exists": False}), "cached": from_cache}
+            for query, _, data, from_cache in checked
+        ]
+        return Response({"results": results}, status=200)
+
+
+class VerifyFileView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    # On-chain lookups per request when many local rows share the same content
+    MAX_MATCHES = 100
+
+    def post(self, request):
+        user = request.user
+
+        if user.role != 'authority' or not user.is_verified_authority:
+            return Response({"error": "Only authority users can verify documents."}, status=403)
+
+        # The file is hashed as it is parsed, never stored or uploaded
+        hash_uploads_locally(request)
+        file = request.FILES.get("file")
+        if not file:
+            raise ValidationError({"detail": "A 'file' must be provided."})
+
+        cid = file.cid
+        indices = sorted(
+            set(AuthorityIssuedDocument.objects.filter(ipfs_hash=cid, document_index__isnull=False)
+                .values_list("document_index", flat=True))
+            | set(UserUploadedDocument.objects.filter(ipfs_hash=cid, document_index__isnull=False)
+                  .values_list("document_index", flat=True))
+        )[:self.MAX_MATCHES]
+
+        if not indices:
+            save_verifications(VerificationHistory(verifier=user, ipfs_hash=cid, success=False, response_data={}))
+            return Response({"exists": False, "cid": cid, "sha256": file.sha256, "matches": []}, status=200)
+
+        try:
+            by_index, _, cached = verify_documents_bulk(indices, [])
+        except Exception as e:
+            save_verifications(VerificationHistory(
+                verifier=user, ipfs_hash=cid, success=False, response_data={"error": str(e)}
+            ))
             return Response({"error": str(e)}, status=500)
+
+        matches = []  # (document_index, response_data, served_from_cache)
+        for index in indices:
+            data = index_response_data(by_index[index])
+            # Only indices whose on-chain record holds this exact content count
+            if data["exists"] and data["ipfsHash"] == cid:
+                matches.append((index, data, ("index", index) in cached))
+
+        users_by_address = {
+            u.blockchain_address: u
+            for u in CustomUser.objects.filter(blockchain_address__in={data["receiver"] for _, data, _ in matches})
+        }
+        save_verifications(*([
+            VerificationHistory(
+                verifier=user,
+                verified_user=users_by_address.get(data["receiver"]),
+                document_index=index,
+                ipfs_hash=cid,
+                success=True,
+                response_data=data,
+            )
+            for index, data, _ in matches
+        ] or [VerificationHistory(verifier=user, ipfs_hash=cid, success=False, response_data={})]))
+
+        return Response({
+            "exists": bool(matches),
+            "cid": cid,
+            "sha256": file.sha256,
+            "matches": [{"index": index, **data, "cached": from_cache} for index, data, from_cache in matches],
+        }, status=200)
+
+
+class TransactionJobStatusView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(
+            TransactionJob.objects.select_related('authority_document', 'user_document'),
+            id=job_id,
+            submitted_by=request.user,
+        )
+        doc = job.document
+
+        return Response({
+            "job_id": str(job.id),
+            "status": job.status,
+            "tx_hash": job.tx_hash,
+            "document_id": doc.id if doc else None,
+            "document_index": doc.document_index if doc else None,
+            "block_tx_hash": doc.block_tx_hash if doc else None,
+            "error": job.error or None,
+            "created_at": job.created_at,
+            "confirmed_at": job.confirmed_at,
+        }, status=200)
+
+
+
+class VerificationCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Counters are per worker process
+        return Response(verification_cache.stats(), status=200)
+
+
+
+class TransportStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Counters are per worker process
+        return Response({
+            "chain": connection_stats(chain_session),
+            "ipfs": connection_stats(ipfs_session),
+        }, status=200)
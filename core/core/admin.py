@@ -1,8 +1,15 @@
 from django.contrib import admin
-from .models import SystemLog
+from .models import SystemLog, SystemLogDailyRollup
 
 @admin.register(SystemLog)
 class SystemLogAdmin(admin.ModelAdmin):
     list_display = ['created_at', 'event_type', 'level', 'path', 'method', 'status_code', 'user']
     list_filter = ['level', 'created_at', 'event_type']
     search_fields = ['path', 'message']
+
+
+@admin.register(SystemLogDailyRollup)
+class SystemLogDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['day', 'event_type', 'level', 'status_code', 'count']
+    list_filter = ['event_type', 'level']
+    date_hierarchy = 'day'
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Build the web3 client and contract at worker start instead of on the first request
+from django.conf import settings
+
+if settings.CHAIN_WARM_UP:
+    from blockchain.services import warm_up
+    warm_up()
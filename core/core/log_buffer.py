@@ -0,0 +1,158 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Put on the queue by close() to wake a flusher that is waiting for entries
+_WAKE = object()
+
+
+class LogBuffer:
+    """
+    Bounded in-process queue of unsaved model instances, written with
+    bulk_create by a background thread every `interval` seconds or `batch_size`
+    entries, whichever comes first.
+
+    When the queue is full, `overflow` decides: 'sync' writes the entry in the
+    caller's thread (nothing is lost, the request pays for the write) and 'drop'
+    discards it and counts it in `dropped`. Whatever is still queued at
+    interpreter exit is written by an atexit hook; entries queued in a process
+    that is killed outright are lost.
+    """
+
+    # A failed bulk_create (e.g. a locked SQLite database) is retried with
+    # backoff, then the batch is saved row by row so a bad entry only loses itself
+    WRITE_RETRIES = 3
+    RETRY_BACKOFF = 0.05
+
+    def __init__(self, model, max_size, interval, batch_size, overflow='sync'):
+        self.model = model
+        self.max_size = max_size
+        self.interval = interval
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.dropped = 0
+        self.lost = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._stop = None
+        self._thread = None
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Started lazily, and again in a forked worker, where the parent's thread does not exist
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="log-buffer-flush", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def put(self, entry):
+        self._ensure_started()
+        if self._stop.is_set():
+            # Shutting down: nothing will flush the queue any more
+            entry.save()
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            if self.overflow == 'drop':
+                self.dropped += 1
+            else:
+                entry.save()
+
+    def _take_batch(self):
+        """Up to `batch_size` entries, waiting at most `interval` after the first one."""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                if self._stop.is_set():
+                    entry = self._queue.get_nowait()
+                elif deadline is None:
+                    entry = self._queue.get(timeout=self.interval)
+                else:
+                    entry = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if entry is _WAKE:
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.interval
+            batch.append(entry)
+        return batch
+
+    def _write(self, batch):
+        for attempt in range(self.WRITE_RETRIES + 1):
+            try:
+                self.model.objects.bulk_create(batch)
+                return
+            except Exception as e:
+                logger.warning("Log buffer flush of %d entries failed (attempt %d): %s", len(batch), attempt + 1, e)
+                self._reset_connection()
+                if attempt < self.WRITE_RETRIES:
+                    time.sleep(self.RETRY_BACKOFF * 2 ** attempt)
+
+        for entry in batch:
+            try:
+                entry.save()
+            except Exception:
+                self.lost += 1
+                logger.exception("Log buffer could not write entry: %s", entry)
+                self._reset_connection()
+
+    def _reset_connection(self):
+        # Retry on a fresh connection, unless the caller is inside a transaction
+        if not connection.in_atomic_block:
+            connection.close()
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+        connection.close()
+
+    def drain(self):
+        """Writes everything queued so far from the calling thread."""
+        if self._pid != os.getpid():
+            return
+        batch = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _WAKE:
+                continue
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def close(self, timeout=5):
+        """Stops the flusher after it has written the queue; called at interpreter exit."""
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            # The flusher has entries to take and will see the stop flag
+            pass
+        self._thread.join(timeout)
+        # Whatever the thread did not get to in time
+        self.drain()
@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.retention import archive_batch, days_to_roll_up, roll_up_day, start_of_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Rolls SystemLog up into daily counts, then moves whole UTC days older than "
+        "LOG_RETENTION_DAYS into gzipped NDJSON segments in LOG_ARCHIVE_DIR and deletes "
+        "them in batches. Meant to run daily (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.LOG_RETENTION_DAYS, help="Days of raw logs to keep")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per segment file and DELETE")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1 (today is never complete)")
+
+        # timezone.now() is in UTC
+        today = timezone.now().date()
+        for day in days_to_roll_up(today):
+            roll_up_day(day)
+            self.stdout.write(f"Rolled up {day}")
+
+        # Whole days only, so a day is either still raw or fully archived and rolled up
+        cutoff = start_of_day(today - timedelta(days=options['days']))
+        total = 0
+        while True:
+            archived = archive_batch(cutoff, options['batch_size'], settings.LOG_ARCHIVE_DIR)
+            if not archived:
+                break
+            total += archived
+            time.sleep(options['pause'])
+        self.stdout.write(f"Archived and deleted {total} log entries older than {cutoff:%Y-%m-%d}")
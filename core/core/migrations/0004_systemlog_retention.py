@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_systemlog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemLogDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True)),
+                ('event_type', models.CharField(max_length=50)),
+                ('level', models.CharField(max_length=10)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='systemlog',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
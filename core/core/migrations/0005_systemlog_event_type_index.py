@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_systemlog_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['event_type', 'created_at'], name='core_system_event_t_23458c_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -28,7 +29,30 @@ class SystemLog(models.Model):
     status_code = models.IntegerField(null=True, blank=True)
     level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens; buffered entries are written later (see core.utils.log_event)
+    created_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Log listing filtered by event type, newest first
+            models.Index(fields=['event_type', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.level} - {self.path} - {self.created_at}"
+
+
+class SystemLogDailyRollup(models.Model):
+    """
+    Number of SystemLog entries per UTC day, event type, level and status code.
+    Written by `manage.py archive_system_logs`, and kept after the raw rows of
+    the day are archived and deleted.
+    """
+    day = models.DateField(db_index=True)
+    event_type = models.CharField(max_length=50)
+    level = models.CharField(max_length=10)
+    status_code = models.IntegerField(null=True, blank=True)
+    count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.day} {self.event_type}/{self.level}/{self.status_code}: {self.count}"
@@ -0,0 +1,71 @@
+import gzip
+import json
+import os
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import Count
+from .models import SystemLog, SystemLogDailyRollup
+
+ARCHIVE_FIELDS = ('id', 'created_at', 'user_id', 'event_type', 'level', 'path', 'method', 'status_code', 'message')
+
+
+def start_of_day(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def roll_up_day(day):
+    """(Re)computes the rollup rows of one UTC day from its raw SystemLog rows."""
+    start = start_of_day(day)
+    counts = (
+        SystemLog.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+        .values('event_type', 'level', 'status_code')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        SystemLogDailyRollup.objects.filter(day=day).delete()
+        SystemLogDailyRollup.objects.bulk_create([SystemLogDailyRollup(day=day, **row) for row in counts])
+
+
+def days_to_roll_up(today):
+    """
+    Complete days that still have raw rows but no rollup, plus yesterday, which
+    may have gained buffered entries since it was last rolled up.
+    """
+    raw_days = {
+        moment.date()
+        for moment in SystemLog.objects.filter(created_at__lt=start_of_day(today))
+        .datetimes('created_at', 'day', tzinfo=dt_timezone.utc)
+    }
+    rolled_up = set(SystemLogDailyRollup.objects.filter(day__in=raw_days).values_list('day', flat=True))
+    return sorted((raw_days - rolled_up) | (raw_days & {today - timedelta(days=1)}))
+
+
+def archive_batch(cutoff, batch_size, directory):
+    """
+    Writes the oldest `batch_size` rows created before `cutoff` to one gzipped
+    NDJSON segment, then deletes them. The segment is fsynced and renamed into
+    place first, so a crash never loses rows; a rerun after a crash between the
+    two steps rewrites the same segment. Returns the number of rows archived.
+    """
+    rows = list(
+        SystemLog.objects.filter(created_at__lt=cutoff).order_by('id').values(*ARCHIVE_FIELDS)[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"systemlog-{rows[0]['id']:012d}-{rows[-1]['id']:012d}.ndjson.gz")
+    temp_path = path + '.partial'
+    with open(temp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as segment:
+            for row in rows:
+                row['created_at'] = row['created_at'].isoformat()
+                segment.write(json.dumps(row).encode() + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(temp_path, path)
+
+    # The same rows as selected above, without one bound parameter per id
+    SystemLog.objects.filter(id__gte=rows[0]['id'], id__lte=rows[-1]['id'], created_at__lt=cutoff).delete()
+    return len(rows)
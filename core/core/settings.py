@@ -1,5 +1,5 @@
 from pathlib import Path
-from decouple import config, Csv
+from decouple import config, Choices, Csv
 import os
 
 # Paths
@@ -98,6 +98,37 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 
+# Cache
+# The default in-process cache is per worker; point CACHE_BACKEND at Redis,
+# Memcached or a file/database cache to share gas and fee suggestions and the
+# public system stats (manage.py check --deploy warns otherwise).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# SystemLog writes: queued and bulk-inserted by a background thread every
+# LOG_FLUSH_INTERVAL_MS or LOG_FLUSH_BATCH entries. ERROR entries are always synchronous.
+# When LOG_BUFFER_SIZE entries are waiting, LOG_BUFFER_OVERFLOW='sync' writes inline, 'drop' discards.
+# Off by default; tests that exercise the buffer turn it on with override_settings
+LOG_BUFFERING = config('LOG_BUFFERING', default=False, cast=bool)
+LOG_BUFFER_SIZE = config('LOG_BUFFER_SIZE', default=10000, cast=int)
+LOG_FLUSH_INTERVAL_MS = config('LOG_FLUSH_INTERVAL_MS', default=500, cast=int)
+LOG_FLUSH_BATCH = config('LOG_FLUSH_BATCH', default=200, cast=int)
+LOG_BUFFER_OVERFLOW = config('LOG_BUFFER_OVERFLOW', default='sync')
+
+# SystemLog retention (manage.py archive_system_logs): whole UTC days older than
+# LOG_RETENTION_DAYS are written to gzipped NDJSON segments in LOG_ARCHIVE_DIR, then deleted
+LOG_RETENTION_DAYS = config('LOG_RETENTION_DAYS', default=90, cast=int)
+LOG_ARCHIVE_DIR = config('LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'log_archive'))
+
+# Public system stats: cached counts are recounted exactly after this many seconds,
+# and clients/proxies may reuse a response for SYSTEM_STATS_MAX_AGE seconds
+SYSTEM_STATS_RECOUNT_INTERVAL = config('SYSTEM_STATS_RECOUNT_INTERVAL', default=300, cast=int)
+SYSTEM_STATS_MAX_AGE = config('SYSTEM_STATS_MAX_AGE', default=30, cast=int)
+
 # Static files
 STATIC_URL = 'static/'
 
@@ -107,3 +138,69 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # CORS
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', cast=Csv())
+
+
+# Blockchain
+# 'http' talks to the node at CHAIN_RPC_URL; 'simulated' starts an in-process
+# EVM (eth-tester) and deploys DocumentStorage from "Smart Contract/" on it
+CHAIN_BACKEND = config('CHAIN_BACKEND', default='http')
+# Simulated chain: 'auto' mines a block per transaction, 'interval' every SIM_BLOCK_TIME seconds
+SIM_MINING = config('SIM_MINING', default='auto')
+SIM_BLOCK_TIME = config('SIM_BLOCK_TIME', default=1.0, cast=float)
+SIM_SOLC_VERSION = config('SIM_SOLC_VERSION', default='0.8.19')
+
+CHAIN_RPC_URL = config('CHAIN_RPC_URL', default='http://127.0.0.1:7545')
+IPFS_API_URL = config('IPFS_API_URL', default='http://127.0.0.1:5001')
+
+# Build the web3 client when the WSGI/ASGI application loads; otherwise it is
+# created lazily on the first chain call (manage.py commands never pay for it)
+CHAIN_WARM_UP = config('CHAIN_WARM_UP', default=True, cast=bool)
+
+# Pooled keep-alive HTTP sessions for the chain node and the Kubo API
+HTTP_POOL_SIZE = config('HTTP_POOL_SIZE', default=10, cast=int)
+HTTP_CONNECT_TIMEOUT = config('HTTP_CONNECT_TIMEOUT', default=3.0, cast=float)
+CHAIN_READ_TIMEOUT = config('CHAIN_READ_TIMEOUT', default=30.0, cast=float)
+IPFS_READ_TIMEOUT = config('IPFS_READ_TIMEOUT', default=120.0, cast=float)
+# Document uploads are streamed to Kubo in chunks of this many bytes
+IPFS_STREAM_CHUNK_SIZE = config('IPFS_STREAM_CHUNK_SIZE', default=256 * 1024, cast=int)
+# On-disk LRU cache of documents served by the content endpoint
+IPFS_CACHE_DIR = config('IPFS_CACHE_DIR', default=str(BASE_DIR / 'ipfs_cache'))
+IPFS_CACHE_MAX_BYTES = config('IPFS_CACHE_MAX_BYTES', default=1024 ** 3, cast=int)
+HTTP_RETRIES = config('HTTP_RETRIES', default=3, cast=int)
+HTTP_BACKOFF = config('HTTP_BACKOFF', default=0.5, cast=float)
+
+# Re-issuing identical content (same issuer, receiver and SHA-256/CID): 'allow' a
+# new transaction, 'reject' with 409, or 'link' to the existing document
+DUPLICATE_ISSUANCE = config('DUPLICATE_ISSUANCE', default='allow', cast=Choices(['allow', 'reject', 'link']))
+
+# Bulk issuance: rows per CSV/ZIP batch and concurrent IPFS uploads per batch
+BULK_ISSUANCE_MAX_ITEMS = config('BULK_ISSUANCE_MAX_ITEMS', default=1000, cast=int)
+IPFS_UPLOAD_WORKERS = config('IPFS_UPLOAD_WORKERS', default=8, cast=int)
+
+# When enabled, issuance returns 202 right after broadcast and the
+# confirm_transactions command fills in the on-chain index later.
+ASYNC_ISSUANCE = config('ASYNC_ISSUANCE', default=False, cast=bool)
+
+# With batching on, async issuances are queued and sent as one storeDocuments
+# transaction per sender once CHAIN_BATCH_MAX_SIZE is reached or the oldest
+# one has waited CHAIN_BATCH_WINDOW seconds.
+CHAIN_BATCHING = config('CHAIN_BATCHING', default=False, cast=bool)
+CHAIN_BATCH_WINDOW = config('CHAIN_BATCH_WINDOW', default=2.0, cast=float)
+CHAIN_BATCH_MAX_SIZE = config('CHAIN_BATCH_MAX_SIZE', default=50, cast=int)
+
+# Per-worker LRU cache of verification results. DocumentFlagged logs are polled
+# every VERIFY_CACHE_FLAG_POLL seconds to drop entries of re-flagged documents.
+VERIFY_CACHE_SIZE = config('VERIFY_CACHE_SIZE', default=10000, cast=int)
+VERIFY_CACHE_TTL = config('VERIFY_CACHE_TTL', default=300, cast=int)
+VERIFY_CACHE_FLAG_POLL = config('VERIFY_CACHE_FLAG_POLL', default=5.0, cast=float)
+
+# Answer verifications from the ChainDocument mirror while the index_chain_events
+# checkpoint is at most MIRROR_MAX_LAG blocks behind the chain head (keep it above
+# the indexer's --confirmations).
+VERIFY_FROM_MIRROR = config('VERIFY_FROM_MIRROR', default=False, cast=bool)
+MIRROR_MAX_LAG = config('MIRROR_MAX_LAG', default=3, cast=int)
+
+# Gas estimates are cached per contract function and argument shape; fee
+# suggestions per block, and for at most FEE_CACHE_TTL seconds.
+GAS_ESTIMATE_TTL = config('GAS_ESTIMATE_TTL', default=3600, cast=int)
+FEE_CACHE_TTL = config('FEE_CACHE_TTL', default=12, cast=int)
@@ -0,0 +1,256 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from .log_buffer import LogBuffer
+from .models import SystemLog, SystemLogDailyRollup
+from .retention import archive_batch, days_to_roll_up, roll_up_day, start_of_day
+from .utils import log_buffer, log_event
+
+
+class Entry:
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+
+    def save(self):
+        self.model.saved.append(self.name)
+
+
+class RecordingModel:
+    """Stands in for a model class: records bulk_create batches and single saves."""
+
+    def __init__(self, failures=0):
+        self.objects = self
+        self.batches = []
+        self.saved = []
+        self.failures = failures
+        self.writing = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def bulk_create(self, batch):
+        self.writing.set()
+        self.release.wait()
+        if self.failures:
+            self.failures -= 1
+            raise Exception("database table is locked")
+        self.batches.append([entry.name for entry in batch])
+
+    def entries(self, count):
+        return [Entry(self, i) for i in range(count)]
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class LogBufferTests(SimpleTestCase):
+
+    def make_buffer(self, model, **options):
+        buffer = LogBuffer(model, **{'max_size': 100, 'interval': 10, 'batch_size': 100, **options})
+        self.addCleanup(buffer.close)
+        return buffer
+
+    def test_partial_batch_is_written_after_the_interval(self):
+        model = RecordingModel()
+        buffer = self.make_buffer(model, interval=0.05)
+        for entry in model.entries(2):
+            buffer.put(entry)
+        self.assertTrue(wait_for(lambda: model.batches))
+        self.assertEqual(model.batches, [[0, 1]])
+
+    def test_full_batch_is_written_without_waiting_for_the_interval(self):
+        model = RecordingModel()
+        buffer = self.make_buffer(model, batch_size=3)
+        for entry in model.entries(3):
+            buffer.put(entry)
+        self.assertTrue(wait_for(lambda: model.batches, timeout=1.0))
+        self.assertEqual(model.batches, [[0, 1, 2]])
+
+    def block_flusher(self, model, buffer, entry):
+        # The flusher takes `entry` and blocks in bulk_create, so the queue stays full
+        model.release.clear()
+        buffer.put(entry)
+        self.assertTrue(model.writing.wait(1.0))
+        self.addCleanup(model.release.set)
+
+    def test_overflow_sync_writes_in_the_caller(self):
+        model = RecordingModel()
+        buffer = self.make_buffer(model, max_size=1, batch_size=1)
+        first, queued, overflowing = model.entries(3)
+        self.block_flusher(model, buffer, first)
+        buffer.put(queued)
+        buffer.put(overflowing)
+        self.assertEqual(model.saved, [2])
+        self.assertEqual(buffer.dropped, 0)
+
+    def test_overflow_drop_counts_the_entry(self):
+        model = RecordingModel()
+        buffer = self.make_buffer(model, max_size=1, batch_size=1, overflow='drop')
+        first, queued, overflowing = model.entries(3)
+        self.block_flusher(model, buffer, first)
+        buffer.put(queued)
+        buffer.put(overflowing)
+        self.assertEqual(model.saved, [])
+        self.assertEqual(buffer.dropped, 1)
+
+    def test_close_writes_everything_queued(self):
+        model = RecordingModel()
+        buffer = LogBuffer(model, max_size=100, interval=10, batch_size=100)
+        for entry in model.entries(5):
+            buffer.put(entry)
+        started = time.monotonic()
+        buffer.close()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(sum(model.batches, []), [0, 1, 2, 3, 4])
+        # Entries logged during shutdown are written directly
+        buffer.put(Entry(model, 5))
+        self.assertEqual(model.saved, [5])
+
+    def test_failed_flush_is_retried(self):
+        model = RecordingModel(failures=2)
+        buffer = self.make_buffer(model, interval=0.01)
+        buffer.RETRY_BACKOFF = 0.001
+        with self.assertLogs('core.log_buffer', 'WARNING') as logs:
+            buffer.put(Entry(model, 0))
+            self.assertTrue(wait_for(lambda: model.batches))
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(model.batches, [[0]])
+        self.assertEqual(buffer.lost, 0)
+
+    def test_batch_is_saved_row_by_row_when_retries_run_out(self):
+        model = RecordingModel(failures=LogBuffer.WRITE_RETRIES + 1)
+        buffer = self.make_buffer(model, interval=0.01)
+        buffer.RETRY_BACKOFF = 0.001
+        with self.assertLogs('core.log_buffer', 'WARNING'):
+            for entry in model.entries(3):
+                buffer.put(entry)
+            self.assertTrue(wait_for(lambda: len(model.saved) == 3))
+        self.assertEqual(model.batches, [])
+        self.assertEqual(buffer.lost, 0)
+
+
+class LogEventTests(TestCase):
+
+    @override_settings(LOG_BUFFERING=True)
+    def test_errors_bypass_the_buffer(self):
+        with mock.patch.object(log_buffer, 'put') as put:
+            log_event(event_type="OTHER", level="INFO", message="queued")
+            log_event(event_type="OTHER", level="ERROR", message="written")
+        self.assertEqual([call.args[0].message for call in put.call_args_list], ["queued"])
+        self.assertEqual(list(SystemLog.objects.values_list('message', flat=True)), ["written"])
+
+    @override_settings(LOG_BUFFERING=False)
+    def test_unbuffered_entries_are_written_at_once(self):
+        log_event(event_type="OTHER", message="written")
+        self.assertTrue(SystemLog.objects.filter(message="written").exists())
+
+
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.today = timezone.now().date()
+
+    def log(self, days_ago, hour=12, **fields):
+        return SystemLog.objects.create(**{
+            'path': '/api/', 'method': 'GET', 'level': 'INFO', 'message': f"{days_ago} days ago", **fields,
+            'created_at': start_of_day(self.today - timedelta(days=days_ago)) + timedelta(hours=hour),
+        })
+
+    def rollups(self, day):
+        return set(SystemLogDailyRollup.objects.filter(day=day).values_list('event_type', 'level', 'status_code', 'count'))
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.ndjson.gz'))
+
+    def read_segment(self, name):
+        with gzip.open(os.path.join(self.directory, name)) as segment:
+            return [json.loads(line) for line in segment]
+
+    def test_rollup_counts_per_event_level_and_status(self):
+        day = self.today - timedelta(days=3)
+        for hour in (0, 23):
+            self.log(3, hour, event_type='LOGIN', status_code=200)
+        self.log(3, event_type='LOGIN', level='ERROR', status_code=401)
+        self.log(3, event_type='OTHER')
+        # Neighbouring days stay out
+        self.log(2, hour=0, event_type='LOGIN', status_code=200)
+        self.log(4, hour=23, event_type='LOGIN', status_code=200)
+
+        roll_up_day(day)
+        self.assertEqual(self.rollups(day), {
+            ('LOGIN', 'INFO', 200, 2), ('LOGIN', 'ERROR', 401, 1), ('OTHER', 'INFO', None, 1),
+        })
+
+    def test_days_to_roll_up(self):
+        for days_ago in (0, 1, 2, 3):
+            self.log(days_ago)
+        roll_up_day(self.today - timedelta(days=1))
+        roll_up_day(self.today - timedelta(days=3))
+
+        # Never today; yesterday again even though it has rollups; older days once
+        self.assertEqual(days_to_roll_up(self.today), [self.today - timedelta(days=2), self.today - timedelta(days=1)])
+
+    def test_segment_holds_the_oldest_rows_before_the_cutoff(self):
+        old = [self.log(10, hour) for hour in range(3)]
+        kept = self.log(1)
+
+        cutoff = start_of_day(self.today - timedelta(days=5))
+        self.assertEqual(archive_batch(cutoff, batch_size=2, directory=self.directory), 2)
+        self.assertEqual(archive_batch(cutoff, batch_size=2, directory=self.directory), 1)
+        self.assertEqual(archive_batch(cutoff, batch_size=2, directory=self.directory), 0)
+
+        first, second = self.segments()
+        self.assertEqual(first, f"systemlog-{old[0].id:012d}-{old[1].id:012d}.ndjson.gz")
+        rows = self.read_segment(first) + self.read_segment(second)
+        self.assertEqual([row['id'] for row in rows], [entry.id for entry in old])
+        self.assertEqual(rows[0]['created_at'], old[0].created_at.isoformat())
+        self.assertEqual(rows[0]['message'], "10 days ago")
+        self.assertEqual(list(SystemLog.objects.values_list('id', flat=True)), [kept.id])
+
+    def test_rerun_after_a_crash_before_the_delete_rewrites_the_same_segment(self):
+        entries = [self.log(10, hour) for hour in range(2)]
+        cutoff = start_of_day(self.today - timedelta(days=5))
+        with mock.patch.object(QuerySet, 'delete', side_effect=RuntimeError("killed")):
+            with self.assertRaises(RuntimeError):
+                archive_batch(cutoff, batch_size=10, directory=self.directory)
+        self.assertEqual(SystemLog.objects.count(), 2)
+
+        self.assertEqual(archive_batch(cutoff, batch_size=10, directory=self.directory), 2)
+        [segment] = self.segments()
+        self.assertEqual([row['id'] for row in self.read_segment(segment)], [entry.id for entry in entries])
+        self.assertFalse(SystemLog.objects.exists())
+
+    def test_command_rerun_is_idempotent(self):
+        for days_ago in (1, 8, 9):
+            self.log(days_ago, event_type='LOGIN', status_code=200)
+        self.log(9, event_type='OTHER')
+
+        with override_settings(LOG_ARCHIVE_DIR=self.directory):
+            call_command('archive_system_logs', days=7, batch_size=2, stdout=io.StringIO())
+            rollups = set(SystemLogDailyRollup.objects.values_list('day', 'event_type', 'status_code', 'count'))
+            segments = self.segments()
+            call_command('archive_system_logs', days=7, batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(set(SystemLogDailyRollup.objects.values_list('day', 'event_type', 'status_code', 'count')), rollups)
+        self.assertEqual(len(rollups), 4)
+        self.assertEqual(self.segments(), segments)
+        self.assertEqual(len(segments), 2)
+        # Archived days keep their counts; only yesterday is left raw
+        self.assertEqual(SystemLog.objects.count(), 1)
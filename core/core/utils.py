@@ -1,16 +1,40 @@
+from django.conf import settings
+from django.utils import timezone
+from .log_buffer import LogBuffer
 from .models import SystemLog
 
+# Levels that are always written before log_event returns
+SYNCHRONOUS_LEVELS = {'ERROR'}
+
+log_buffer = LogBuffer(
+    SystemLog,
+    max_size=settings.LOG_BUFFER_SIZE,
+    interval=settings.LOG_FLUSH_INTERVAL_MS / 1000,
+    batch_size=settings.LOG_FLUSH_BATCH,
+    overflow=settings.LOG_BUFFER_OVERFLOW,
+)
+
+
 def log_event(user=None, event_type="OTHER", level="INFO", message="", path="", method="", status_code=None):
     """
     Logs an event to the database.
     Only call this function where you want to track important actions.
+
+    With LOG_BUFFERING the entry is queued and written in a batch by a background
+    thread shortly after; ERROR entries are always written immediately.
     """
-    SystemLog.objects.create(
+    entry = SystemLog(
         user=user if user and user.is_authenticated else None,
         event_type=event_type,
         level=level,
         message=message,
         path=path,
         method=method,
-        status_code=status_code
+        status_code=status_code,
+        # Time of the event, not of the batch write
+        created_at=timezone.now(),
     )
+    if settings.LOG_BUFFERING and level not in SYNCHRONOUS_LEVELS:
+        log_buffer.put(entry)
+    else:
+        entry.save()
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Build the web3 client and contract at worker start instead of on the first request
+from django.conf import settings
+
+if settings.CHAIN_WARM_UP:
+    from blockchain.services import warm_up
+    warm_up()
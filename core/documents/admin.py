@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AuthorityIssuedDocument, UserUploadedDocument
+from .models import AuthorityIssuedDocument, UserUploadedDocument, BulkIssuance, UserCounters, VerificationDailyRollup, IssuanceDailyRollup
 
 @admin.register(AuthorityIssuedDocument)
 class AuthorityIssuedDocumentAdmin(admin.ModelAdmin):
@@ -11,4 +11,26 @@ class AuthorityIssuedDocumentAdmin(admin.ModelAdmin):
 class UserUploadedDocumentAdmin(admin.ModelAdmin):
     list_display = ('title', 'document_index', 'owner', 'uploaded_at', 'tx_hash', 'ipfs_hash', 'block_tx_hash', 'flagged')
     search_fields = ('title', 'owner__username', 'tx_hash', 'ipfs_hash')
-    list_filter = ('uploaded_at',)
\ No newline at end of file
+    list_filter = ('uploaded_at',)
+@admin.register(BulkIssuance)
+class BulkIssuanceAdmin(admin.ModelAdmin):
+    list_display = ('id', 'issuer', 'created_at')
+    search_fields = ('issuer__username',)
+    list_filter = ('created_at',)
+
+@admin.register(UserCounters)
+class UserCountersAdmin(admin.ModelAdmin):
+    list_display = ('user', 'uploaded', 'received', 'flagged', 'issued', 'verified', 'updated_at')
+    search_fields = ('user__username',)
+
+@admin.register(VerificationDailyRollup)
+class VerificationDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'verifier', 'success', 'count')
+    search_fields = ('verifier__username',)
+    list_filter = ('success', 'day')
+
+@admin.register(IssuanceDailyRollup)
+class IssuanceDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'issuer', 'count')
+    search_fields = ('issuer__username',)
+    list_filter = ('day',)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from .models import IssuanceDailyRollup, VerificationDailyRollup
+
+BUCKETS = ('day', 'week', 'month')
+
+# Longest range a request may cover, per bucket
+MAX_DAYS = {'day': 366, 'week': 3 * 366, 'month': 10 * 366}
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start, bucket):
+    if bucket == 'day':
+        return start + timedelta(days=1)
+    if bucket == 'week':
+        return start + timedelta(weeks=1)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def _totals(queryset, bucket, *keys):
+    """{(bucket start, *keys): summed count} of a rollup queryset."""
+    period = {'day': F('day'), 'week': TruncWeek('day'), 'month': TruncMonth('day')}[bucket]
+    rows = queryset.annotate(period=period).values('period', *keys).annotate(total=Sum('count')).order_by()
+    return {(row['period'], *(row[key] for key in keys)): row['total'] for row in rows}
+
+
+def analytics_series(start, end, bucket, user_id=None):
+    """
+    Verifications (by outcome) and issuances per bucket from `start` to `end`
+    (inclusive dates), read only from the daily rollups. Restricted to one
+    authority when `user_id` is given. Buckets without activity are zeros.
+    """
+    verifications = VerificationDailyRollup.objects.filter(day__range=(start, end))
+    issuances = IssuanceDailyRollup.objects.filter(day__range=(start, end))
+    if user_id is not None:
+        verifications = verifications.filter(verifier_id=user_id)
+        issuances = issuances.filter(issuer_id=user_id)
+
+    verified = _totals(verifications, bucket, 'success')
+    issued = _totals(issuances, bucket)
+
+    series = []
+    period = bucket_start(start, bucket)
+    while period <= end:
+        series.append({
+            'period': period,
+            'verifications_succeeded': verified.get((period, True), 0),
+            'verifications_failed': verified.get((period, False), 0),
+            'issued': issued.get((period,), 0),
+        })
+        period = _next_bucket(period, bucket)
+    return series
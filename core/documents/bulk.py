@@ -0,0 +1,171 @@
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from django.conf import settings
+from django.db import connections, transaction
+from blockchain.ipfs_utils import upload_file_to_ipfs
+from blockchain.models import TransactionJob
+from blockchain.jobs import submit_job
+from users.models import CustomUser
+from .counters import count_issuances
+from .models import AuthorityIssuedDocument, BulkIssuance
+
+MANIFEST_COLUMNS = ('receiver_id', 'title', 'file')
+
+# Larger archive members are rejected instead of being read (zip bombs)
+MAX_FILE_SIZE = 50 * 2 ** 20
+
+
+def read_manifest(manifest_file):
+    """Rows of the CSV manifest as {receiver_id, title, file}; raises ValueError on a malformed file."""
+    lines = manifest_file.read().decode('utf-8-sig').splitlines()
+    reader = csv.DictReader(lines)
+    missing = set(MANIFEST_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"Manifest is missing column(s): {', '.join(sorted(missing))}")
+    return [{column: (row.get(column) or '').strip() for column in MANIFEST_COLUMNS} for row in reader]
+
+
+def _upload_member(archive, name):
+    try:
+        with archive.open(name) as member:
+            return upload_file_to_ipfs(member)
+    finally:
+        # Pool threads open their own DB connection for the content-hash lookup
+        connections.close_all()
+
+
+def _fail(item, error):
+    item['status'] = 'failed'
+    item['error'] = error
+
+
+def issue_bulk(issuer, rows, archive):
+    """
+    Issues one document per manifest row from the files in `archive` (a ZipFile).
+
+    Receivers are resolved in one query and files are uploaded to IPFS by a
+    bounded thread pool. The documents and their queued jobs are committed
+    together with the report, then broadcast back to back as for asynchronous
+    issuance (or left to confirm_transactions when batching); a failed broadcast
+    fails its job only. Returns the BulkIssuance report.
+    """
+    items = [
+        {'row': number, **row, 'status': None, 'error': None, 'document_id': None, 'job_id': None}
+        for number, row in enumerate(rows, start=1)
+    ]
+
+    receivers = {
+        user.public_id: user
+        for user in CustomUser.objects.filter(public_id__in={item['receiver_id'] for item in items})
+    }
+    members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+
+    first_rows = {}  # (receiver_id, file) -> first item issuing it
+    repeats = []  # (item, first item)
+    for item in items:
+        if not item['receiver_id'] or not item['title'] or not item['file']:
+            _fail(item, 'Missing fields')
+        elif item['receiver_id'] not in receivers:
+            _fail(item, 'Receiver not found')
+        elif item['file'] not in members:
+            _fail(item, 'File not found in archive')
+        elif members[item['file']].file_size > MAX_FILE_SIZE:
+            _fail(item, 'File too large')
+        elif (item['receiver_id'], item['file']) in first_rows:
+            # A repeated row issues nothing; it reports the first row's document
+            item['status'] = 'duplicate'
+            repeats.append((item, first_rows[item['receiver_id'], item['file']]))
+        else:
+            first_rows[item['receiver_id'], item['file']] = item
+
+    # Each distinct file is uploaded once, even if several rows issue it
+    names = sorted({item['file'] for item in items if item['status'] is None})
+    with ThreadPoolExecutor(max_workers=settings.IPFS_UPLOAD_WORKERS) as pool:
+        cids = dict(zip(names, pool.map(partial(_upload_member, archive), names)))
+
+    for item in items:
+        if item['status'] is None and not cids[item['file']]:
+            _fail(item, 'IPFS upload failed')
+
+    if settings.DUPLICATE_ISSUANCE != 'allow':
+        existing = {
+            (doc.receiver_id, doc.ipfs_hash): doc.id
+            for doc in AuthorityIssuedDocument.objects.filter(issuer=issuer, ipfs_hash__in=set(cids.values()))
+            .only('id', 'receiver_id', 'ipfs_hash')
+        }
+        for item in items:
+            if item['status'] is None:
+                duplicate = existing.get((receivers[item['receiver_id']].id, cids[item['file']]))
+                if duplicate:
+                    item['document_id'] = duplicate
+                    if settings.DUPLICATE_ISSUANCE == 'reject':
+                        _fail(item, 'This document has already been issued.')
+                    else:
+                        item['status'] = 'duplicate'
+
+    ready = [item for item in items if item['status'] is None]
+    with transaction.atomic():
+        docs = AuthorityIssuedDocument.objects.bulk_create([
+            AuthorityIssuedDocument(
+                issuer=issuer,
+                receiver=receivers[item['receiver_id']],
+                title=item['title'],
+                tx_hash='',
+                ipfs_hash=cids[item['file']],
+            )
+            for item in ready
+        ])
+        jobs = TransactionJob.objects.bulk_create([
+            TransactionJob(submitted_by=issuer, status='queued', authority_document=doc) for doc in docs
+        ])
+        count_issuances(issuer.id, [doc.receiver_id for doc in docs])
+        for item, doc, job in zip(ready, docs, jobs):
+            item['status'] = 'queued'
+            item['document_id'] = doc.id
+            item['job_id'] = str(job.id)
+        for item, first in repeats:
+            if first['status'] == 'failed':
+                _fail(item, first['error'])
+            else:
+                item['document_id'] = first['document_id']
+
+        batch = BulkIssuance.objects.create(issuer=issuer, items=items)
+
+    # Batched issuances are broadcast later by the confirm_transactions command
+    if not settings.CHAIN_BATCHING:
+        for item, job in zip(ready, jobs):
+            submit_job(job)
+            item['status'] = job.status
+            item['error'] = job.error or None
+            if job.status == 'failed':
+                # Its document was deleted with the failed broadcast
+                item['document_id'] = None
+        for item, first in repeats:
+            if first['status'] == 'failed':
+                _fail(item, first['error'])
+                item['document_id'] = None
+        batch.save(update_fields=['items'])
+    return batch
+
+
+def bulk_issuance_report(batch):
+    """The stored report with each item's current job status and on-chain index."""
+    jobs = {
+        str(job.id): job
+        for job in TransactionJob.objects.filter(id__in=[item['job_id'] for item in batch.items if item['job_id']])
+        .select_related('authority_document')
+    }
+    items = []
+    for item in batch.items:
+        job = jobs.get(item['job_id'])
+        if job:
+            item = {
+                **item,
+                'status': job.status,
+                'error': job.error or None,
+                'tx_hash': job.tx_hash,
+                'document_index': job.authority_document.document_index if job.authority_document else None,
+            }
+        items.append(item)
+    return items
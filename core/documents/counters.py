@@ -0,0 +1,221 @@
+from collections import Counter
+from datetime import datetime, time, timezone as dt_timezone
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from blockchain.models import VerificationHistory
+from users.stats import increment_system_stat
+from .models import (
+    AuthorityIssuedDocument,
+    UserUploadedDocument,
+    UserCounters,
+    VerificationDailyRollup,
+    IssuanceDailyRollup,
+)
+
+
+def recount(user_id):
+    """Every counter of one user, counted from the source tables."""
+    uploaded = UserUploadedDocument.objects.filter(owner_id=user_id).aggregate(
+        total=Count('id'), flagged=Count('id', filter=Q(flagged=True))
+    )
+    received = AuthorityIssuedDocument.objects.filter(receiver_id=user_id).aggregate(
+        total=Count('id'), flagged=Count('id', filter=Q(flagged=True))
+    )
+    return {
+        'uploaded': uploaded['total'],
+        'received': received['total'],
+        'flagged': uploaded['flagged'] + received['flagged'],
+        'issued': AuthorityIssuedDocument.objects.filter(issuer_id=user_id).count(),
+        'verified': VerificationHistory.objects.filter(verifier_id=user_id).count(),
+    }
+
+
+def _create_from_source(user_id):
+    """Creates the user's row from a recount; None if another request created it first."""
+    try:
+        with transaction.atomic():
+            return UserCounters.objects.create(user_id=user_id, **recount(user_id))
+    except IntegrityError:
+        return None
+
+
+def get_counters(user):
+    """The user's counters with a single primary-key read (a recount the first time)."""
+    return (
+        UserCounters.objects.filter(pk=user.pk).first()
+        or _create_from_source(user.pk)
+        or UserCounters.objects.get(pk=user.pk)
+    )
+
+
+def add_to_counters(user_id, **deltas):
+    """
+    Adds `deltas` (counter name -> change) to a user's counters.
+
+    Call it inside the transaction that writes the counted rows, after writing
+    them: the update then commits or rolls back with them. A user without a row
+    yet gets one from a recount, which already includes those rows.
+    """
+    updates = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    if not updates:
+        return
+    if UserCounters.objects.filter(pk=user_id).update(**updates):
+        return
+    if _create_from_source(user_id) is None:
+        UserCounters.objects.filter(pk=user_id).update(**updates)
+
+
+def _add_to_rollup(model, count, **key):
+    """Adds `count` to the rollup row identified by `key`, creating the row on its first event."""
+    if not count:
+        return
+    if model.objects.filter(**key).update(count=F('count') + count):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=count, **key)
+    except IntegrityError:
+        model.objects.filter(**key).update(count=F('count') + count)
+
+
+def count_issuances(issuer_id, receiver_ids):
+    """
+    Counts documents just issued by `issuer_id`, one receiver id per document, in
+    the per-user counters, the issuer's daily rollup and the public system stats.
+    Call it inside the transaction that created them.
+    """
+    add_to_counters(issuer_id, issued=len(receiver_ids))
+    for receiver_id, count in Counter(receiver_ids).items():
+        add_to_counters(receiver_id, received=count)
+    _add_to_rollup(IssuanceDailyRollup, len(receiver_ids), issuer_id=issuer_id, day=timezone.now().date())
+    increment_system_stat('documents_issued', len(receiver_ids))
+
+
+def discard_documents(docs):
+    """
+    Deletes documents whose transaction never reached the chain and takes them
+    back out of the counters, issuance rollups and system stats they were
+    counted in. Call it inside a transaction.
+    """
+    issued = [doc for doc in docs if isinstance(doc, AuthorityIssuedDocument)]
+    uploaded = [doc for doc in docs if isinstance(doc, UserUploadedDocument)]
+
+    # Before the delete: a user without a counters row gets one from a recount that still includes them
+    for issuer_id, count in Counter(doc.issuer_id for doc in issued).items():
+        add_to_counters(issuer_id, issued=-count)
+    for receiver_id, count in Counter(doc.receiver_id for doc in issued).items():
+        add_to_counters(receiver_id, received=-count)
+    for owner_id, count in Counter(doc.owner_id for doc in uploaded).items():
+        add_to_counters(owner_id, uploaded=-count)
+    for (issuer_id, day), count in Counter((doc.issuer_id, doc.issued_at.date()) for doc in issued).items():
+        IssuanceDailyRollup.objects.filter(issuer_id=issuer_id, day=day).update(count=F('count') - count)
+
+    AuthorityIssuedDocument.objects.filter(id__in=[doc.id for doc in issued]).delete()
+    UserUploadedDocument.objects.filter(id__in=[doc.id for doc in uploaded]).delete()
+    increment_system_stat('documents_issued', -len(issued))
+
+
+def save_verifications(*entries):
+    """
+    bulk_create VerificationHistory entries and count them, atomically, in their
+    verifiers' counters and daily rollups; successful ones also count towards
+    the public system stats.
+    """
+    with transaction.atomic():
+        VerificationHistory.objects.bulk_create(entries)
+        for verifier_id, count in Counter(entry.verifier_id for entry in entries).items():
+            add_to_counters(verifier_id, verified=count)
+        # verified_at is filled in by bulk_create
+        outcomes = Counter((entry.verifier_id, entry.verified_at.date(), entry.success) for entry in entries)
+        for (verifier_id, day, success), count in outcomes.items():
+            _add_to_rollup(VerificationDailyRollup, count, verifier_id=verifier_id, day=day, success=success)
+        increment_system_stat('documents_verified', sum(entry.success for entry in entries))
+
+
+def set_local_flag(index, flag):
+    """
+    Sets `flagged` on the local document stored at on-chain `index` and adjusts
+    its holder's flagged counter. Returns False if there is no such document.
+    """
+    with transaction.atomic():
+        doc = AuthorityIssuedDocument.objects.select_for_update().filter(document_index=index).first()
+        holder_id = doc.receiver_id if doc else None
+        if doc is None:
+            doc = UserUploadedDocument.objects.select_for_update().filter(document_index=index).first()
+            holder_id = doc.owner_id if doc else None
+        if doc is None:
+            return False
+
+        if doc.flagged != flag:
+            doc.flagged = flag
+            doc.save(update_fields=['flagged'])
+            add_to_counters(holder_id, flagged=1 if flag else -1)
+        return True
+
+
+def rebuild_counters():
+    """
+    Replaces every user's counters with grouped counts of the source tables, in
+    one transaction. Returns the number of rows written.
+    """
+
+    def grouped(queryset, field, **aggregates):
+        return {row[field]: row for row in queryset.values(field).annotate(**aggregates).order_by()}
+
+    flagged = Count('id', filter=Q(flagged=True))
+    with transaction.atomic():
+        uploaded = grouped(UserUploadedDocument.objects, 'owner_id', total=Count('id'), flagged=flagged)
+        received = grouped(AuthorityIssuedDocument.objects, 'receiver_id', total=Count('id'), flagged=flagged)
+        issued = grouped(AuthorityIssuedDocument.objects, 'issuer_id', total=Count('id'))
+        verified = grouped(VerificationHistory.objects, 'verifier_id', total=Count('id'))
+
+        rows = [
+            UserCounters(
+                user_id=user_id,
+                uploaded=uploaded.get(user_id, {}).get('total', 0),
+                received=received.get(user_id, {}).get('total', 0),
+                flagged=uploaded.get(user_id, {}).get('flagged', 0) + received.get(user_id, {}).get('flagged', 0),
+                issued=issued.get(user_id, {}).get('total', 0),
+                verified=verified.get(user_id, {}).get('total', 0),
+            )
+            for user_id in set(uploaded) | set(received) | set(issued) | set(verified)
+        ]
+        UserCounters.objects.all().delete()
+        UserCounters.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def rebuild_rollups(since=None):
+    """
+    Recomputes the daily verification and issuance rollups from the source tables,
+    for every day or only from UTC day `since` onwards. Returns the rows written.
+    """
+    verifications = VerificationHistory.objects.all()
+    issuances = AuthorityIssuedDocument.objects.all()
+    verification_rollups = VerificationDailyRollup.objects.all()
+    issuance_rollups = IssuanceDailyRollup.objects.all()
+    if since:
+        start = datetime.combine(since, time.min, tzinfo=dt_timezone.utc)
+        verifications = verifications.filter(verified_at__gte=start)
+        issuances = issuances.filter(issued_at__gte=start)
+        verification_rollups = verification_rollups.filter(day__gte=since)
+        issuance_rollups = issuance_rollups.filter(day__gte=since)
+
+    with transaction.atomic():
+        verification_rows = [
+            VerificationDailyRollup(**row)
+            for row in verifications.annotate(day=TruncDate('verified_at', tzinfo=dt_timezone.utc))
+            .values('verifier_id', 'day', 'success').annotate(count=Count('id')).order_by()
+        ]
+        issuance_rows = [
+            IssuanceDailyRollup(**row)
+            for row in issuances.annotate(day=TruncDate('issued_at', tzinfo=dt_timezone.utc))
+            .values('issuer_id', 'day').annotate(count=Count('id')).order_by()
+        ]
+        verification_rollups.delete()
+        issuance_rollups.delete()
+        VerificationDailyRollup.objects.bulk_create(verification_rows, batch_size=1000)
+        IssuanceDailyRollup.objects.bulk_create(issuance_rows, batch_size=1000)
+    return len(verification_rows) + len(issuance_rows)
@@ -0,0 +1,23 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from documents.counters import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the daily verification and issuance rollups behind /api/documents/analytics/ "
+        "from the source tables, e.g. after rows were changed outside the API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First UTC day (YYYY-MM-DD) to rebuild; default is every day")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since must be a date (YYYY-MM-DD)")
+
+        self.stdout.write(f"Wrote {rebuild_rollups(since)} rollup row(s)")
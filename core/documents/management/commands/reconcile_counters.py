@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from documents.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the per-user dashboard counters from the document and verification "
+        "tables, e.g. after rows were changed outside the API."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Rebuilt counters for {rebuild_counters()} user(s)")
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0009_rename_block_hash_authorityissueddocument_block_tx_hash_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authorityissueddocument',
+            index=models.Index(fields=['issuer', 'receiver', 'ipfs_hash'], name='documents_a_issuer__0b39cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useruploadeddocument',
+            index=models.Index(fields=['owner', 'ipfs_hash'], name='documents_u_owner_i_f8be58_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0010_duplicate_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='authorityissueddocument',
+            name='ipfs_hash',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='useruploadeddocument',
+            name='ipfs_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0012_bulkissuance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authorityissueddocument',
+            index=models.Index(fields=['receiver', 'issued_at', 'id'], name='documents_a_receive_0bb13c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useruploadeddocument',
+            index=models.Index(fields=['owner', 'uploaded_at', 'id'], name='documents_u_owner_i_48be4b_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0013_timeline_indexes'),
+        ('users', '0003_alter_customuser_proof_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('uploaded', models.IntegerField(default=0)),
+                ('received', models.IntegerField(default=0)),
+                ('flagged', models.IntegerField(default=0)),
+                ('issued', models.IntegerField(default=0)),
+                ('verified', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
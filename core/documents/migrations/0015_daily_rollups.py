@@ -0,0 +1,66 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:20
+
+import django.db.models.deletion
+from datetime import timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    VerificationHistory = apps.get_model('blockchain', 'VerificationHistory')
+    AuthorityIssuedDocument = apps.get_model('documents', 'AuthorityIssuedDocument')
+    VerificationDailyRollup = apps.get_model('documents', 'VerificationDailyRollup')
+    IssuanceDailyRollup = apps.get_model('documents', 'IssuanceDailyRollup')
+
+    verifications = (
+        VerificationHistory.objects.annotate(day=TruncDate('verified_at', tzinfo=timezone.utc))
+        .values('verifier_id', 'day', 'success').annotate(count=Count('id')).order_by()
+    )
+    VerificationDailyRollup.objects.bulk_create(
+        [VerificationDailyRollup(**row) for row in verifications], batch_size=1000
+    )
+    issuances = (
+        AuthorityIssuedDocument.objects.annotate(day=TruncDate('issued_at', tzinfo=timezone.utc))
+        .values('issuer_id', 'day').annotate(count=Count('id')).order_by()
+    )
+    IssuanceDailyRollup.objects.bulk_create([IssuanceDailyRollup(**row) for row in issuances], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0007_verification_verifier_index'),
+        ('documents', '0014_usercounters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssuanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('issuer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='issuance_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('issuer', 'day'), name='unique_issuance_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VerificationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('success', models.BooleanField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('verifier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verification_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('verifier', 'day', 'success'), name='unique_verification_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
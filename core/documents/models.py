@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.conf import settings
 
@@ -7,10 +8,18 @@ class AuthorityIssuedDocument(models.Model):
     title = models.CharField(max_length=255)
     issued_at = models.DateTimeField(auto_now_add=True)
     tx_hash = models.CharField(max_length=66) 
-    ipfs_hash = models.CharField(max_length=255)
+    ipfs_hash = models.CharField(max_length=255, db_index=True)
     document_index = models.PositiveIntegerField(null=True, blank=True)
     block_tx_hash = models.CharField(max_length=66, null=True, blank=True)
     flagged = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Duplicate issuance lookup
+            models.Index(fields=['issuer', 'receiver', 'ipfs_hash']),
+            # Keyset pagination of a receiver's timeline
+            models.Index(fields=['receiver', 'issued_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.title} -> {self.receiver.public_id}"
@@ -21,10 +30,77 @@ class UserUploadedDocument(models.Model):
     title = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     tx_hash = models.CharField(max_length=66, blank=True, null=True)
-    ipfs_hash = models.CharField(max_length=255, blank=True, null=True)
+    ipfs_hash = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     document_index = models.PositiveIntegerField(null=True, blank=True)
     block_tx_hash = models.CharField(max_length=66, null=True, blank=True)
     flagged = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Duplicate upload lookup
+            models.Index(fields=['owner', 'ipfs_hash']),
+            # Keyset pagination of an owner's timeline
+            models.Index(fields=['owner', 'uploaded_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.owner.public_id})"
+
+
+class BulkIssuance(models.Model):
+    """A CSV/ZIP batch sent to the bulk issuance endpoint, with one report entry per manifest row."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    issuer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='bulk_issuances')
+    created_at = models.DateTimeField(auto_now_add=True)
+    items = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"Bulk issuance {self.id} ({len(self.items)} items)"
+
+
+class UserCounters(models.Model):
+    """
+    Dashboard totals for one user, kept in step with the rows they count by
+    documents.counters. Rebuild with `manage.py reconcile_counters` if they drift.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='counters')
+    uploaded = models.IntegerField(default=0)  # UserUploadedDocument owned
+    received = models.IntegerField(default=0)  # AuthorityIssuedDocument received
+    flagged = models.IntegerField(default=0)  # flagged among both of the above
+    issued = models.IntegerField(default=0)  # AuthorityIssuedDocument issued
+    verified = models.IntegerField(default=0)  # VerificationHistory entries as verifier
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Counters of {self.user_id}"
+
+
+class VerificationDailyRollup(models.Model):
+    """VerificationHistory entries per verifier, UTC day and outcome; see documents.counters."""
+    verifier = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='verification_rollups')
+    day = models.DateField()
+    success = models.BooleanField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['verifier', 'day', 'success'], name='unique_verification_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.verifier_id} {self.day} success={self.success}: {self.count}"
+
+
+class IssuanceDailyRollup(models.Model):
+    """AuthorityIssuedDocument rows per issuer and UTC day; see documents.counters."""
+    issuer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='issuance_rollups')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['issuer', 'day'], name='unique_issuance_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.issuer_id} {self.day}: {self.count}"
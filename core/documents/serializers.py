@@ -23,6 +23,14 @@ class UserUploadedDocumentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['ipfs_hash', 'tx_hash', 'block_tx_hash', 'document_index', 'uploaded_at']
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        # Join the owner and load only the serialized columns, so a list costs one query
+        return queryset.select_related('owner').only(
+            *(f for f in cls.Meta.fields if f not in ('owner_name', 'owner_public_id')),
+            'owner__username', 'owner__public_id',
+        )
+
 
 class AuthorityIssuedDocumentSerializer(serializers.ModelSerializer):
     issuer_name = serializers.CharField(source='issuer.name', read_only=True)
@@ -49,3 +57,11 @@ class AuthorityIssuedDocumentSerializer(serializers.ModelSerializer):
             'flagged',
         ]
         read_only_fields = ['ipfs_hash', 'tx_hash', 'block_hash', 'document_index', 'issued_at']
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        # Join both parties and load only the serialized columns, so a list costs one query
+        return queryset.select_related('issuer', 'receiver').only(
+            *(f for f in cls.Meta.fields if not f.endswith(('_name', '_public_id'))),
+            'issuer__name', 'issuer__public_id', 'receiver__username', 'receiver__public_id',
+        )
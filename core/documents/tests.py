@@ -1,3 +1,578 @@
-from django.test import TestCase
+import importlib
+import io
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from blockchain.ipfs_cache import IPFSContentCache
+from blockchain.jobs import confirm_pending_jobs
+from blockchain.models import TransactionJob, VerificationHistory
+from core import settings as settings_module
+from users.models import CustomUser
+from .bulk import read_manifest
+from .counters import (
+    add_to_counters, count_issuances, get_counters, rebuild_counters, rebuild_rollups, recount, save_verifications,
+    set_local_flag,
+)
+from .views import RangeNotSatisfiable, parse_range
+from .models import (
+    AuthorityIssuedDocument, BulkIssuance, UserUploadedDocument, UserCounters, VerificationDailyRollup, IssuanceDailyRollup,
+)
 
-# Create your tests here.
+
+class DocumentListQueryCountTests(TestCase):
+    """List endpoints must cost a fixed number of queries, however many documents there are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(
+            username='authority', name='Registry', role='authority', is_verified_authority=True
+        )
+        cls.user = CustomUser.objects.create(username='holder')
+        cls.other = CustomUser.objects.create(username='other')
+
+    def add_documents(self, count):
+        UserUploadedDocument.objects.bulk_create([
+            UserUploadedDocument(owner=self.user, title=f"Upload {i}", ipfs_hash=f"QmUpload{i}", tx_hash='0x')
+            for i in range(count)
+        ])
+        AuthorityIssuedDocument.objects.bulk_create([
+            AuthorityIssuedDocument(
+                issuer=self.authority, receiver=receiver, title=f"Issued {i}", ipfs_hash=f"QmIssued{i}", tx_hash='0x'
+            )
+            for i in range(count)
+            for receiver in (self.user, self.other)
+        ])
+
+    def get(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(url)
+
+    def test_user_documents_list(self):
+        for count in (1, 25):
+            self.add_documents(count)
+            with self.assertNumQueries(2):
+                response = self.get(self.user, '/api/documents/user-documents/')
+            self.assertEqual(response.status_code, 200)
+
+        documents = response.json()
+        self.assertEqual(len(documents['user_uploaded_documents']), 26)
+        self.assertEqual(documents['user_uploaded_documents'][0]['owner_name'], 'holder')
+        self.assertEqual(documents['authority_issued_documents'][0]['issuer_name'], 'Registry')
+        self.assertEqual(documents['authority_issued_documents'][0]['receiver_public_id'], self.user.public_id)
+
+    def test_authority_documents_list(self):
+        for count in (1, 25):
+            self.add_documents(count)
+            with self.assertNumQueries(1):
+                response = self.get(self.authority, '/api/documents/authority-documents/')
+            self.assertEqual(response.status_code, 200)
+
+        documents = response.json()
+        self.assertEqual(len(documents), 52)
+        self.assertEqual(
+            {doc['receiver_name'] for doc in documents}, {'holder', 'other'}
+        )
+
+
+class DocumentTimelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        cls.user = CustomUser.objects.create(username='holder')
+        uploads = UserUploadedDocument.objects.bulk_create([
+            UserUploadedDocument(owner=cls.user, title=f"Upload {i}", tx_hash='0x') for i in range(7)
+        ])
+        issued = AuthorityIssuedDocument.objects.bulk_create([
+            AuthorityIssuedDocument(issuer=cls.authority, receiver=cls.user, title=f"Issued {i}", tx_hash='0x')
+            for i in range(6)
+        ])
+        # Several documents per timestamp, across both tables, to exercise the tie-breaks
+        start = timezone.now()
+        for i, doc in enumerate(uploads):
+            UserUploadedDocument.objects.filter(pk=doc.pk).update(uploaded_at=start - timedelta(minutes=i // 3))
+        for i, doc in enumerate(issued):
+            AuthorityIssuedDocument.objects.filter(pk=doc.pk).update(issued_at=start - timedelta(minutes=i // 2))
+
+    def test_pages_cover_every_document_once_newest_first(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(2):
+                response = client.get('/api/documents/timeline/', {'limit': 4, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            seen += [(entry['timestamp'], entry['type'], entry['document']['id']) for entry in response.json()['results']]
+            cursor = response.json()['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 13)
+        self.assertEqual(len(set(seen)), 13)
+        timestamps = [timestamp for timestamp, _, _ in seen]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    def test_invalid_cursor(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/documents/timeline/', {'cursor': 'nope'}).status_code, 400)
+
+
+class UserCountersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        cls.user = CustomUser.objects.create(username='holder')
+
+    def test_counters_follow_writes_and_match_a_rebuild(self):
+        # Rows that predate the counters are picked up by the first recount
+        UserUploadedDocument.objects.create(owner=self.user, title="Old", tx_hash='0x', document_index=1)
+        with transaction.atomic():
+            AuthorityIssuedDocument.objects.create(
+                issuer=self.authority, receiver=self.user, title="New", tx_hash='0x', document_index=2
+            )
+            add_to_counters(self.authority.id, issued=1)
+            add_to_counters(self.user.id, received=1)
+        set_local_flag(2, True)
+        set_local_flag(2, True)
+        set_local_flag(1, True)
+        set_local_flag(1, False)
+        save_verifications(*[VerificationHistory(verifier=self.authority, success=True) for _ in range(3)])
+
+        expected = {
+            self.user.id: {'uploaded': 1, 'received': 1, 'flagged': 1, 'issued': 0, 'verified': 0},
+            self.authority.id: {'uploaded': 0, 'received': 0, 'flagged': 0, 'issued': 1, 'verified': 3},
+        }
+        for user_id, values in expected.items():
+            self.assertEqual(recount(user_id), values)
+            self.assertEqual(model_to_dict(UserCounters.objects.get(pk=user_id), fields=values), values)
+
+        UserCounters.objects.update(issued=99)
+        self.assertEqual(rebuild_counters(), 2)
+        self.assertEqual(UserCounters.objects.get(pk=self.authority.id).issued, 1)
+
+    def test_stats_are_one_query(self):
+        get_counters(self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = client.get('/api/documents/user/document-stats/')
+        self.assertEqual(response.json(), {'uploaded_documents': 0, 'authority_issued_documents': 0, 'flagged_documents': 0})
+
+
+class AnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        cls.other = CustomUser.objects.create(username='other', role='authority', is_verified_authority=True)
+        cls.user = CustomUser.objects.create(username='holder')
+
+    def rollups(self):
+        return (
+            sorted(VerificationDailyRollup.objects.values_list('verifier_id', 'day', 'success', 'count')),
+            sorted(IssuanceDailyRollup.objects.values_list('issuer_id', 'day', 'count')),
+        )
+
+    def test_rollups_follow_writes_and_match_a_rebuild(self):
+        with transaction.atomic():
+            AuthorityIssuedDocument.objects.bulk_create([
+                AuthorityIssuedDocument(issuer=self.authority, receiver=self.user, title=f"Doc {i}", tx_hash='0x')
+                for i in range(2)
+            ])
+            count_issuances(self.authority.id, [self.user.id, self.user.id])
+        save_verifications(
+            VerificationHistory(verifier=self.authority, success=True),
+            VerificationHistory(verifier=self.authority, success=False),
+            VerificationHistory(verifier=self.other, success=True),
+        )
+        save_verifications(VerificationHistory(verifier=self.authority, success=True))
+
+        today = timezone.now().date()
+        incremental = self.rollups()
+        self.assertEqual(incremental, (
+            sorted([(self.authority.id, today, False, 1), (self.authority.id, today, True, 2), (self.other.id, today, True, 1)]),
+            [(self.authority.id, today, 2)],
+        ))
+        VerificationDailyRollup.objects.update(count=99)
+        self.assertEqual(rebuild_rollups(), 4)
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_series_are_bucketed_and_scoped(self):
+        today = timezone.now().date()
+        VerificationDailyRollup.objects.bulk_create([
+            VerificationDailyRollup(verifier=self.authority, day=today, success=True, count=5),
+            VerificationDailyRollup(verifier=self.authority, day=today - timedelta(days=1), success=False, count=2),
+            VerificationDailyRollup(verifier=self.other, day=today, success=True, count=7),
+        ])
+        IssuanceDailyRollup.objects.create(issuer=self.authority, day=today, count=3)
+
+        client = APIClient()
+        client.force_authenticate(self.authority)
+        response = client.get('/api/documents/analytics/', {'from': str(today - timedelta(days=1)), 'to': str(today)})
+        self.assertEqual(response.json()['series'], [
+            {'period': str(today - timedelta(days=1)), 'verifications_succeeded': 0, 'verifications_failed': 2, 'issued': 0},
+            {'period': str(today), 'verifications_succeeded': 5, 'verifications_failed': 0, 'issued': 3},
+        ])
+
+        staff = CustomUser.objects.create(username='staff', is_staff=True)
+        client.force_authenticate(staff)
+        response = client.get('/api/documents/analytics/', {'bucket': 'month', 'from': str(today), 'to': str(today)})
+        self.assertEqual(response.json()['series'][0]['verifications_succeeded'], 12)
+        self.assertEqual(client.get('/api/documents/analytics/', {'bucket': 'year'}).status_code, 400)
+
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/api/documents/analytics/').status_code, 403)
+
+
+TX_HASH = '0x' + 'ab' * 32
+
+
+class AsyncIssuanceTests(TestCase):
+    """async=true issuance: job creation, status polling and settlement, with the chain and IPFS stubbed out."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        cls.user = CustomUser.objects.create(username='holder')
+
+    def setUp(self):
+        for target, value in (
+            ('documents.views.stream_uploads_to_ipfs', lambda request: None),
+            ('documents.views.upload_file_to_ipfs', lambda file: 'QmAsync'),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.authority)
+
+    def issue(self, submit=None):
+        with mock.patch('blockchain.jobs.submit_document_to_chain', submit or mock.Mock(return_value=TX_HASH)):
+            return self.client.post('/api/documents/issue/', {
+                'async': 'true',
+                'receiver_id': self.user.public_id,
+                'title': 'Diploma',
+                'file': SimpleUploadedFile('diploma.pdf', b'%PDF'),
+            })
+
+    def test_issue_commits_the_job_then_broadcasts(self):
+        def submit(*args):
+            # The rows are committed (here: saved) and the job claimed before anything is sent
+            self.assertTrue(TransactionJob.objects.filter(status='submitting').exists())
+            return TX_HASH
+
+        response = self.issue(submit)
+        self.assertEqual(response.status_code, 202)
+        job = TransactionJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual((job.status, job.tx_hash), ('pending', TX_HASH))
+        self.assertEqual(job.authority_document.tx_hash, TX_HASH)
+        self.assertEqual(get_counters(self.authority).issued, 1)
+
+    def test_upload_is_stored_for_its_owner(self):
+        submit = mock.Mock(return_value=TX_HASH)
+        self.client.force_authenticate(self.user)
+        with mock.patch('blockchain.jobs.submit_document_to_chain', submit):
+            response = self.client.post('/api/documents/upload/', {
+                'async': 'true', 'title': 'Passport', 'file': SimpleUploadedFile('passport.pdf', b'%PDF'),
+            })
+        self.assertEqual(response.status_code, 202)
+        job = TransactionJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.user_document.owner, self.user)
+        self.assertEqual(submit.call_args.args[1:3], (self.user.blockchain_address, self.user.blockchain_address))
+        self.assertEqual(get_counters(self.user).uploaded, 1)
+
+    @override_settings(CHAIN_BATCHING=True)
+    def test_batching_leaves_the_job_queued(self):
+        submit = mock.Mock()
+        response = self.issue(submit)
+        self.assertEqual((response.status_code, response.json()['status']), (202, 'queued'))
+        submit.assert_not_called()
+
+    def test_rejected_broadcast_fails_the_job(self):
+        response = self.issue(mock.Mock(side_effect=Exception("insufficient funds")))
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response.json()['error'], "insufficient funds")
+        self.assertEqual(TransactionJob.objects.get().status, 'failed')
+
+    def test_failed_broadcast_leaves_no_document_behind(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.issue(mock.Mock(side_effect=Exception("insufficient funds")))
+        self.assertNotIn('document', response.json())
+        self.assertFalse(AuthorityIssuedDocument.objects.exists())
+        self.assertEqual((get_counters(self.authority).issued, get_counters(self.user).received), (0, 0))
+        self.assertEqual(IssuanceDailyRollup.objects.get(issuer=self.authority).count, 0)
+
+        # The job keeps its error for polling
+        data = self.client.get(f"/api/blockchain/jobs/{response.json()['job_id']}/").json()
+        self.assertEqual((data['status'], data['error'], data['document_id']), ('failed', "insufficient funds", None))
+
+    @override_settings(DUPLICATE_ISSUANCE='reject')
+    def test_retry_after_a_failed_broadcast_is_not_a_duplicate(self):
+        self.issue(mock.Mock(side_effect=Exception("insufficient funds")))
+        response = self.issue()
+        self.assertEqual((response.status_code, response.json()['status']), (202, 'pending'))
+        self.assertEqual(get_counters(self.authority).issued, 1)
+
+    def test_failed_upload_is_uncounted(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('blockchain.jobs.submit_document_to_chain', side_effect=Exception("nonce too low")):
+            response = self.client.post('/api/documents/upload/', {
+                'async': 'true', 'title': 'Passport', 'file': SimpleUploadedFile('passport.pdf', b'%PDF'),
+            })
+        self.assertEqual(response.status_code, 502)
+        self.assertFalse(UserUploadedDocument.objects.exists())
+        self.assertEqual(get_counters(self.user).uploaded, 0)
+
+    def test_status_follows_the_receipt(self):
+        job_id = self.issue().json()['job_id']
+        url = f'/api/blockchain/jobs/{job_id}/'
+        self.assertEqual(self.client.get(url).json()['status'], 'pending')
+
+        with mock.patch('blockchain.jobs.get_receipt', return_value=None):
+            self.assertEqual(confirm_pending_jobs(), 0)
+        with mock.patch('blockchain.jobs.get_receipt', return_value=SimpleNamespace(status=1)), \
+                mock.patch('blockchain.jobs.parse_document_batch_receipt', return_value=[(7, '0xblock')]):
+            self.assertEqual(confirm_pending_jobs(), 1)
+
+        data = self.client.get(url).json()
+        self.assertEqual(
+            (data['status'], data['document_index'], data['block_tx_hash'], data['tx_hash']),
+            ('confirmed', 7, '0xblock', TX_HASH),
+        )
+
+        # Only the submitter can poll a job
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unmined_job_times_out(self):
+        self.issue()
+        TransactionJob.objects.update(created_at=timezone.now() - timedelta(minutes=20))
+        with mock.patch('blockchain.jobs.get_receipt', return_value=None):
+            self.assertEqual(confirm_pending_jobs(timeout=600), 1)
+        self.assertEqual(TransactionJob.objects.get().status, 'failed')
+
+
+class DuplicateIssuanceSettingTests(SimpleTestCase):
+
+    def load_settings(self, value):
+        self.addCleanup(importlib.reload, settings_module)
+        with mock.patch.dict(os.environ, {'DUPLICATE_ISSUANCE': value}):
+            return importlib.reload(settings_module)
+
+    def test_unknown_value_fails_at_startup(self):
+        with self.assertRaisesMessage(ValueError, "'deny'"):
+            self.load_settings('deny')
+
+    def test_known_value_is_accepted(self):
+        self.assertEqual(self.load_settings('link').DUPLICATE_ISSUANCE, 'link')
+
+
+class ReadManifestTests(SimpleTestCase):
+
+    def read(self, text):
+        return read_manifest(io.BytesIO(text.encode('utf-8-sig')))
+
+    def test_rows_are_stripped_and_extra_columns_ignored(self):
+        rows = self.read("receiver_id,title,file,note\n ABC , Diploma ,a.pdf,x\nDEF,,b.pdf\n")
+        self.assertEqual(rows, [
+            {'receiver_id': 'ABC', 'title': 'Diploma', 'file': 'a.pdf'},
+            {'receiver_id': 'DEF', 'title': '', 'file': 'b.pdf'},
+        ])
+
+    def test_missing_columns_are_named(self):
+        with self.assertRaisesMessage(ValueError, "file, title"):
+            self.read("receiver_id\nABC\n")
+
+    def test_empty_manifest_is_malformed(self):
+        with self.assertRaises(ValueError):
+            self.read("")
+
+
+class BulkIssuanceTests(TestCase):
+    """CSV/ZIP issuance with IPFS and the chain stubbed out."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        cls.alice = CustomUser.objects.create(username='alice')
+        cls.bob = CustomUser.objects.create(username='bob')
+
+    def setUp(self):
+        patcher = mock.patch('documents.bulk.upload_file_to_ipfs', lambda member: f"Qm{member.name}")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.authority)
+
+    def post(self, rows, submit=None, files=('a.pdf', 'b.pdf')):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_archive:
+            for name in files:
+                zip_archive.writestr(name, b'%PDF ' + name.encode())
+        manifest = "receiver_id,title,file\n" + "".join(f"{receiver},{title},{file}\n" for receiver, title, file in rows)
+        with mock.patch('blockchain.jobs.submit_document_to_chain', submit or mock.Mock(return_value=TX_HASH)):
+            return self.client.post('/api/documents/issue/bulk/', {
+                'manifest': SimpleUploadedFile('manifest.csv', manifest.encode()),
+                'archive': SimpleUploadedFile('documents.zip', archive.getvalue()),
+            })
+
+    def test_rows_are_committed_before_anything_is_broadcast(self):
+        def submit(*args):
+            self.assertEqual(AuthorityIssuedDocument.objects.count(), 2)
+            self.assertTrue(BulkIssuance.objects.exists())
+            return TX_HASH
+
+        response = self.post([(self.alice.public_id, "One", 'a.pdf'), (self.bob.public_id, "Two", 'b.pdf')], submit)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['submitted'], 2)
+        self.assertEqual([item['status'] for item in response.json()['items']], ['pending', 'pending'])
+        self.assertEqual(get_counters(self.authority).issued, 2)
+
+    def test_each_row_reports_its_own_failure(self):
+        submit = mock.Mock(side_effect=[TX_HASH, Exception("insufficient funds")])
+        response = self.post([
+            (self.alice.public_id, "Sent", 'a.pdf'),
+            (self.bob.public_id, "Rejected by the node", 'b.pdf'),
+            ('unknown', "No receiver", 'a.pdf'),
+            (self.alice.public_id, "No file", 'missing.pdf'),
+            (self.bob.public_id, "", 'a.pdf'),
+        ], submit)
+
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        self.assertEqual(body['submitted'], 1)
+        self.assertEqual([(item['status'], item['error']) for item in body['items']], [
+            ('pending', None),
+            ('failed', "insufficient funds"),
+            ('failed', "Receiver not found"),
+            ('failed', "File not found in archive"),
+            ('failed', "Missing fields"),
+        ])
+        # Only the broadcast document is kept and counted
+        self.assertEqual(body['items'][1]['document_id'], None)
+        self.assertEqual(list(AuthorityIssuedDocument.objects.values_list('title', flat=True)), ["Sent"])
+        self.assertEqual(get_counters(self.authority).issued, 1)
+        # The stored report agrees with the response
+        report = self.client.get(f"/api/documents/issue/bulk/{body['batch_id']}/").json()
+        self.assertEqual([item['status'] for item in report['items']], ['pending', 'failed', 'failed', 'failed', 'failed'])
+
+    def test_repeated_row_is_issued_once(self):
+        submit = mock.Mock(return_value=TX_HASH)
+        response = self.post([
+            (self.alice.public_id, "Diploma", 'a.pdf'),
+            (self.alice.public_id, "Diploma again", 'a.pdf'),
+            (self.bob.public_id, "Diploma", 'a.pdf'),
+        ], submit)
+
+        items = response.json()['items']
+        self.assertEqual([item['status'] for item in items], ['pending', 'duplicate', 'pending'])
+        self.assertEqual(items[1]['document_id'], items[0]['document_id'])
+        self.assertIsNone(items[1]['job_id'])
+        self.assertEqual(submit.call_count, 2)
+        self.assertEqual(AuthorityIssuedDocument.objects.filter(receiver=self.alice).count(), 1)
+
+    @override_settings(CHAIN_BATCHING=True)
+    def test_batching_leaves_the_jobs_queued(self):
+        submit = mock.Mock()
+        response = self.post([(self.alice.public_id, "One", 'a.pdf')], submit)
+        self.assertEqual(response.json()['items'][0]['status'], 'queued')
+        submit.assert_not_called()
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_ranges(self):
+        for header, expected in (
+            (None, None),
+            ('bytes=0-3', (0, 3)),
+            ('bytes=5-', (5, 9)),
+            ('bytes=8-100', (8, 9)),
+            ('bytes=-4', (6, 9)),
+            ('bytes=-100', (0, 9)),
+            # Sent whole: multiple ranges, other units, garbage
+            ('bytes=0-1,4-5', None),
+            ('items=0-3', None),
+            ('bytes=a-b', None),
+        ):
+            self.assertEqual(parse_range(header, 10), expected, header)
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=10-', 'bytes=5-2', 'bytes=-0'):
+            with self.assertRaises(RangeNotSatisfiable, msg=header):
+                parse_range(header, 10)
+
+
+class DocumentContentTests(TestCase):
+    CID = 'QmCachedContent'
+    CONTENT = b'0123456789'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='holder')
+        UserUploadedDocument.objects.create(owner=cls.user, title="Scan", ipfs_hash=cls.CID, tx_hash='0x')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = IPFSContentCache(directory.name, max_bytes=10 ** 6)
+        os.makedirs(os.path.dirname(self.cache.path_for(self.CID)))
+        with open(self.cache.path_for(self.CID), 'wb') as file:
+            file.write(self.CONTENT)
+        patcher = mock.patch('documents.views.ipfs_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **headers):
+        return self.client.get(f'/api/documents/content/{self.CID}/', headers=headers)
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response['ETag'], f'"{self.CID}"')
+
+    def test_range(self):
+        response = self.get(Range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual((response['Content-Range'], response['Content-Length']), ('bytes 2-5/10', '4'))
+
+    def test_range_is_ignored_when_if_range_does_not_match(self):
+        response = self.get(Range='bytes=2-5', **{'If-Range': '"QmOtherContent"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_not_modified_for_strong_and_weak_tags(self):
+        for tag in (f'"{self.CID}"', f'W/"{self.CID}"', f'"QmOther", W/"{self.CID}"', '*'):
+            self.assertEqual(self.get(**{'If-None-Match': tag}).status_code, 304, tag)
+        self.assertEqual(self.get(**{'If-None-Match': '"QmOther"'}).status_code, 200)
+
+    def test_failed_refetch_after_eviction_is_a_502(self):
+        # Found by the lookup, gone by the time it is opened, and Kubo is down
+        with mock.patch.object(self.cache, 'get', return_value=self.cache.path_for('QmEvicted12')), \
+                mock.patch.object(self.cache, 'fetch', side_effect=ConnectionError("refused")):
+            response = self.get(Range='bytes=0-1')
+        self.assertEqual(response.status_code, 502)
+
+    def test_other_users_get_a_404(self):
+        self.client.force_authenticate(CustomUser.objects.create(username='stranger'))
+        self.assertEqual(self.get().status_code, 404)
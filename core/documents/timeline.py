@@ -0,0 +1,84 @@
+import base64
+import heapq
+import json
+from datetime import datetime
+from django.db.models import Q
+from .models import AuthorityIssuedDocument, UserUploadedDocument
+from .serializers import AuthorityIssuedDocumentSerializer, UserUploadedDocumentSerializer
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# kind -> (model, timestamp field, owning user field, serializer). Entries are
+# ordered newest first by (timestamp, kind, id), so the order is total even when
+# both tables share a timestamp.
+SOURCES = {
+    'authority_issued': (AuthorityIssuedDocument, 'issued_at', 'receiver', AuthorityIssuedDocumentSerializer),
+    'user_uploaded': (UserUploadedDocument, 'uploaded_at', 'owner', UserUploadedDocumentSerializer),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp, kind, pk):
+    raw = json.dumps([timestamp.isoformat(), kind, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, kind, pk = json.loads(raw)
+        timestamp = datetime.fromisoformat(timestamp)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if kind not in SOURCES or not isinstance(pk, int):
+        raise InvalidCursor("Invalid cursor")
+    return timestamp, kind, pk
+
+
+def _after(kind, timestamp_field, cursor):
+    """Filter for the rows of `kind` that sort after the cursor (i.e. are older)."""
+    cursor_timestamp, cursor_kind, cursor_pk = cursor
+    if kind < cursor_kind:
+        return Q(**{f'{timestamp_field}__lte': cursor_timestamp})
+    if kind > cursor_kind:
+        return Q(**{f'{timestamp_field}__lt': cursor_timestamp})
+    return Q(**{f'{timestamp_field}__lt': cursor_timestamp}) | Q(
+        **{timestamp_field: cursor_timestamp, 'id__lt': cursor_pk}
+    )
+
+
+def timeline_page(user, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of the user's uploaded and received documents, newest first, and
+    the cursor of the next page (None on the last one).
+
+    Each table is read with a keyset filter on its (user, timestamp) index and
+    at most limit + 1 rows, and the two runs are merged in memory, so every page
+    costs the same whatever its depth.
+    """
+    position = decode_cursor(cursor) if cursor else None
+
+    runs = []
+    for kind, (model, timestamp_field, user_field, serializer_class) in SOURCES.items():
+        queryset = model.objects.filter(**{user_field: user})
+        if position:
+            queryset = queryset.filter(_after(kind, timestamp_field, position))
+        queryset = serializer_class.setup_eager_loading(queryset).order_by(f'-{timestamp_field}', '-id')
+        runs.append([
+            (getattr(doc, timestamp_field), kind, doc.id, doc)
+            for doc in queryset[:limit + 1]
+        ])
+
+    entries = list(heapq.merge(*runs, key=lambda entry: entry[:3], reverse=True))
+    page, more = entries[:limit], len(entries) > limit
+
+    results = [
+        {'type': kind, 'timestamp': timestamp, 'document': SOURCES[kind][3](doc).data}
+        for timestamp, kind, _, doc in page
+    ]
+    next_cursor = encode_cursor(*page[-1][:3]) if more else None
+    return results, next_cursor
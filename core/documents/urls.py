@@ -1,13 +1,18 @@
 from django.urls import path
-from .views import IssueDocumentView, UserUploadDocumentView, UserDocumentsListView, AuthorityUploadedDocumentListView, UserDocumentStatsView, AuthorityDashboardStatsView
+from .views import DocumentContentView, IssueDocumentView, BulkIssueDocumentView, BulkIssuanceStatusView, UserUploadDocumentView, UserDocumentsListView, UserDocumentTimelineView, AuthorityUploadedDocumentListView, UserDocumentStatsView, AuthorityDashboardStatsView, AnalyticsView
 
 urlpatterns = [
     path('issue/', IssueDocumentView.as_view(), name='issue-document'),
+    path('issue/bulk/', BulkIssueDocumentView.as_view(), name='bulk-issue-documents'),
+    path('issue/bulk/<uuid:batch_id>/', BulkIssuanceStatusView.as_view(), name='bulk-issuance-status'),
     path('upload/', UserUploadDocumentView.as_view(), name='user-upload-document'),
+    path('content/<str:cid>/', DocumentContentView.as_view(), name='document-content'),
     path('user-documents/', UserDocumentsListView.as_view(), name='user-documents-list'),
+    path('timeline/', UserDocumentTimelineView.as_view(), name='user-document-timeline'),
     path('authority-documents/', AuthorityUploadedDocumentListView.as_view(), name='authority-documents-list'),
     path('user/document-stats/', UserDocumentStatsView.as_view(), name='user-document-stats'),
-    path('authority/document-stats/', AuthorityDashboardStatsView.as_view(), name='authority-dashboard-stats')
+    path('authority/document-stats/', AuthorityDashboardStatsView.as_view(), name='authority-dashboard-stats'),
+    path('analytics/', AnalyticsView.as_view(), name='document-analytics'),
 ]
 
 
@@ -1,38 +1,126 @@
+import os
+import zipfile
+from datetime import date, timedelta
 from rest_framework import permissions, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from .models import AuthorityIssuedDocument, UserUploadedDocument
+from .counters import add_to_counters, count_issuances, get_counters
+from .bulk import read_manifest, issue_bulk, bulk_issuance_report
+from .timeline import timeline_page, InvalidCursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .analytics import analytics_series, BUCKETS, MAX_DAYS
+from .models import AuthorityIssuedDocument, UserUploadedDocument, BulkIssuance
 from .serializers import AuthorityIssuedDocumentSerializer, UserUploadedDocumentSerializer
+from django.conf import settings
 from blockchain.services import store_document_on_chain
-from blockchain.ipfs_utils import upload_file_to_ipfs
+from blockchain.jobs import submit_job
+from blockchain.ipfs_utils import ContentDigestMismatch, upload_file_to_ipfs, stream_uploads_to_ipfs
+from blockchain.ipfs_cache import ipfs_cache, CID_PATTERN
 from users.models import CustomUser
-from blockchain.models import VerificationHistory
+from blockchain.models import TransactionJob
 from core.utils import log_event
 
+
+def wants_async_issuance(request):
+    """Per-request `async` field, falling back to the ASYNC_ISSUANCE setting."""
+    value = request.data.get('async')
+    if value is None:
+        return settings.ASYNC_ISSUANCE
+    return str(value).lower() == 'true'
+
+
+def duplicate_response(document, serializer_class):
+    """Answer for content that was already issued/uploaded, per DUPLICATE_ISSUANCE ('reject' or 'link')."""
+    data = {'status': 'duplicate', 'document': serializer_class(document).data}
+    if settings.DUPLICATE_ISSUANCE == 'reject':
+        return Response({'error': 'This document has already been submitted.', **data}, status=409)
+    return Response(data, status=200)
+
+def submit_document_job(request, doc, serializer_class, count, event_type, message):
+    """
+    Saves `doc` with a queued TransactionJob and counts it (`count()`) in one
+    transaction, then broadcasts it unless CHAIN_BATCHING leaves that to the
+    confirm_transactions command. Broadcasting only after the commit means no
+    transaction reaches the chain without its local record; a failed broadcast
+    deletes and uncounts the document again (see blockchain.jobs._broadcast).
+    """
+    job_field = 'authority_document' if isinstance(doc, AuthorityIssuedDocument) else 'user_document'
+    with transaction.atomic():
+        doc.save()
+        job = TransactionJob.objects.create(submitted_by=request.user, status='queued', **{job_field: doc})
+        count()
+
+    if not settings.CHAIN_BATCHING:
+        submit_job(job)
+
+    status_code = 502 if job.status == 'failed' else 202
+    log_event(
+        user=request.user,
+        event_type=event_type,
+        level="ERROR" if job.status == 'failed' else "INFO",
+        message=f"{message} (job {job.id}{': ' + job.error if job.error else ''})",
+        path=request.path,
+        method=request.method,
+        status_code=status_code
+    )
+
+    if job.status == 'failed':
+        # The document was deleted with the failed broadcast; the job keeps the error
+        return Response({'status': job.status, 'job_id': str(job.id), 'error': job.error}, status=status_code)
+    return Response({'status': job.status, 'job_id': str(job.id), 'document': serializer_class(doc).data}, status=status_code)
+
+
 class IssueDocumentView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
         issuer = request.user
-        receiver_id = request.data.get('receiver_id')
-        title = request.data.get('title')
-        file = request.FILES.get('file')
 
         if not issuer.is_verified_authority:
             return Response({'error': 'You are not authorized to issue documents.'}, status=403)
 
+        # The file goes to IPFS while the body is parsed, so check permissions first
+        stream_uploads_to_ipfs(request)
+        receiver_id = request.data.get('receiver_id')
+        title = request.data.get('title')
+        file = request.FILES.get('file')
+
         if not receiver_id or not title or not file:
             return Response({'error': 'Missing fields'}, status=400)
 
         receiver = get_object_or_404(CustomUser, public_id=receiver_id)
-        ipfs_hash = upload_file_to_ipfs(file)
+        try:
+            ipfs_hash = upload_file_to_ipfs(file)
+        except ContentDigestMismatch as e:
+            return Response({'error': str(e)}, status=400)
 
         if not ipfs_hash:
             return Response({'error': 'IPFS upload failed'}, status=500)
 
+        if settings.DUPLICATE_ISSUANCE != 'allow':
+            # Same issuer, receiver and content: answer before paying for a transaction
+            duplicate = AuthorityIssuedDocument.objects.filter(
+                issuer=issuer, receiver=receiver, ipfs_hash=ipfs_hash
+            ).first()
+            if duplicate:
+                return duplicate_response(duplicate, AuthorityIssuedDocumentSerializer)
+
+        if wants_async_issuance(request):
+            return submit_document_job(
+                request,
+                AuthorityIssuedDocument(issuer=issuer, receiver=receiver, title=title, ipfs_hash=ipfs_hash),
+                AuthorityIssuedDocumentSerializer,
+                lambda: count_issuances(issuer.id, [receiver.id]),
+                "ISSUE_DOCUMENT",
+                f"Submitted document '{title}' for {receiver.username}",
+            )
+
         tx_hash, document_index, block_tx_hash = store_document_on_chain(
             ipfs_hash,
             issuer.blockchain_address,
@@ -41,15 +129,17 @@ class IssueDocumentView(APIView):
             issuer.private_key
         )
 
-        doc = AuthorityIssuedDocument.objects.create(
-            issuer=issuer,
-            receiver=receiver,
-            title=title,
-            tx_hash=tx_hash,
-            ipfs_hash=ipfs_hash,
-            document_index=document_index,
-            block_tx_hash=block_tx_hash,
-        )
+        with transaction.atomic():
+            doc = AuthorityIssuedDocument.objects.create(
+                issuer=issuer,
+                receiver=receiver,
+                title=title,
+                tx_hash=tx_hash,
+                ipfs_hash=ipfs_hash,
+                document_index=document_index,
+                block_tx_hash=block_tx_hash,
+            )
+            count_issuances(issuer.id, [receiver.id])
 
         serializer = AuthorityIssuedDocumentSerializer(doc)
         
@@ -66,23 +156,102 @@ class IssueDocumentView(APIView):
         return Response({'status': 'success', 'document': serializer.data}, status=201)
 
 
+class BulkIssueDocumentView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        issuer = request.user
+
+        if not issuer.is_verified_authority:
+            return Response({'error': 'You are not authorized to issue documents.'}, status=403)
+
+        manifest = request.FILES.get('manifest')
+        archive = request.FILES.get('archive')
+
+        if not manifest or not archive:
+            return Response({'error': 'Missing fields'}, status=400)
+
+        try:
+            rows = read_manifest(manifest)
+        except ValueError as e:
+            return Response({'error': f'Invalid manifest: {e}'}, status=400)
+
+        if not rows:
+            return Response({'error': 'The manifest has no rows'}, status=400)
+
+        if len(rows) > settings.BULK_ISSUANCE_MAX_ITEMS:
+            return Response({'error': f'At most {settings.BULK_ISSUANCE_MAX_ITEMS} documents per batch'}, status=400)
+
+        try:
+            with zipfile.ZipFile(archive) as zip_archive:
+                batch = issue_bulk(issuer, rows, zip_archive)
+        except zipfile.BadZipFile:
+            return Response({'error': 'The archive is not a valid ZIP file'}, status=400)
+
+        submitted = sum(1 for item in batch.items if item['job_id'] and item['status'] != 'failed')
+        log_event(
+            user=issuer,
+            event_type="ISSUE_DOCUMENT",
+            level="INFO",
+            message=f"Bulk issuance {batch.id}: {submitted} of {len(batch.items)} documents submitted",
+            path=request.path,
+            method=request.method,
+            status_code=202
+        )
+
+        return Response({'batch_id': str(batch.id), 'submitted': submitted, 'items': batch.items}, status=202)
+
+
+class BulkIssuanceStatusView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, batch_id):
+        batch = get_object_or_404(BulkIssuance, id=batch_id, issuer=request.user)
+        return Response({
+            'batch_id': str(batch.id),
+            'created_at': batch.created_at,
+            'items': bulk_issuance_report(batch),
+        }, status=200)
+
+
 class UserUploadDocumentView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
         user = request.user
+        stream_uploads_to_ipfs(request)
         title = request.data.get('title')
         file = request.FILES.get('file')
 
         if not title or not file:
             return Response({'error': 'Missing fields'}, status=400)
 
-        ipfs_hash = upload_file_to_ipfs(file)
+        try:
+            ipfs_hash = upload_file_to_ipfs(file)
+        except ContentDigestMismatch as e:
+            return Response({'error': str(e)}, status=400)
 
         if not ipfs_hash:
             return Response({'error': 'IPFS upload failed'}, status=500)
 
+        if settings.DUPLICATE_ISSUANCE != 'allow':
+            duplicate = UserUploadedDocument.objects.filter(owner=user, ipfs_hash=ipfs_hash).first()
+            if duplicate:
+                return duplicate_response(duplicate, UserUploadedDocumentSerializer)
+
+        if wants_async_issuance(request):
+            return submit_document_job(
+                request,
+                UserUploadedDocument(owner=user, title=title, ipfs_hash=ipfs_hash),
+                UserUploadedDocumentSerializer,
+                lambda: add_to_counters(user.id, uploaded=1),
+                "UPLOAD_DOCUMENT",
+                f"User submitted document '{title}'",
+            )
+
         tx_hash, document_index, block_tx_hash = store_document_on_chain(
             ipfs_hash,
             user.blockchain_address,
@@ -91,14 +260,16 @@ class UserUploadDocumentView(APIView):
             user.private_key
         )
 
-        doc = UserUploadedDocument.objects.create(
-            owner=user,
-            title=title,
-            ipfs_hash=ipfs_hash,
-            tx_hash=tx_hash,
-            document_index=document_index,
-            block_tx_hash=block_tx_hash,  # Save block hash here
-        )
+        with transaction.atomic():
+            doc = UserUploadedDocument.objects.create(
+                owner=user,
+                title=title,
+                ipfs_hash=ipfs_hash,
+                tx_hash=tx_hash,
+                document_index=document_index,
+                block_tx_hash=block_tx_hash,  # Save block hash here
+            )
+            add_to_counters(user.id, uploaded=1)
 
         serializer = UserUploadedDocumentSerializer(doc)
         
@@ -126,11 +297,125 @@ class AuthorityUploadedDocumentListView(generics.ListAPIView):
 
     def get_queryset(self):
         # Return all documents issued by the authority (the logged in user)
-        return AuthorityIssuedDocument.objects.filter(issuer=self.request.user)
+        return AuthorityIssuedDocumentSerializer.setup_eager_loading(
+            AuthorityIssuedDocument.objects.filter(issuer=self.request.user)
+        )
 
     serializer_class = AuthorityIssuedDocumentSerializer
 
 
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Inclusive (start, end) of a single `bytes=` Range header, or None to send the
+    whole file (no header, multiple ranges or a malformed one, as RFC 9110 allows).
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def read_file_range(file, length, chunk_size=64 * 1024):
+    with file:
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def can_read_content(user, cid):
+    if user.is_staff or user.is_verified_authority:
+        # Verifiers may fetch any document the system knows about
+        return (
+            AuthorityIssuedDocument.objects.filter(ipfs_hash=cid).exists()
+            or UserUploadedDocument.objects.filter(ipfs_hash=cid).exists()
+        )
+    return (
+        AuthorityIssuedDocument.objects.filter(Q(issuer=user) | Q(receiver=user), ipfs_hash=cid).exists()
+        or UserUploadedDocument.objects.filter(owner=user, ipfs_hash=cid).exists()
+    )
+
+
+class DocumentContentView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, cid):
+        if not CID_PATTERN.match(cid) or not can_read_content(request.user, cid):
+            return Response({'error': 'Document not found.'}, status=404)
+
+        # A CID names immutable content, so it is a strong validator forever
+        etag = f'"{cid}"'
+        headers = {
+            'ETag': etag,
+            'Cache-Control': 'private, max-age=31536000, immutable',
+            'Accept-Ranges': 'bytes',
+        }
+        # If-None-Match compares weakly: W/"<cid>" names the same content
+        if_none_match = request.headers.get('If-None-Match', '')
+        if if_none_match.strip() == '*' or etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(',')):
+            return HttpResponse(status=304, headers=headers)
+
+        range_header = request.headers.get('Range')
+        if request.headers.get('If-Range', etag) != etag:
+            range_header = None
+
+        try:
+            path = ipfs_cache.get(cid)
+            if path is None and not range_header:
+                # Cold CID: stream Kubo's output to the client while it fills the cache
+                return StreamingHttpResponse(
+                    ipfs_cache.stream(cid), content_type='application/octet-stream', headers=headers
+                )
+            try:
+                file = open(path or ipfs_cache.fetch(cid), 'rb')
+            except FileNotFoundError:
+                # Evicted between lookup and open
+                file = open(ipfs_cache.fetch(cid), 'rb')
+        except Exception as e:
+            return Response({'error': f'IPFS fetch failed: {e}'}, status=502)
+
+        size = os.fstat(file.fileno()).st_size
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            file.close()
+            return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+        if byte_range is None:
+            # FileResponse hands the open file to the server's sendfile wrapper
+            return FileResponse(file, content_type='application/octet-stream', headers=headers)
+
+        start, end = byte_range
+        file.seek(start)
+        return StreamingHttpResponse(
+            read_file_range(file, end - start + 1),
+            status=206,
+            content_type='application/octet-stream',
+            headers={**headers, 'Content-Range': f'bytes {start}-{end}/{size}', 'Content-Length': str(end - start + 1)},
+        )
+
+
 class UserDocumentsListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -138,11 +423,15 @@ class UserDocumentsListView(APIView):
         user = request.user
 
         # User uploaded documents by the user
-        user_docs = UserUploadedDocument.objects.filter(owner=user)
+        user_docs = UserUploadedDocumentSerializer.setup_eager_loading(
+            UserUploadedDocument.objects.filter(owner=user)
+        )
         user_docs_serialized = UserUploadedDocumentSerializer(user_docs, many=True).data
 
         # Authority issued documents received by the user
-        authority_docs = AuthorityIssuedDocument.objects.filter(receiver=user)
+        authority_docs = AuthorityIssuedDocumentSerializer.setup_eager_loading(
+            AuthorityIssuedDocument.objects.filter(receiver=user)
+        )
         authority_docs_serialized = AuthorityIssuedDocumentSerializer(authority_docs, many=True).data
 
         # Return both with keys to segregate on frontend
@@ -152,30 +441,35 @@ class UserDocumentsListView(APIView):
         })
 
 
-class UserDocumentStatsView(APIView):
+class UserDocumentTimelineView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=400)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
 
-        # Uploaded by user
-        user_docs = UserUploadedDocument.objects.filter(owner=user)
-        uploaded_docs_count = user_docs.count()
+        try:
+            results, next_cursor = timeline_page(request.user, request.query_params.get('cursor'), limit)
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=400)
 
-        # Authority issued to user
-        authority_docs = AuthorityIssuedDocument.objects.filter(receiver=user)
-        authority_docs_count = authority_docs.count()
+        return Response({'results': results, 'next_cursor': next_cursor})
 
-        # Flagged documents - assuming is_flagged field
-        flagged_docs_count = (
-            user_docs.filter(flagged=True).count() +
-            authority_docs.filter(flagged=True).count()
-        )
+
+class UserDocumentStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        # Maintained on every write, so this is one primary-key read
+        counters = get_counters(request.user)
 
         return Response({
-            'uploaded_documents': uploaded_docs_count,
-            'authority_issued_documents': authority_docs_count,
-            'flagged_documents': flagged_docs_count,
+            'uploaded_documents': counters.uploaded,
+            'authority_issued_documents': counters.received,
+            'flagged_documents': counters.flagged,
         })
 
 
@@ -188,10 +482,52 @@ class AuthorityDashboardStatsView(APIView):
         if not user.is_verified_authority:
             return Response({'error': 'Not authorized'}, status=403)
 
-        issued_docs_count = AuthorityIssuedDocument.objects.filter(issuer=user).count()
-        verified_docs_count = VerificationHistory.objects.filter(verifier=user).count()
+        counters = get_counters(user)
 
         return Response({
-            'issued_documents_count': issued_docs_count,
-            'verified_documents_count': verified_docs_count,
-        })
\ No newline at end of file
+            'issued_documents_count': counters.issued,
+            'verified_documents_count': counters.verified,
+        })
+
+
+class AnalyticsView(APIView):
+    """
+    Verifications and issuances per day, week or month, read from the daily
+    rollups. Authorities see their own activity; staff see everyone's, or one
+    authority's with ?authority=<id>.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+
+        if user.is_staff:
+            user_id = params.get('authority')
+            if user_id is not None and not user_id.isdigit():
+                return Response({'error': 'authority must be a user id'}, status=400)
+        elif user.is_verified_authority:
+            user_id = user.id
+        else:
+            return Response({'error': 'Not authorized'}, status=403)
+
+        bucket = params.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            return Response({'error': f"bucket must be one of: {', '.join(BUCKETS)}"}, status=400)
+
+        try:
+            end = date.fromisoformat(params['to']) if 'to' in params else timezone.now().date()
+            start = date.fromisoformat(params['from']) if 'from' in params else end - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'from and to must be dates (YYYY-MM-DD)'}, status=400)
+        if start > end:
+            return Response({'error': 'from must not be after to'}, status=400)
+        if (end - start).days >= MAX_DAYS[bucket]:
+            return Response({'error': f'At most {MAX_DAYS[bucket]} days per request with bucket={bucket}'}, status=400)
+
+        return Response({
+            'bucket': bucket,
+            'from': start,
+            'to': end,
+            'series': analytics_series(start, end, bucket, user_id),
+        })
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PER_PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """The public stats, gas estimates and fee suggestions are only shared by workers through a shared cache."""
+    if settings.CACHES['default']['BACKEND'] in PER_PROCESS_CACHES:
+        return [Warning(
+            "CACHE_BACKEND is per process, so each worker keeps its own system stats and fee suggestions.",
+            hint="Point CACHE_BACKEND at Redis, Memcached or a database cache.",
+            id='users.W001',
+        )]
+    return []
@@ -0,0 +1,66 @@
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from core.models import SystemLog
+from core.utils import log_buffer
+from users.models import CustomUser
+
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = (
+        "Logins/second through the full Django stack, with log_event writing each "
+        "SystemLog synchronously and through the buffer. Creates a benchmark user and "
+        "log entries in the configured database (SQLite shows the difference best)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help="Logins per mode")
+        parser.add_argument(
+            '--keep-hasher', action='store_true',
+            help="Check passwords with the configured hasher; by default a fast one is used "
+                 "so the log write is not hidden behind PBKDF2",
+        )
+
+    def handle(self, *args, **options):
+        hashers = settings.PASSWORD_HASHERS if options['keep_hasher'] else [
+            'django.contrib.auth.hashers.MD5PasswordHasher'
+        ]
+        with override_settings(PASSWORD_HASHERS=hashers):
+            user, _ = CustomUser.objects.get_or_create(username='benchmark-login')
+            user.set_password(PASSWORD)
+            user.save()
+
+            host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost').lstrip('.')
+            client = Client(HTTP_HOST=host)
+            for buffering in (False, True):
+                with override_settings(LOG_BUFFERING=buffering):
+                    self.run("buffered" if buffering else "sync", options['count'], client, user)
+
+        # Leave nothing queued behind
+        before = SystemLog.objects.count()
+        log_buffer.drain()
+        self.stdout.write(f"flushed {SystemLog.objects.count() - before} pending log entries, dropped {log_buffer.dropped}")
+
+    def run(self, name, count, client, user):
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(count):
+            sent = time.perf_counter()
+            response = client.post(
+                '/api/users/login/', {'public_id': user.public_id, 'username': user.username, 'password': PASSWORD},
+                content_type='application/json',
+            )
+            latencies.append(time.perf_counter() - sent)
+            if response.status_code != 200:
+                raise CommandError(f"login returned {response.status_code}: {response.content[:200]!r}")
+        elapsed = time.perf_counter() - start
+
+        percentiles = statistics.quantiles(latencies, n=100) if count > 1 else latencies * 99
+        self.stdout.write(
+            f"{name:<8} n={count} req/s={count / elapsed:.1f} "
+            f"p50={percentiles[49] * 1000:.1f}ms p95={percentiles[94] * 1000:.1f}ms"
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_alter_customuser_proof_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'is_verified_authority'], name='users_custo_role_b52403_idx'),
+        ),
+    ]
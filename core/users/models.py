@@ -1,6 +1,5 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from eth_account import Account
 import uuid
 
 class CustomUser(AbstractUser):
@@ -21,10 +20,18 @@ class CustomUser(AbstractUser):
     proof_document = models.FileField(upload_to='authority_proofs/', null=True, blank=True)
     is_verified_authority = models.BooleanField(default=False)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Staff user/authority listings filter by role, then verification status
+            models.Index(fields=['role', 'is_verified_authority']),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.public_id:
             self.public_id = str(uuid.uuid4())
         if not self.blockchain_address or not self.private_key:
+            # Imported here: eth_account is heavy and only needed for new accounts
+            from eth_account import Account
             acct = Account.create()
             self.blockchain_address = acct.address
             self.private_key = acct.key.hex()
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from documents.models import AuthorityIssuedDocument, VerificationDailyRollup
+from .models import CustomUser
+
+STATS_KEY_PREFIX = 'system-stats:'
+
+# Name -> exact count, as shown on the landing page
+STAT_QUERIES = {
+    'documents_issued': lambda: AuthorityIssuedDocument.objects.count(),
+    # Summed over the daily rollups rather than counted over every verification
+    'documents_verified': lambda: (
+        VerificationDailyRollup.objects.filter(success=True).aggregate(total=Sum('count'))['total'] or 0
+    ),
+    'authorities_registered': lambda: CustomUser.objects.filter(role='authority').count(),
+}
+
+
+# Present while the cached counts are recent; whoever adds it after it expires recounts
+RECOUNT_KEY = STATS_KEY_PREFIX + 'recounted'
+
+
+def recount_system_stats():
+    """Exact counts, written to the shared cache and marked recent for SYSTEM_STATS_RECOUNT_INTERVAL seconds."""
+    stats = {name: count() for name, count in STAT_QUERIES.items()}
+    # The counts themselves do not expire, so readers have them during a recount
+    cache.set_many({STATS_KEY_PREFIX + name: value for name, value in stats.items()}, None)
+    cache.set(RECOUNT_KEY, True, settings.SYSTEM_STATS_RECOUNT_INTERVAL)
+    return stats
+
+
+def get_system_stats():
+    """
+    Global counts from the shared cache in one round trip. Increments keep them
+    current between recounts. Once the interval is up, cache.add lets exactly one
+    reader recount while the others keep answering from the cached counts.
+    """
+    cached = cache.get_many([STATS_KEY_PREFIX + name for name in STAT_QUERIES])
+    if len(cached) < len(STAT_QUERIES) or cache.add(RECOUNT_KEY, True, settings.SYSTEM_STATS_RECOUNT_INTERVAL):
+        return recount_system_stats()
+    return {name: cached[STATS_KEY_PREFIX + name] for name in STAT_QUERIES}
+
+
+def increment_system_stat(name, delta=1):
+    """
+    Adds `delta` to a cached count once the current transaction commits. A count
+    that is not cached is left alone: the next read recounts it anyway.
+    """
+    if not delta:
+        return
+
+    def apply():
+        try:
+            # Atomic on Redis/Memcached
+            cache.incr(STATS_KEY_PREFIX + name, delta)
+        except ValueError:
+            pass
+
+    transaction.on_commit(apply)
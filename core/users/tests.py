@@ -1,3 +1,64 @@
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from documents.counters import count_issuances
+from documents.models import AuthorityIssuedDocument
+from .models import CustomUser
+from .stats import RECOUNT_KEY, get_system_stats, increment_system_stat, recount_system_stats
 
-# Create your tests here.
+
+class SystemStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authority = CustomUser.objects.create(username='authority', role='authority', is_verified_authority=True)
+        cls.holder = CustomUser.objects.create(username='holder')
+        AuthorityIssuedDocument.objects.create(issuer=cls.authority, receiver=cls.holder, title="Degree", ipfs_hash='QmDegree')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def get(self, **headers):
+        return APIClient().get('/api/users/stats/', headers=headers)
+
+    def test_unchanged_stats_return_304(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'documents_issued': 1, 'documents_verified': 0, 'authorities_registered': 1})
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        etag = response['ETag']
+        self.assertEqual(self.get(**{'If-None-Match': etag}).status_code, 304)
+
+        # Any change in the counts changes the ETag
+        with self.captureOnCommitCallbacks(execute=True):
+            increment_system_stat('authorities_registered')
+        response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_increments_apply_after_commit_without_a_recount(self):
+        get_system_stats()
+        with mock.patch('users.stats.recount_system_stats') as recount:
+            with self.captureOnCommitCallbacks() as callbacks:
+                count_issuances(self.authority.id, [self.holder.id, self.holder.id])
+            self.assertEqual(get_system_stats()['documents_issued'], 1)
+            for callback in callbacks:
+                callback()
+            self.assertEqual(get_system_stats()['documents_issued'], 3)
+        recount.assert_not_called()
+
+    def test_increment_of_an_uncached_count_is_ignored(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            increment_system_stat('documents_issued', 5)
+        self.assertEqual(get_system_stats()['documents_issued'], 1)
+
+    def test_one_reader_recounts_once_the_interval_is_up(self):
+        get_system_stats()
+        cache.delete(RECOUNT_KEY)
+        with mock.patch('users.stats.recount_system_stats', wraps=recount_system_stats) as recount:
+            for _ in range(3):
+                get_system_stats()
+        recount.assert_called_once()
@@ -1,3 +1,5 @@
+import hashlib
+import json
 from rest_framework import generics, permissions
 from rest_framework.views import APIView
 from .models import CustomUser
@@ -5,8 +7,11 @@ from .serializers import AuthorityRegistrationSerializer
 from .serializers import CustomTokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.response import Response
-from documents.models import AuthorityIssuedDocument
-from blockchain.models import VerificationHistory
+from django.conf import settings
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+from .stats import get_system_stats, increment_system_stat
 from core.utils import log_event
 
 class AuthorityRegisterView(generics.CreateAPIView):
@@ -16,6 +21,7 @@ class AuthorityRegisterView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         user = serializer.save()
+        increment_system_stat('authorities_registered')
         # Log the registration event
         log_event(
             user=user,
@@ -51,12 +57,14 @@ class SystemStatsView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        documents_issued = AuthorityIssuedDocument.objects.count()
-        documents_verified = VerificationHistory.objects.filter(success=True).count()
-        authorities_registered = CustomUser.objects.filter(role="authority").count()
-        
-        return Response({
-            "documents_issued": documents_issued,
-            "documents_verified": documents_verified,
-            "authorities_registered": authorities_registered
-        })
+        # Counts come from the shared cache; see users.stats
+        stats = get_system_stats()
+        etag = quote_etag(hashlib.sha256(json.dumps(stats, sort_keys=True).encode()).hexdigest()[:32])
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = Response(stats)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.SYSTEM_STATS_MAX_AGE)
+        return response